@@ -1,15 +1,82 @@
 # REGISTER
 MODEL_STORE = {}
+MODEL_PARTITIONING = {}
+MODEL_FULLTEXT_INDEXES = {}
+MODEL_CASE_INSENSITIVE_FIELDS = {}
+MODEL_RESULT_CACHE = set()
+
+
+def _model_label(klass):
+    return '%s.%s' % (klass._meta.app_label, klass._meta.object_name)
 
 
 # Model class decorators
 def column_store(klass):
     """Register model use HANA's column store"""
-    MODEL_STORE[klass.__name__] = 'COLUMN'
+    MODEL_STORE[_model_label(klass)] = 'COLUMN'
     return klass
 
 
 def row_store(klass):
     """Register model use HANA's column store"""
-    MODEL_STORE[klass.__name__] = 'ROW'
+    MODEL_STORE[_model_label(klass)] = 'ROW'
+    return klass
+
+
+def get_model_store(model, default='COLUMN'):
+    """Return the table type (COLUMN or ROW) registered for a model"""
+    # entries keyed by the plain class name are still honored
+    return MODEL_STORE.get(_model_label(model), MODEL_STORE.get(model.__name__, default))
+
+
+def partition_by(*partitionings):
+    """Register the partitioning of a (column store) model, see django_hana.partitioning"""
+    def decorator(klass):
+        MODEL_PARTITIONING[_model_label(klass)] = partitionings
+        return klass
+    return decorator
+
+
+def get_model_partitioning(model):
+    """Return the partitioning registered for a model"""
+    return MODEL_PARTITIONING.get(_model_label(model), ())
+
+
+def fulltext_index(*fields, **options):
+    """Register fulltext indexes on fields of a model, see django_hana.search.FulltextIndex for the options"""
+    from django_hana.search import FulltextIndex
+
+    def decorator(klass):
+        indexes = MODEL_FULLTEXT_INDEXES.setdefault(_model_label(klass), [])
+        indexes.extend(FulltextIndex(field, **options) for field in fields)
+        return klass
+    return decorator
+
+
+def get_model_fulltext_indexes(model):
+    """Return the fulltext indexes registered for a model"""
+    return MODEL_FULLTEXT_INDEXES.get(_model_label(model), [])
+
+
+def case_insensitive_index(*fields):
+    """Register fields of a model whose case-insensitive lookups use an indexed upper case copy of the column"""
+    def decorator(klass):
+        MODEL_CASE_INSENSITIVE_FIELDS.setdefault(_model_label(klass), []).extend(fields)
+        return klass
+    return decorator
+
+
+def get_model_case_insensitive_fields(model):
+    """Return the names of the fields registered with case_insensitive_index for a model"""
+    return MODEL_CASE_INSENSITIVE_FIELDS.get(_model_label(model), [])
+
+
+def cache_results(klass):
+    """Register model whose query results are cached, see django_hana.resultcache"""
+    MODEL_RESULT_CACHE.add(_model_label(klass))
     return klass
+
+
+def get_model_result_cache(model):
+    """Return whether the query results of a model are cached"""
+    return _model_label(model) in MODEL_RESULT_CACHE
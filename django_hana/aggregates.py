@@ -0,0 +1,57 @@
+"""
+Aggregates of SAP HANA that Django doesn't provide:
+
+    Order.objects.aggregate(median=Median('total'), p90=PercentileCont('total', 0.9))
+"""
+from django.db.models import Aggregate, FloatField
+
+
+class Median(Aggregate):
+    function = 'MEDIAN'
+    name = 'Median'
+
+    def __init__(self, expression, **extra):
+        extra.setdefault('output_field', FloatField())
+        super(Median, self).__init__(expression, **extra)
+
+    def convert_value(self, value, expression, connection, context):
+        if value is None:
+            return value
+        return float(value)
+
+
+class Percentile(Aggregate):
+    """
+    Base class of the inverse distribution functions. The percentile is a number between 0 and 1.
+    """
+    template = '%(function)s(%(percentile)s) WITHIN GROUP (ORDER BY %(expressions)s)'
+
+    def __init__(self, expression, percentile, **extra):
+        if not 0 <= percentile <= 1:
+            raise ValueError('The percentile must be between 0 and 1, got %r.' % percentile)
+        super(Percentile, self).__init__(expression, percentile=float(percentile), **extra)
+
+
+class PercentileCont(Percentile):
+    """
+    The percentile interpolated between the values of the group.
+    """
+    function = 'PERCENTILE_CONT'
+    name = 'PercentileCont'
+
+    def __init__(self, expression, percentile, **extra):
+        extra.setdefault('output_field', FloatField())
+        super(PercentileCont, self).__init__(expression, percentile, **extra)
+
+    def convert_value(self, value, expression, connection, context):
+        if value is None:
+            return value
+        return float(value)
+
+
+class PercentileDisc(Percentile):
+    """
+    The first value of the group at or above the percentile.
+    """
+    function = 'PERCENTILE_DISC'
+    name = 'PercentileDisc'
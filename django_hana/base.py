@@ -2,10 +2,10 @@
 SAP HANA database backend for Django.
 """
 import logging
+import socket
 import sys
 from time import time
 
-from django.contrib.gis.db.backends.base.features import BaseSpatialFeatures
 from django.db import utils
 from django.db.backends.base.base import BaseDatabaseWrapper
 from django.db.backends.base.features import BaseDatabaseFeatures
@@ -22,14 +22,18 @@ except ImportError as e:
 
 from django_hana.client import DatabaseClient               # NOQA isort:skip
 from django_hana.creation import DatabaseCreation           # NOQA isort:skip
+from django_hana.endpoints import get_endpoint_pool         # NOQA isort:skip
 from django_hana.introspection import DatabaseIntrospection # NOQA isort:skip
 from django_hana.operations import DatabaseOperations       # NOQA isort:skip
+from django_hana.resultcache import get_result_cache        # NOQA isort:skip
 from django_hana.schema import DatabaseSchemaEditor         # NOQA isort:skip
+from django_hana.temptables import InValueTables, StagingTables  # NOQA isort:skip
+from django_hana.tracking import READ_KEYWORDS, get_dirty_tables, get_workload_stats  # NOQA isort:skip
 
 logger = logging.getLogger('django.db.backends')
 
 
-class DatabaseFeatures(BaseDatabaseFeatures, BaseSpatialFeatures):
+class DatabaseFeatures(BaseDatabaseFeatures):
     needs_datetime_string_cast = True
     can_return_id_from_insert = False
     requires_rollback_on_dirty_transaction = True
@@ -37,12 +41,14 @@ class DatabaseFeatures(BaseDatabaseFeatures, BaseSpatialFeatures):
     can_defer_constraint_checks = True
     has_select_for_update = True
     has_select_for_update_nowait = True
+    has_select_for_update_skip_locked = True
     has_bulk_insert = True
     supports_tablespaces = False
     supports_transactions = True
     can_distinct_on_fields = False
     uses_autocommit = True
-    uses_savepoints = False
+    uses_savepoints = True
+    can_release_savepoints = True
     can_introspect_foreign_keys = False
     supports_timezones = False
     requires_literal_defaults = True
@@ -56,10 +62,22 @@ class CursorWrapper(object):
     codes_for_integrityerror = (301,)
 
     def __init__(self, cursor, db):
-        self.cursor = cursor
+        self.cursor = self.primary_cursor = cursor
+        self.replica_cursor = None
         self.db = db
         self.is_hana = True
 
+    def _route(self, sql):
+        """
+        Use the cursor of the read replica (if configured) for read-only statements, see DatabaseWrapper.use_replica.
+        """
+        self.cursor = self.primary_cursor
+        if self.db.use_replica(sql):
+            if self.replica_cursor is None:
+                self.replica_cursor = self.db.replica_cursor()
+            if self.replica_cursor is not None:
+                self.cursor = self.replica_cursor
+
     def set_dirty(self):
         if not self.db.get_autocommit():
             self.db.set_dirty()
@@ -86,7 +104,14 @@ class CursorWrapper(object):
         execute with replaced placeholders
         """
         try:
+            params = self.db.in_value_tables.load(self.primary_cursor, params)
+            self._route(sql)
             self.cursor.execute(self._replace_params(sql), params)
+            self.db.track_write(sql)
+            self.db.track_dirty_tables(sql)
+            self.db.track_cached_results(sql)
+            if self.db.workload_stats is not None:
+                self.db.workload_stats.record(sql)
         except Database.IntegrityError as e:
             six.reraise(utils.IntegrityError, utils.IntegrityError(*tuple(e.args)), sys.exc_info()[2])
         except Database.Error as e:
@@ -98,7 +123,13 @@ class CursorWrapper(object):
 
     def executemany(self, sql, param_list):
         try:
+            self.cursor = self.primary_cursor
             self.cursor.executemany(self._replace_params(sql), param_list)
+            self.db.track_write(sql)
+            self.db.track_dirty_tables(sql)
+            self.db.track_cached_results(sql)
+            if self.db.workload_stats is not None:
+                self.db.workload_stats.record(sql, count=len(param_list) if hasattr(param_list, '__len__') else 1)
         except Database.IntegrityError as e:
             six.reraise(utils.IntegrityError, utils.IntegrityError(*tuple(e.args)), sys.exc_info()[2])
         except Database.Error as e:
@@ -203,8 +234,6 @@ class DatabaseWrapper(BaseDatabaseWrapper):
         'iexact': '= UPPER(%s)',
         'contains': 'LIKE %s',
         'icontains': 'LIKE UPPER(%s)',
-        'regex': '~ %s',
-        'iregex': '~* %s',
         'gt': '> %s',
         'gte': '>= %s',
         'lt': '< %s',
@@ -228,12 +257,35 @@ class DatabaseWrapper(BaseDatabaseWrapper):
         self.introspection = DatabaseIntrospection(self)
         self.validation = BaseDatabaseValidation(self)
 
+        # tables that have been written to since the last flush
+        self.dirty_tables = get_dirty_tables(self.alias)
+        # tables emptied by flush statements of the current transaction, they are clean once it's committed
+        self.flushed_tables = set()
+        # per table read/write statistics for the row/column store advisor (opt-in)
+        self.workload_stats = get_workload_stats(self.alias) if self.settings_dict.get('WORKLOAD_STATS') else None
+        # cached query results of the models registered with cache_results
+        self.result_cache = get_result_cache(self.alias, self.settings_dict.get('RESULT_CACHE_SIZE'))
+        # tables written by the current transaction, their cached results are invalidated again when it ends
+        self.result_cache_writes = set()
+        # values of large IN lookups
+        self.in_value_tables = InValueTables(self)
+        # rows of bulk updates
+        self.staging_tables = StagingTables(self)
+        # connection to the read replica (see use_replica), time of the last write and until when the replica isn't
+        # tried again after it couldn't be reached
+        self.replica_connection = None
+        self.last_write = None
+        self.replica_retry_at = None
+
     def close(self):
         self.validate_thread_sharing()
         if self.connection is None:
             return
         self.connection.close()
         self.connection = None
+        if self.replica_connection is not None:
+            self.replica_connection.close()
+            self.replica_connection = None
         # try:
         #     self.connection.close()
         #     self.connection = None
@@ -255,34 +307,126 @@ class DatabaseWrapper(BaseDatabaseWrapper):
                 'settings.DATABASES is improperly configured. '
                 'Please supply the NAME value.'
             )
-        conn_params = {}
-        if self.settings_dict['USER']:
-            conn_params['user'] = self.settings_dict['USER']
-        if self.settings_dict['PASSWORD']:
-            conn_params['password'] = self.settings_dict['PASSWORD']
-        if self.settings_dict['HOST']:
-            conn_params['host'] = self.settings_dict['HOST']
-        if self.settings_dict['PORT']:
-            conn_params['port'] = self.settings_dict['PORT']
-        self.connection = Database.connect(
-            host=conn_params['host'],
-            port=int(conn_params['port']),
-            user=conn_params['user'],
-            password=conn_params['password']
-        )
+        self.connection = self.connect_endpoint(self.alias, self.get_connection_params())
         # set autocommit on by default
         self.set_autocommit(True)
         self.default_schema = self.settings_dict['NAME']
         # make it upper case
         self.default_schema = self.default_schema.upper()
         self.create_or_set_default_schema()
+        self.dirty_tables.bind(self.default_schema)
+        self.in_value_tables.reset()
+        self.staging_tables.reset()
+
+    def get_connection_params(self, settings_dict=None):
+        settings_dict = settings_dict or self.settings_dict
+        conn_params = {}
+        if settings_dict['USER']:
+            conn_params['user'] = settings_dict['USER']
+        if settings_dict['PASSWORD']:
+            conn_params['password'] = settings_dict['PASSWORD']
+        if settings_dict['HOST']:
+            conn_params['host'] = settings_dict['HOST']
+        if settings_dict['PORT']:
+            conn_params['port'] = settings_dict['PORT']
+        conn_params['timeout'] = settings_dict.get('CONNECT_TIMEOUT')
+        conn_params['probe_interval'] = settings_dict.get('PROBE_INTERVAL', 30)
+        return conn_params
+
+    def connect_endpoint(self, name, conn_params):
+        """
+        Connect to the best of the endpoints in HOST, see django_hana.endpoints.
+        """
+        def connect(host, port):
+            if conn_params['timeout'] is None:
+                return Database.connect(host=host, port=port, user=conn_params['user'],
+                                        password=conn_params['password'])
+            connection = Database.Connection(host, port, conn_params['user'], conn_params['password'],
+                                             timeout=conn_params['timeout'])
+            connection.connect()
+            # the timeout only applies to connecting, not to statements
+            connection.timeout = None
+            return connection
+
+        pool = get_endpoint_pool(name, conn_params.get('host'), conn_params.get('port'), conn_params['timeout'],
+                                 conn_params['probe_interval'])
+        return pool.connect(connect, (Database.Error, socket.error))
+
+    def use_replica(self, sql):
+        """
+        Read-only statements outside of transactions go to the READ_REPLICA (e.g. a read-enabled secondary of
+        system replication), unless the connection has written within the last READ_REPLICA_STICKINESS seconds.
+        Statements depending on the session (sequence values, temporary tables) stay on the primary.
+        """
+        if not self.settings_dict.get('READ_REPLICA') or self.in_atomic_block or not self.get_autocommit():
+            return False
+        statement = sql.lstrip().upper()
+        if not statement.startswith(('SELECT', 'WITH')) or 'FOR UPDATE' in statement:
+            return False
+        if 'CURRVAL' in statement or 'NEXTVAL' in statement or '"#' in statement:
+            return False
+        stickiness = self.settings_dict.get('READ_REPLICA_STICKINESS', 5)
+        return self.last_write is None or time() - self.last_write >= stickiness
+
+    def track_write(self, sql):
+        if not sql.lstrip().upper().startswith(READ_KEYWORDS):
+            self.last_write = time()
+
+    def track_dirty_tables(self, sql):
+        table = self.dirty_tables.track(sql)
+        if table is not None:
+            if self.get_autocommit():
+                self.dirty_tables.flushed({table})
+            else:
+                self.flushed_tables.add(table)
+
+    def track_cached_results(self, sql):
+        if self.result_cache is None:
+            return
+        table = self.result_cache.track(sql)
+        if table is not None and not self.get_autocommit():
+            self.result_cache_writes.add(table)
+
+    def invalidate_cached_results(self):
+        """
+        Invalidate the results of the tables written by the transaction that ended, other threads may have cached
+        their old (or uncommitted) rows since the statements were executed.
+        """
+        writes, self.result_cache_writes = self.result_cache_writes, set()
+        for table in writes:
+            self.result_cache.invalidate(table)
+
+    def replica_cursor(self):
+        """
+        Return a cursor of the read replica or None if it isn't reachable. After a failed attempt, the replica isn't
+        tried again for READ_REPLICA_RETRY seconds (default 30), so reads don't wait for the connect every time.
+        """
+        if self.replica_connection is None:
+            if self.replica_retry_at is not None and time() < self.replica_retry_at:
+                return None
+            settings_dict = dict(self.settings_dict, **self.settings_dict['READ_REPLICA'])
+            conn_params = self.get_connection_params(settings_dict)
+            try:
+                self.replica_connection = self.connect_endpoint('%s:replica' % self.alias, conn_params)
+                self.replica_connection.setautocommit(True)
+                self.replica_connection.cursor().execute('set schema ' + self.default_schema)
+            except (Database.Error, socket.error):
+                logger.warning('Read replica %s:%s is not reachable, using the primary.',
+                               conn_params.get('host'), conn_params.get('port'), exc_info=True)
+                self.replica_connection = None
+                self.replica_retry_at = time() + self.settings_dict.get('READ_REPLICA_RETRY', 30)
+                return None
+            self.replica_retry_at = None
+        return self.replica_connection.cursor()
 
     def _cursor(self):
         self.ensure_connection()
         return self.connection.cursor()
 
     def _set_autocommit(self, autocommit):
-        self.connection.setautocommit(autocommit)
+        # skip the call if the connection is in that state already
+        if self.connection.autocommit != autocommit:
+            self.connection.setautocommit(autocommit)
 
     def cursor(self):
         # Call parent, in order to support cursor overriding from apps like Django Debug Toolbar
@@ -318,7 +462,7 @@ class DatabaseWrapper(BaseDatabaseWrapper):
         """
         self.ensure_connection()
         if self.features.uses_autocommit and managed:
-            self.connection.setautocommit(auto=False)
+            self._set_autocommit(False)
 
     def leave_transaction_management(self):
         """
@@ -336,18 +480,30 @@ class DatabaseWrapper(BaseDatabaseWrapper):
             raise
         finally:
             # restore autocommit behavior
-            self.connection.setautocommit(auto=True)
+            self._set_autocommit(True)
         self._dirty = False
 
     def _commit(self):
         if self.connection is not None:
-            return self.connection.commit()
+            try:
+                self.connection.commit()
+            finally:
+                self.invalidate_cached_results()
+            flushed, self.flushed_tables = self.flushed_tables, set()
+            self.dirty_tables.flushed(flushed)
             # try:
             #     return self.connection.commit()
             # except Database.IntegrityError as e:
             #     ### TODO: reraise instead of raise - six.reraise was deleted due to incompability with django 1.4
             #     raise
 
+    def _rollback(self):
+        try:
+            return super(DatabaseWrapper, self)._rollback()
+        finally:
+            self.invalidate_cached_results()
+            self.flushed_tables = set()
+
     def schema_editor(self, *args, **kwargs):
         return DatabaseSchemaEditor(self, **kwargs)
 
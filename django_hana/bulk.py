@@ -0,0 +1,125 @@
+"""
+Set-based writes of many objects:
+
+    class Product(models.Model):
+        ...
+        objects = BulkQuerySet.as_manager()
+
+    Product.objects.bulk_upsert(products)                 # by primary key: UPSERT ... WITH PRIMARY KEY
+    Product.objects.bulk_upsert(products, keys=['sku'])   # by other unique fields: MERGE INTO
+    Product.objects.bulk_update(products, ['price'])       # by primary key through a temporary table
+
+The statements are executed with executemany, one round trip per batch.
+"""
+from django.db import connections, transaction
+from django.db.models import AutoField, QuerySet
+from django.db.models.sql import InsertQuery
+
+
+class UpsertQuery(InsertQuery):
+    """
+    An insert query that updates the existing rows with the same primary key or, with keys, the same key values.
+    """
+    upsert = True
+
+    def __init__(self, *args, **kwargs):
+        self.upsert_keys = tuple(kwargs.pop('keys', None) or ())
+        super(UpsertQuery, self).__init__(*args, **kwargs)
+
+
+class BulkQuerySet(QuerySet):
+    def _batched_upsert(self, objs, fields, keys, batch_size):
+        if not objs:
+            return
+        batch_size = batch_size or max(connections[self.db].ops.bulk_batch_size(fields, objs), 1)
+        for start in range(0, len(objs), batch_size):
+            query = UpsertQuery(self.model, keys=keys)
+            query.insert_values(fields, objs[start:start + batch_size])
+            query.get_compiler(using=self.db).execute_sql()
+
+    def bulk_upsert(self, objs, keys=None, batch_size=None):
+        """
+        Insert the objects or update the existing rows with the same primary key or, if given, the same values of the
+        key fields. Like bulk_create, this doesn't call save(), send signals or set primary keys.
+        """
+        if self.model._meta.parents:
+            raise ValueError("Can't bulk upsert a multi-table inherited model")
+        objs = list(objs)
+        if not objs:
+            return objs
+        self._for_write = True
+        fields = self.model._meta.concrete_fields
+        objs_with_pk = [obj for obj in objs if obj.pk is not None]
+        objs_without_pk = [obj for obj in objs if obj.pk is None]
+        if objs_without_pk and not keys:
+            raise ValueError('Upserting by primary key requires primary key values.')
+        with transaction.atomic(using=self.db, savepoint=False):
+            self._batched_upsert(objs_with_pk, fields, keys, batch_size)
+            # the primary key of new rows comes from the sequence
+            fields = [field for field in fields if not isinstance(field, AutoField)]
+            self._batched_upsert(objs_without_pk, fields, keys, batch_size)
+        return objs
+
+    def bulk_update(self, objs, fields, batch_size=None):
+        """
+        Update the given fields of the objects (by primary key) with a single statement. The new values are loaded
+        into a local temporary table in batches and joined to the table by MERGE INTO. The temporary table is emptied
+        afterwards and reused by later updates of the connection (see django_hana.temptables). SAP HANA commits DDL
+        statements, so within a transaction that can't use an existing temporary table, the rows are updated with
+        executemany instead. Like bulk_create, this doesn't call save() or send signals.
+        """
+        opts = self.model._meta
+        if not fields:
+            raise ValueError('Field names must be given to bulk_update().')
+        fields = [opts.get_field(name) for name in fields]
+        if any(not field.concrete or field.many_to_many or field.primary_key for field in fields):
+            raise ValueError('bulk_update() can only be used with concrete fields other than the primary key.')
+        objs = list(objs)
+        if not objs:
+            return
+        if any(obj.pk is None for obj in objs):
+            raise ValueError('All bulk_update() objects must have a primary key set.')
+        self._for_write = True
+        connection = connections[self.db]
+        qn = connection.ops.quote_name
+        table = qn(opts.db_table)
+        columns = [opts.pk] + fields
+        definition = tuple('%s %s' % (qn(field.column), field.db_type(connection)) for field in columns)
+
+        rows = [
+            [field.get_db_prep_save(getattr(obj, field.attname), connection=connection) for field in columns]
+            for obj in objs
+        ]
+        rows = connection.ops.modify_insert_params(None, rows)
+        batch_size = batch_size or max(connection.ops.bulk_batch_size(columns, objs), 1)
+
+        if not connection.staging_tables.available((opts.db_table, definition)):
+            update_sql = 'UPDATE %s SET %s WHERE %s = %%s' % (
+                table, ', '.join('%s = %%s' % qn(field.column) for field in fields), qn(opts.pk.column),
+            )
+            rows = [row[1:] + row[:1] for row in rows]
+            with transaction.atomic(using=self.db, savepoint=False), connection.cursor() as cursor:
+                for start in range(0, len(rows), batch_size):
+                    cursor.executemany(update_sql, rows[start:start + batch_size])
+            return
+
+        with connection.cursor() as cursor:
+            staging = connection.staging_tables.create(cursor, opts.db_table, definition)
+        with transaction.atomic(using=self.db, savepoint=False), connection.cursor() as cursor:
+            try:
+                insert_sql = 'INSERT INTO %s VALUES (%s)' % (staging, ', '.join(['%s'] * len(columns)))
+                for start in range(0, len(rows), batch_size):
+                    cursor.executemany(insert_sql, rows[start:start + batch_size])
+                cursor.execute(
+                    'MERGE INTO %(table)s USING %(staging)s ON (%(table)s.%(pk)s = %(staging)s.%(pk)s) '
+                    'WHEN MATCHED THEN UPDATE SET %(updates)s' % {
+                        'table': table,
+                        'staging': staging,
+                        'pk': qn(opts.pk.column),
+                        'updates': ', '.join(
+                            '%s.%s = %s.%s' % (table, qn(field.column), staging, qn(field.column)) for field in fields
+                        ),
+                    }
+                )
+            finally:
+                cursor.execute('DELETE FROM %s' % staging)
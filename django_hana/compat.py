@@ -2,9 +2,23 @@ from __future__ import unicode_literals
 
 import django
 
+try:
+    from django.core.exceptions import EmptyResultSet
+except ImportError:
+    # Django < 1.11
+    from django.db.models.sql.datastructures import EmptyResultSet  # NOQA
+
 
 def createPlaceholder(compiler, field, val):
     if django.VERSION >= (1, 9):
         return compiler.field_as_sql(field, val)[0]
 
     return compiler.placeholder(field, val)
+
+
+def datetimeSql(sql):
+    # As of Django 1.11, the datetime_*_sql methods of DatabaseOperations return only SQL (without params).
+    if django.VERSION >= (1, 11):
+        return sql
+
+    return sql, []
@@ -1,9 +1,94 @@
+import copy
+from collections import OrderedDict
+
+from django.db.models.expressions import Col
 from django.db.models.sql import compiler
+from django.db.models.sql.constants import MULTI, SINGLE
+from django.utils import six
+from pyhdb.protocol.lobs import Lob
 
+import django_hana
 from django_hana import compat
+from django_hana.resultcache import read_tables
+from django_hana.temptables import InValues
+
+CASE_INSENSITIVE_LOOKUPS = ('iexact', 'icontains', 'istartswith', 'iendswith')
+REGEX_LOOKUPS = ('regex', 'iregex')
 
 
 class SQLCompiler(compiler.SQLCompiler):
+    def compile(self, node, select_format=False):
+        if (
+            getattr(node, 'lookup_name', None) in CASE_INSENSITIVE_LOOKUPS
+            and isinstance(node.lhs, Col)
+            and not node.bilateral_transforms
+        ):
+            column = self.connection.ops.case_insensitive_column(node.lhs.target)
+            if column:
+                return self.compile_case_insensitive_lookup(node, column)
+        if getattr(node, 'lookup_name', None) == 'in' and self.use_in_value_table(node):
+            return self.compile_in_value_table_lookup(node)
+        if getattr(node, 'lookup_name', None) in REGEX_LOOKUPS and isinstance(node.rhs, six.string_types):
+            node = copy.copy(node)
+            node.rhs = self.connection.ops.regex_pattern(node.rhs)
+        return super(SQLCompiler, self).compile(node, select_format=select_format)
+
+    def compile_case_insensitive_lookup(self, lookup, column):
+        """
+        Compare against the indexed upper case copy of the column instead of wrapping the column in UPPER().
+        """
+        lhs = '%s.%s' % (self.quote_name_unless_alias(lookup.lhs.alias), self.connection.ops.quote_name(column))
+        rhs, rhs_params = lookup.process_rhs(self, self.connection)
+        return '%s %s' % (lhs, lookup.get_rhs_op(self.connection, rhs)), list(rhs_params)
+
+    def use_in_value_table(self, lookup):
+        in_value_tables = self.connection.in_value_tables
+        threshold = in_value_tables.threshold
+        if (
+            threshold is None
+            or not isinstance(lookup.rhs, (list, tuple, set))
+            or len(lookup.rhs) <= threshold
+            or any(hasattr(value, 'resolve_expression') for value in lookup.rhs)
+        ):
+            return False
+        db_type = lookup.lhs.output_field.db_type(self.connection)
+        return db_type is not None and in_value_tables.available(db_type)
+
+    def compile_in_value_table_lookup(self, lookup):
+        """
+        Select the values of a large IN lookup from a temporary table (see django_hana.temptables).
+        """
+        lhs, lhs_params = lookup.process_lhs(self, self.connection)
+        rhs, rhs_params = lookup.process_rhs(self, self.connection)
+        db_type = lookup.lhs.output_field.db_type(self.connection)
+        table = self.connection.in_value_tables.table(db_type)
+        sql = '%s IN (SELECT "VALUE" FROM %s WHERE "SET_ID" = %%s)' % (lhs, table)
+        # the values are loaded when the statement is executed
+        return sql, list(lhs_params) + [InValues(db_type, rhs_params)]
+
+    def get_group_by(self, select, order_by):
+        grouping = getattr(self.query, 'grouping', None)
+        if grouping is None:
+            return super(SQLCompiler, self).get_group_by(select, order_by)
+        return [self.compile_grouping(*grouping)]
+
+    def compile_grouping(self, kind, sets):
+        """
+        Returns the GROUP BY clause of ROLLUP, CUBE and GROUPING SETS queries (see django_hana.grouping).
+        """
+        params = []
+        sets_sql = []
+        for grouping_set in sets:
+            columns = []
+            for name in grouping_set:
+                sql, column_params = self.compile(self.query.resolve_ref(name))
+                columns.append(sql)
+                params.extend(column_params)
+            sets_sql.append('(%s)' % ', '.join(columns))
+        if kind == 'GROUPING SETS':
+            return '%s (%s)' % (kind, ', '.join(sets_sql)), params
+        return '%s %s' % (kind, sets_sql[0]), params
+
     def resolve_columns(self, row, fields=()):
         """
         Taken from fox:
@@ -17,8 +102,58 @@ class SQLCompiler(compiler.SQLCompiler):
             values.append(self.query.convert_values(value, field, connection=self.connection))
         return row[:index_extra_select] + tuple(values)
 
+    def use_result_cache(self):
+        return (
+            self.connection.result_cache is not None
+            and self.query.model is not None
+            and django_hana.get_model_result_cache(self.query.model)
+            and not self.query.select_for_update
+            and not self.connection.in_atomic_block
+            and self.connection.get_autocommit()
+        )
+
+    def execute_sql(self, result_type=MULTI, **kwargs):
+        # kwargs: chunked_fetch of Django 1.11
+        if result_type not in (MULTI, SINGLE) or not self.use_result_cache():
+            return super(SQLCompiler, self).execute_sql(result_type, **kwargs)
+        try:
+            sql, params = self.as_sql()
+            key = (sql, tuple(params))
+            hash(key)
+        except (compat.EmptyResultSet, TypeError):
+            # no query needed or unhashable params
+            return super(SQLCompiler, self).execute_sql(result_type, **kwargs)
+        tables = read_tables(sql)
+        if not sql or any(table.startswith('#') for table in tables):
+            # the contents of temporary tables are not part of the key
+            return super(SQLCompiler, self).execute_sql(result_type, **kwargs)
+
+        cache = self.connection.result_cache
+        rows = cache.get(key, django_hana._model_label(self.query.model))
+        if rows is None:
+            # the rows aren't cached if another thread writes to the tables meanwhile
+            version = cache.version(tables)
+            with self.connection.cursor() as cursor:
+                cursor.execute(sql, params)
+                # LOBs can only be read once, cache their contents
+                rows = [
+                    tuple(value.read() if isinstance(value, Lob) else value for value in row[:self.col_count])
+                    for row in cursor.fetchall()
+                ]
+            cache.set(key, rows, tables, version)
+        if result_type == SINGLE:
+            return rows[0] if rows else None
+        return iter([rows]) if rows else iter([])
+
     def as_sql(self, *args, **kwargs):
         result, params = super(SQLCompiler, self).as_sql(*args, **kwargs)
+        # SKIP LOCKED (before Django 1.11) and WAIT of django_hana.locking.LockingQuerySet
+        skip_locked = getattr(self.query, 'select_for_update_skip_locked', False)
+        wait = getattr(self.query, 'select_for_update_wait', None)
+        if (skip_locked or wait is not None) and result.endswith(' FOR UPDATE'):
+            result = '%s %s' % (
+                result[:-len(' FOR UPDATE')], self.connection.ops.for_update_sql(skip_locked=skip_locked, wait=wait),
+            )
         update_params = self.connection.ops.modify_params(params)
         return result, update_params
 
@@ -27,7 +162,9 @@ class SQLInsertCompiler(compiler.SQLInsertCompiler, SQLCompiler):
     def as_sql(self):
         qn = self.connection.ops.quote_name
         opts = self.query.model._meta
-        result = ['INSERT INTO %s' % qn(opts.db_table)]
+        # see django_hana.bulk.UpsertQuery
+        upsert = getattr(self.query, 'upsert', False)
+        result = ['%s %s' % ('UPSERT' if upsert else 'INSERT INTO', qn(opts.db_table))]
 
         has_fields = bool(self.query.fields)
         fields = self.query.fields if has_fields else [opts.pk]
@@ -72,22 +209,64 @@ class SQLInsertCompiler(compiler.SQLInsertCompiler, SQLCompiler):
         params = self.connection.ops.modify_insert_params(placeholders, params)
         params = self.connection.ops.modify_params(params)
 
-        can_bulk = (
-            not any(hasattr(field, 'get_placeholder') for field in fields)
-            and self.connection.features.has_bulk_insert
-        )
-
-        if can_bulk and len(params) > 1:
-            placeholders = ['%s'] * len(fields)
-            return [
-                (' '.join(result + ['VALUES (' + seq_func + '%s)' % ', '.join(placeholders)]), params)
-            ]
+        if not self.connection.features.has_bulk_insert:
+            return [(self.values_sql(result, fields, p, seq_func), vals) for p, vals in zip(placeholders, params)]
 
+        # Rows with the same placeholders are inserted with one statement (executemany). Fields with custom
+        # placeholders (e.g. geometries) use the same placeholder for all non-NULL values.
+        rows_by_placeholders = OrderedDict()
+        for p, vals in zip(placeholders, params):
+            rows_by_placeholders.setdefault(tuple(p), []).append(vals)
         return [
-            (' '.join(result + ['VALUES (' + seq_func + '%s)' % ', '.join(p)]), vals)
-            for p, vals in zip(placeholders, params)
+            (self.values_sql(result, fields, list(p), seq_func), tuple(rows) if len(rows) > 1 else rows[0])
+            for p, rows in rows_by_placeholders.items()
         ]
 
+    def values_sql(self, result, fields, placeholders, seq_func):
+        upsert_keys = getattr(self.query, 'upsert_keys', None)
+        if upsert_keys:
+            return self.merge_sql(fields, placeholders, upsert_keys, seq_func)
+        sql = ' '.join(result + ['VALUES (' + seq_func + '%s)' % ', '.join(placeholders)])
+        if getattr(self.query, 'upsert', False):
+            sql += ' WITH PRIMARY KEY'
+        return sql
+
+    def merge_sql(self, fields, placeholders, keys, seq_func):
+        """
+        Upsert a row by the given key fields instead of the primary key, i.e. update the row with the same key
+        values or insert a new one.
+        """
+        qn = self.connection.ops.quote_name
+        opts = self.query.model._meta
+        table = qn(opts.db_table)
+        key_columns = [opts.get_field(key).column for key in keys]
+
+        source = ', '.join(
+            '%s AS %s' % (
+                placeholder if hasattr(field, 'get_placeholder') else 'CAST(%s AS %s)' % (
+                    placeholder, field.db_type(self.connection),
+                ),
+                qn(field.column),
+            )
+            for field, placeholder in zip(fields, placeholders)
+        )
+        condition = ' AND '.join('%s.%s = source.%s' % (table, qn(column), qn(column)) for column in key_columns)
+        updates = ', '.join(
+            '%s.%s = source.%s' % (table, qn(field.column), qn(field.column))
+            for field in fields
+            if field.column not in key_columns and not field.primary_key
+        )
+
+        insert_columns = [qn(field.column) for field in fields]
+        insert_values = seq_func + ', '.join('source.%s' % column for column in insert_columns)
+        if seq_func:
+            insert_columns.insert(0, opts.auto_field.db_column or opts.auto_field.column)
+
+        sql = 'MERGE INTO %s USING (SELECT %s FROM DUMMY) source ON (%s)' % (table, source, condition)
+        if updates:
+            sql += ' WHEN MATCHED THEN UPDATE SET %s' % updates
+        return sql + ' WHEN NOT MATCHED THEN INSERT (%s) VALUES (%s)' % (', '.join(insert_columns), insert_values)
+
     def execute_sql(self, return_id=False):
         assert not (return_id and len(self.query.objs) != 1)
         self.return_id = return_id
@@ -54,7 +54,7 @@ class DatabaseCreation(BaseDatabaseCreation):
 
         # check which column type
         store_type = self.connection.settings_dict.get('DEFAULT_MODEL_STORE', 'COLUMN')
-        table_type = django_hana.MODEL_STORE.get(model.__name__, store_type)
+        table_type = django_hana.get_model_store(model, store_type)
 
         full_statement = [style.SQL_KEYWORD('CREATE ' + table_type + ' TABLE') + ' ' +
                           style.SQL_TABLE(qn(opts.db_table)) + ' (']
@@ -117,6 +117,9 @@ class DatabaseCreation(BaseDatabaseCreation):
         qn = self.connection.ops.quote_name
 
         cursor = self.connection.cursor()
+        if keepdb and self._schema_exists(cursor, test_database_name):
+            # The schema is kept from a previous run, don't touch the catalog at all.
+            return test_database_name
         try:
             cursor.execute(
                 'CREATE SCHEMA %s %s' % (qn(test_database_name), suffix))
@@ -148,7 +151,50 @@ class DatabaseCreation(BaseDatabaseCreation):
 
         return test_database_name
 
-    def _destroy_test_db(self, test_database_name, verbosity):
+    def _clone_test_db(self, number, verbosity, keepdb=False):
+        """
+        Internal implementation - duplicate the test db tables.
+        Every clone is a schema next to the (already migrated) test schema. Tables are copied including their data
+        with CREATE TABLE ... LIKE, sequences are recreated with the start value the template currently resets to.
+        """
+        qn = self.connection.ops.quote_name
+        source_database_name = self.connection.settings_dict['NAME']
+        target_database_name = self.get_test_db_clone_settings(number)['NAME']
+
+        cursor = self.connection.cursor()
+        if self._schema_exists(cursor, target_database_name):
+            if keepdb:
+                return
+            if verbosity >= 1:
+                print('Destroying old test database clone "%s"...' % target_database_name)
+            self._destroy_test_db(target_database_name, verbosity, close_connection=False)
+        cursor.execute('CREATE SCHEMA %s %s' % (qn(target_database_name), self.sql_table_creation_suffix()))
+
+        cursor.execute(
+            'SELECT table_name FROM tables WHERE schema_name = %s AND is_temporary = %s',
+            [self._schema_name(source_database_name), 'FALSE']
+        )
+        for row in cursor.fetchall():
+            cursor.execute('CREATE TABLE %s.%s LIKE %s.%s WITH DATA' % (
+                qn(target_database_name), qn(row[0]), qn(source_database_name), qn(row[0]),
+            ))
+
+        cursor.execute(
+            'SELECT sequence_name, reset_by_query FROM sequences WHERE schema_name = %s',
+            [self._schema_name(source_database_name)]
+        )
+        for sequence_name, reset_by_query in cursor.fetchall():
+            sequence = '%s.%s' % (qn(target_database_name), qn(sequence_name))
+            if not reset_by_query:
+                cursor.execute('CREATE SEQUENCE %s' % sequence)
+                continue
+            # The reset query only references unqualified tables, so it is evaluated against the template schema
+            # to get the start value and resolves to the clone's own tables when the sequence is reset later on.
+            cursor.execute(reset_by_query)
+            start_value = cursor.fetchone()[0]
+            cursor.execute('CREATE SEQUENCE %s START WITH %d RESET BY %s' % (sequence, start_value, reset_by_query))
+
+    def _destroy_test_db(self, test_database_name, verbosity, close_connection=True):
         """
         Internal implementation - remove the test db tables.
         """
@@ -158,9 +204,37 @@ class DatabaseCreation(BaseDatabaseCreation):
         # connected to it.
         cursor = self.connection.cursor()
         # Wait to avoid "database is being accessed by other users" errors.
-        time.sleep(1)
+        self._wait_for_sessions(cursor, test_database_name)
         cursor.execute('DROP SCHEMA %s CASCADE' % self.connection.ops.quote_name(test_database_name))
-        self.connection.close()
+        if close_connection:
+            self.connection.close()
+
+    def _wait_for_sessions(self, cursor, schema_name):
+        """
+        Block until no other session uses the schema anymore (e.g. connections of parallel test workers that are
+        still shutting down). Gives up after TEST['SESSION_TIMEOUT'] seconds and lets the DROP fail loudly.
+        """
+        timeout = self.connection.settings_dict.get('TEST', {}).get('SESSION_TIMEOUT', 10)
+        deadline = time.time() + timeout
+        delay = 0.05
+        while True:
+            cursor.execute(
+                'SELECT COUNT(*) FROM m_connections '
+                'WHERE current_schema_name = %s AND connection_id <> CURRENT_CONNECTION',
+                [self._schema_name(schema_name)]
+            )
+            if not cursor.fetchone()[0] or time.time() >= deadline:
+                return
+            time.sleep(delay)
+            delay = min(delay * 2, 1)
+
+    def _schema_exists(self, cursor, schema_name):
+        cursor.execute('SELECT (1) AS a FROM schemas WHERE schema_name = %s', [self._schema_name(schema_name)])
+        return cursor.fetchone() is not None
+
+    def _schema_name(self, schema_name):
+        # Catalog views store the unquoted (upper case) identifier
+        return self.connection.ops.quote_name(schema_name).replace('"', '')
 
     def sql_indexes_for_field(self, model, f, style):
         """
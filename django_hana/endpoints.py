@@ -0,0 +1,171 @@
+"""
+Selection of the endpoint to connect to if HOST lists several, e.g. the nodes of a scale-out system:
+
+    'HOST': ['hana1:30015', 'hana2:30015', 'hana3'],  # or 'hana1:30015,hana2:30015,hana3'
+    'PORT': '30015',                                   # for endpoints without port
+    'CONNECT_TIMEOUT': 2,                              # seconds per endpoint
+    'PROBE_INTERVAL': 30,                              # seconds between background probes, None disables them
+
+Connections go to the healthy endpoint with the lowest latency, measured by connecting and by background probes
+(TCP connects). Endpoints that fail are quarantined, for twice as long after each consecutive failure, and are only
+tried again if no other endpoint is healthy.
+"""
+import logging
+import socket
+import threading
+from time import time
+
+from django.core.exceptions import ImproperlyConfigured
+from django.utils import six
+
+logger = logging.getLogger('django.db.backends')
+
+
+def parse_endpoints(host, port):
+    """
+    Return the (host, port) tuples of a HOST setting, i.e. a host, a list of hosts or a comma-separated string.
+    """
+    if not host:
+        raise ImproperlyConfigured('settings.DATABASES is improperly configured. Please supply the HOST value.')
+    if isinstance(host, six.string_types):
+        host = host.split(',')
+    endpoints = []
+    for endpoint in host:
+        endpoint = endpoint.strip()
+        if endpoint.count(':') == 1:
+            endpoint, endpoint_port = endpoint.split(':')
+        else:
+            endpoint_port = port
+        if not endpoint_port:
+            raise ImproperlyConfigured(
+                'settings.DATABASES is improperly configured. Please supply the PORT value or a port for host %r '
+                '(host:port).' % endpoint
+            )
+        endpoints.append((endpoint, int(endpoint_port)))
+    return endpoints
+
+
+class EndpointState(object):
+    def __init__(self):
+        self.latency = None
+        self.failures = 0
+        self.quarantined_until = 0
+
+
+class EndpointPool(object):
+    # Quarantine after the first failure (in seconds) and its maximum
+    min_quarantine = 1
+    max_quarantine = 60
+    # Weight of a new latency measurement
+    latency_weight = 0.3
+
+    def __init__(self, endpoints, connect_timeout=None, probe_interval=None):
+        self.lock = threading.Lock()
+        self.endpoints = list(endpoints)
+        self.connect_timeout = connect_timeout
+        self.probe_interval = probe_interval
+        self.states = dict((endpoint, EndpointState()) for endpoint in self.endpoints)
+        self.prober = None
+        self.stopped = threading.Event()
+
+    def candidates(self):
+        """
+        Return the endpoints in the order they should be tried: the healthy ones by latency (unmeasured ones last, in
+        configured order), then the quarantined ones by end of quarantine.
+        """
+        now = time()
+        with self.lock:
+            healthy = [endpoint for endpoint in self.endpoints if self.states[endpoint].quarantined_until <= now]
+            quarantined = [endpoint for endpoint in self.endpoints if endpoint not in healthy]
+            healthy.sort(key=lambda endpoint: (self.states[endpoint].latency is None, self.states[endpoint].latency))
+            quarantined.sort(key=lambda endpoint: self.states[endpoint].quarantined_until)
+        return healthy + quarantined
+
+    def record_success(self, endpoint, latency):
+        with self.lock:
+            state = self.states[endpoint]
+            if state.latency is None:
+                state.latency = latency
+            else:
+                state.latency += self.latency_weight * (latency - state.latency)
+            state.failures = 0
+            state.quarantined_until = 0
+
+    def record_failure(self, endpoint):
+        with self.lock:
+            state = self.states[endpoint]
+            quarantine = min(self.min_quarantine * 2 ** state.failures, self.max_quarantine)
+            state.failures += 1
+            state.quarantined_until = time() + quarantine
+        logger.warning('Endpoint %s:%s failed, quarantined for %s seconds.', endpoint[0], endpoint[1], quarantine)
+
+    def probe(self):
+        """
+        Measure the latency of all endpoints by opening a TCP connection.
+        """
+        for endpoint in self.endpoints:
+            start = time()
+            try:
+                socket.create_connection(endpoint, self.connect_timeout).close()
+            except (socket.error, socket.timeout):
+                self.record_failure(endpoint)
+            else:
+                self.record_success(endpoint, time() - start)
+
+    def start_probing(self):
+        """
+        Start the background probes (once), if there is a choice of endpoints.
+        """
+        with self.lock:
+            if self.prober is not None or not self.probe_interval or len(self.endpoints) < 2:
+                return
+            self.prober = threading.Thread(target=self._probe_forever, name='django_hana endpoint prober')
+            self.prober.daemon = True
+        self.prober.start()
+
+    def stop_probing(self):
+        """
+        Stop the background probes, e.g. when the pool is replaced after a settings change.
+        """
+        self.stopped.set()
+
+    def _probe_forever(self):
+        while not self.stopped.wait(self.probe_interval):
+            self.probe()
+
+    def connect(self, connect, errors):
+        """
+        Connect to the best endpoint with the given function, which is called with host and port. The given errors
+        are taken as failure of the endpoint, the last one is raised if no endpoint is reachable.
+        """
+        self.start_probing()
+        error = None
+        for host, port in self.candidates():
+            start = time()
+            try:
+                connection = connect(host, port)
+            except errors as e:
+                error = e
+                self.record_failure((host, port))
+            else:
+                self.record_success((host, port), time() - start)
+                return connection
+        raise error
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_endpoint_pool(name, host, port, connect_timeout=None, probe_interval=None):
+    """
+    Return the endpoint pool of a connection name (the database alias), shared by the connections of all threads.
+    """
+    endpoints = parse_endpoints(host, port)
+    with _pools_lock:
+        pool = _pools.get(name)
+        if pool is None or pool.endpoints != endpoints:
+            if pool is not None:
+                pool.stop_probing()
+            pool = _pools[name] = EndpointPool(endpoints, connect_timeout, probe_interval)
+        return pool
@@ -0,0 +1,23 @@
+from pyhdb.compat import byte_type
+
+
+class HanaWKBAdapter(object):
+    """
+    Adapts geometries to well-known binary, which is passed as binary parameter to ST_GeomFromWKB. It is smaller than
+    the well-known text and SAP HANA doesn't have to parse text.
+    """
+
+    def __init__(self, geom):
+        self.wkb = byte_type(geom.wkb)
+        self.srid = geom.srid
+
+    def __eq__(self, other):
+        if not isinstance(other, HanaWKBAdapter):
+            return False
+        return self.wkb == other.wkb and self.srid == other.srid
+
+    def __hash__(self):
+        return hash((bytes(self.wkb), self.srid))
+
+    def __str__(self):
+        return ''.join('{:02x}'.format(x) for x in bytearray(self.wkb))
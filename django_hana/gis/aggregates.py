@@ -0,0 +1,14 @@
+"""
+Spatial aggregates of SAP HANA that GeoDjango doesn't provide. GeoDjango's Collect, Extent and Union aggregates are
+supported as well:
+
+    Store.objects.aggregate(center=Centroid('location'), bounds=Extent('location'))
+"""
+from django.contrib.gis.db.models.aggregates import GeoAggregate
+
+
+class Centroid(GeoAggregate):
+    """
+    The centroid of all geometries (ST_CentroidAggr), which are weighted by their area (polygons) or length (lines).
+    """
+    name = 'Centroid'
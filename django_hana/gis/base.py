@@ -0,0 +1,27 @@
+"""
+SAP HANA database backend for GeoDjango.
+"""
+from django.contrib.gis.db.backends.base.features import BaseSpatialFeatures
+
+from django_hana.base import DatabaseFeatures as HanaDatabaseFeatures
+from django_hana.base import DatabaseWrapper as HanaDatabaseWrapper
+from django_hana.gis.metadata import get_spatial_metadata
+from django_hana.gis.operations import HanaSpatialOperations
+
+
+class DatabaseFeatures(BaseSpatialFeatures, HanaDatabaseFeatures):
+    pass
+
+
+class DatabaseWrapper(HanaDatabaseWrapper):
+    def __init__(self, *args, **kwargs):
+        super(DatabaseWrapper, self).__init__(*args, **kwargs)
+        self.features = DatabaseFeatures(self)
+        self.ops = HanaSpatialOperations(self)
+        # spatial reference systems and geometry columns, shared by all connections of the process
+        self.spatial_metadata = get_spatial_metadata(self.alias)
+
+    def connect(self):
+        super(DatabaseWrapper, self).connect()
+        if self.settings_dict.get('PRELOAD_SPATIAL_METADATA') and not self.spatial_metadata.loaded:
+            self.spatial_metadata.preload()
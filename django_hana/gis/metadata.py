@@ -0,0 +1,99 @@
+"""
+Process-wide cache of the spatial reference systems (ST_SPATIAL_REFERENCE_SYSTEMS) and of the SRIDs of the geometry
+columns (ST_GEOMETRY_COLUMNS, e.g. for vector tiles), so distance lookups, unit conversions and geodetic checks don't
+query the catalog:
+
+    connection.spatial_metadata.preload()   # e.g. when a worker starts
+    connection.spatial_metadata.refresh()   # e.g. after creating a spatial reference system
+
+With 'PRELOAD_SPATIAL_METADATA': True in the database settings, the metadata is loaded on the first connection of the
+process. Spatial reference systems that aren't cached yet are looked up (and cached) one by one.
+"""
+import threading
+
+from django.contrib.gis.db.models import fields
+
+
+class SpatialMetadata(object):
+    def __init__(self, alias):
+        self.lock = threading.Lock()
+        self.alias = alias
+        self.spatial_ref_sys = {}
+        self.geometry_columns = None
+
+    @property
+    def loaded(self):
+        return self.geometry_columns is not None
+
+    def _spatial_ref_sys_queryset(self):
+        from django_hana.gis.models import HanaSpatialRefSys
+        return HanaSpatialRefSys.objects.using(self.alias)
+
+    def _geometry_columns(self):
+        from django.db import connections
+        from django_hana.gis.models import HanaGeometryColumns
+        schema = connections[self.alias].settings_dict['NAME'].upper()
+        rows = HanaGeometryColumns.objects.using(self.alias).filter(schema_name=schema).values_list(
+            'table_name', 'column_name', 'srs_id',
+        )
+        return dict(((table, column), srid) for table, column, srid in rows)
+
+    def preload(self):
+        """
+        Load all spatial reference systems and the geometry columns of the schema.
+        """
+        spatial_ref_sys = dict((srs.srid, srs) for srs in self._spatial_ref_sys_queryset())
+        geometry_columns = self._geometry_columns()
+        with self.lock:
+            self.spatial_ref_sys.update(spatial_ref_sys)
+            self.geometry_columns = geometry_columns
+
+    def clear(self):
+        with self.lock:
+            self.spatial_ref_sys = {}
+            self.geometry_columns = None
+        # GeoDjango keeps the units and spheroids of the SRIDs it has looked up per alias
+        fields._srid_cache.pop(self.alias, None)
+
+    def refresh(self):
+        self.clear()
+        self.preload()
+
+    def get_spatial_ref_sys(self, srid):
+        """
+        Return the HanaSpatialRefSys of the SRID (raises HanaSpatialRefSys.DoesNotExist for unknown SRIDs).
+        """
+        with self.lock:
+            srs = self.spatial_ref_sys.get(srid)
+        if srs is None:
+            srs = self._spatial_ref_sys_queryset().get(srs_id=srid)
+            with self.lock:
+                self.spatial_ref_sys[srid] = srs
+        return srs
+
+    def get_column_srid(self, table, column):
+        """
+        Return the SRID of a geometry column or None if the column isn't known.
+        """
+        with self.lock:
+            geometry_columns = self.geometry_columns
+        if geometry_columns is None:
+            geometry_columns = self._geometry_columns()
+            with self.lock:
+                self.geometry_columns = geometry_columns
+        # the local dict stays valid if another thread clears the cache meanwhile
+        return geometry_columns.get((table.upper(), column.upper()))
+
+
+_metadata = {}
+_metadata_lock = threading.Lock()
+
+
+def get_spatial_metadata(alias):
+    """
+    Return the spatial metadata shared by the connections of all threads to the database alias.
+    """
+    with _metadata_lock:
+        if alias not in _metadata:
+            _metadata[alias] = SpatialMetadata(alias)
+        return _metadata[alias]
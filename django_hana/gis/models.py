@@ -2,6 +2,8 @@ from django.contrib.gis.db import models
 from django.contrib.gis.db.backends.base.models import SpatialRefSysMixin
 from django.utils.encoding import python_2_unicode_compatible
 
+from django_hana.gis.metadata import get_spatial_metadata
+
 
 @python_2_unicode_compatible
 class HanaGeometryColumns(models.Model):
@@ -40,12 +42,20 @@ class HanaGeometryColumns(models.Model):
         return '%s - %s (SRID: %s)' % (self.table_name, self.column_name, self.srid)
 
 
+class SpatialRefSysQuerySet(models.QuerySet):
+    def get(self, *args, **kwargs):
+        # GeoDjango looks up the units and spheroid of a field by srid, see django_hana.gis.metadata
+        if not args and list(kwargs) == ['srid'] and not self.query.where:
+            return get_spatial_metadata(self.db).get_spatial_ref_sys(kwargs['srid'])
+        return super(SpatialRefSysQuerySet, self).get(*args, **kwargs)
+
+
 class HanaSpatialRefSys(models.Model, SpatialRefSysMixin):
     """
     Maps to the SAP HANA SYS.ST_SPATIAL_REFERENCE_SYSTEMS view.
     """
     owner_name = models.CharField(max_length=256)
-    srs_id = models.IntegerField(null=False)
+    srs_id = models.IntegerField(primary_key=True)
     srs_name = models.CharField(max_length=256, null=False)
     round_earth = models.CharField(max_length=7, null=False)
     axis_order = models.CharField(max_length=12, null=False)
@@ -69,13 +79,17 @@ class HanaSpatialRefSys(models.Model, SpatialRefSysMixin):
     storage_format = models.CharField(max_length=8, null=False)
     definition = models.CharField(max_length=5000)
     transform_definition = models.CharField(max_length=5000)
-    objects = models.GeoManager()
+    objects = SpatialRefSysQuerySet.as_manager()
 
     class Meta:
         app_label = 'gis'
         db_table = 'ST_SPATIAL_REFERENCE_SYSTEMS'
         managed = False
 
+    @property
+    def srid(self):
+        return self.srs_id
+
     @property
     def wkt(self):
         return self.definition
@@ -0,0 +1,37 @@
+"""
+Nearest neighbour queries, e.g. the 5 stores closest to a location within 10 km:
+
+    nearest(Store.objects.filter(open=True), 'location', point, 5, max_distance=10000)
+
+The rows are ordered by their distance, which is annotated as 'distance'. SAP HANA has no index for ordering by
+distance, so pass a max_distance if possible: it becomes a dwithin lookup, whose bounding box prefilter limits the
+rows whose distance is computed.
+"""
+from django.db.models import F, FloatField, Func
+
+
+class DistanceTo(Func):
+    """
+    The distance of a geometry field to the given geometry (ST_Distance), in the units of the field's coordinate
+    system.
+    """
+
+    def __init__(self, expression, geom, **extra):
+        extra.setdefault('output_field', FloatField())
+        super(DistanceTo, self).__init__(expression, **extra)
+        self.geom = geom
+
+    def as_sql(self, compiler, connection):
+        sql, params = compiler.compile(self.source_expressions[0])
+        field = self.source_expressions[0].output_field
+        placeholder = connection.ops.get_geom_placeholder(field, self.geom, compiler)
+        return '%s.ST_DISTANCE(%s)' % (sql, placeholder), list(params) + [connection.ops.Adapter(self.geom)]
+
+
+def nearest(queryset, field, geom, count, max_distance=None, annotation='distance'):
+    """
+    Return the count rows of the queryset nearest to the geometry, ordered by their distance.
+    """
+    if max_distance is not None:
+        queryset = queryset.filter(**{'%s__dwithin' % field: (geom, max_distance)})
+    return queryset.annotate(**{annotation: DistanceTo(F(field), geom)}).order_by(annotation)[:count]
@@ -0,0 +1,206 @@
+from __future__ import unicode_literals
+
+import numbers
+
+from django.contrib.gis.db.backends.base.operations import BaseSpatialOperations
+from django.contrib.gis.db.backends.utils import SpatialOperator
+from django.contrib.gis.db.models import aggregates
+from django.contrib.gis.geometry.backend import Geometry
+from django.contrib.gis.geos import Point
+from django.contrib.gis.measure import Distance
+from django.db.models.expressions import Col
+
+from django_hana.gis.adapter import HanaWKBAdapter
+from django_hana.operations import DatabaseOperations
+
+
+class HanaSpatialOperator(SpatialOperator):
+    sql_template = '%(lhs)s.%(func)s(%(rhs)s)'
+
+
+class HanaIsOneSpatialOperator(SpatialOperator):
+    sql_template = '%(lhs)s.%(func)s(%(rhs)s) = 1'
+
+
+class HanaIsValueSpatialOperator(SpatialOperator):
+    sql_template = '%(lhs)s.%(func)s(%(rhs)s) %(op)s %%s'
+
+
+class HanaWithinDistanceOperator(SpatialOperator):
+    """
+    Tests the distance with ST_WithinDistance (and, for op='<', excludes the rows at exactly the distance). If the
+    lookup compares a column with a geometry and a distance in the units of a planar coordinate system, the rows are
+    prefiltered by the bounding box of the geometry enlarged by the distance (ST_IntersectsRect), which SAP HANA
+    evaluates much cheaper than distances.
+    """
+    sql_template = '%(lhs)s.ST_WITHINDISTANCE(%(rhs)s, %(value)s) = 1'
+
+    def as_sql(self, connection, lookup, template_params, sql_params):
+        # Django < 1.10 doesn't pass the placeholder of the distance
+        template_params = dict(template_params, value=template_params.get('value', '%s'))
+        sql = self.sql_template % template_params
+        params = list(sql_params)
+        if self.op == '<':
+            sql += ' AND %(lhs)s.ST_DISTANCE(%(rhs)s) < %(value)s' % template_params
+            params += sql_params
+
+        field = lookup.lhs.output_field
+        geom = lookup.rhs[0]
+        distance = sql_params[-1]
+        if (
+            isinstance(lookup.lhs, Col)
+            and isinstance(geom, Geometry)
+            and template_params['value'] == '%s'
+            and isinstance(distance, numbers.Number)
+            and not field.geodetic(connection)
+        ):
+            xmin, ymin, xmax, ymax = geom.extent
+            corners = [Point(xmin - distance, ymin - distance), Point(xmax + distance, ymax + distance)]
+            sql = '%s.ST_INTERSECTSRECT(%s) = 1 AND %s' % (
+                template_params['lhs'],
+                ', '.join(connection.ops.get_geom_placeholder(field, corner, None) for corner in corners),
+                sql,
+            )
+            params = [connection.ops.Adapter(corner) for corner in corners] + params
+        return sql, params
+
+
+class HanaSpatialOperations(BaseSpatialOperations, DatabaseOperations):
+    Adapter = HanaWKBAdapter
+    Adaptor = Adapter  # Backwards-compatibility alias.
+
+    gis_operators = {
+        'contains': HanaIsOneSpatialOperator(func='ST_CONTAINS'),
+        'coveredby': HanaIsOneSpatialOperator(func='ST_COVEREDBY'),
+        'covers': HanaIsOneSpatialOperator(func='ST_COVERS'),
+        'crosses': HanaIsOneSpatialOperator(func='ST_CROSSES'),
+        'disjoint': HanaIsOneSpatialOperator(func='ST_DISJOINT'),
+        'distance': HanaIsValueSpatialOperator(func='ST_DISTANCE', op='='),
+        'distance_gt': HanaIsValueSpatialOperator(func='ST_DISTANCE', op='>'),
+        'distance_gte': HanaIsValueSpatialOperator(func='ST_DISTANCE', op='>='),
+        'distance_lt': HanaWithinDistanceOperator(op='<'),
+        'distance_lte': HanaWithinDistanceOperator(op='<='),
+        'dwithin': HanaWithinDistanceOperator(op='<='),
+        'equals': HanaIsOneSpatialOperator(func='ST_EQUALS'),
+        'exact': HanaIsOneSpatialOperator(func='ST_EQUALS'),
+        'intersects': HanaIsOneSpatialOperator(func='ST_INTERSECTS'),
+        'overlaps': HanaIsOneSpatialOperator(func='ST_OVERLAPS'),
+        'same_as': HanaIsOneSpatialOperator(func='ST_EQUALS'),
+        'relate': HanaIsOneSpatialOperator(func='ST_RELATE'),
+        'touches': HanaIsOneSpatialOperator(func='ST_TOUCHES'),
+        'within': HanaIsValueSpatialOperator(func='ST_WITHINDISTANCE', op='<='),
+    }
+
+    # SAP HANA has no 3D extent and no aggregate building a line from points
+    disallowed_aggregates = (aggregates.Extent3D, aggregates.MakeLine)
+
+    aggregate_functions = {
+        'Centroid': 'ST_CENTROIDAGGR',
+        'Collect': 'ST_COLLECTAGGR',
+        'Extent': 'ST_ENVELOPEAGGR',
+        'Union': 'ST_UNIONAGGR',
+    }
+
+    def modify_params(self, params):
+        # the params of inserts are lists of row values
+        return tuple(
+            [self.sanitize_geometry(value) for value in param] if isinstance(param, list)
+            else self.sanitize_geometry(param)
+            for param in params
+        )
+
+    def sanitize_geometry(self, param):
+        if type(param) is HanaWKBAdapter:
+            return param.wkb
+        return param
+
+    def get_db_converters(self, expression):
+        converters = super(HanaSpatialOperations, self).get_db_converters(expression)
+        internal_type = expression.output_field.get_internal_type()
+        geometry_fields = (
+            'PointField', 'LineStringField', 'PolygonField',
+            'MultiPointField', 'MultiLineStringField', 'MultiPolygonField',
+        )
+        if internal_type in geometry_fields:
+            converters.append(self.convert_geometry_value)
+        if hasattr(expression.output_field, 'geom_type'):
+            converters.append(self.convert_geometry)
+        return converters
+
+    def convert_geometry_value(self, value, expression, connection, context):
+        if value is not None:
+            value = ''.join('{:02x}'.format(x) for x in value)
+        return value
+
+    def convert_geometry(self, value, expression, connection, context):
+        if value:
+            value = Geometry(value)
+            if 'transformed_srid' in context:
+                value.srid = context['transformed_srid']
+        return value
+
+    def spatial_aggregate_name(self, agg_name):
+        return self.aggregate_functions[agg_name]
+
+    def convert_geom(self, value, geo_field):
+        """
+        Convert the result of a spatial aggregate to a geometry.
+        """
+        if not value:
+            return None
+        if not isinstance(value, Geometry):
+            value = Geometry(self.convert_geometry_value(value, None, None, None))
+        if geo_field is not None:
+            value.srid = geo_field.srid
+        return value
+
+    def convert_extent(self, box, srid):
+        """
+        Convert the envelope (a rectangle) of ST_EnvelopeAggr to (xmin, ymin, xmax, ymax).
+        """
+        envelope = self.convert_geom(box, None)
+        return envelope.extent if envelope else None
+
+    def _geo_db_type(self, f):
+        return 'ST_%s' % f.geom_type
+
+    def geo_db_type(self, f):
+        internal_type = self._geo_db_type(f)
+        return internal_type if f.geom_type == 'POINT' else 'ST_GEOMETRY'
+
+    def get_distance(self, f, value, lookup_type, **kwargs):
+        if not value:
+            return []
+        value = value[0]
+        if isinstance(value, Distance):
+            if f.geodetic(self.connection):
+                raise ValueError('SAP HANA does not support distance queries on '
+                                 'geometry fields with a geodetic coordinate system. '
+                                 'Distance objects; use a numeric value of your '
+                                 'distance in degrees instead.')
+            else:
+                dist_param = getattr(value, Distance.unit_attname(f.units_name(self.connection)))
+        else:
+            dist_param = value
+        return [dist_param]
+
+    def get_geom_placeholder(self, f, value, compiler):
+        if value is None:
+            placeholder = '%s'
+        else:
+            # the same placeholder for all geometries of a field, so inserts can be batched with executemany
+            placeholder = 'ST_GEOMFROMWKB(%%s, %s)' % f.srid
+
+        if hasattr(value, 'as_sql'):
+            sql, _ = compiler.compile(value)
+            placeholder = placeholder % sql
+
+        return placeholder
+
+    def geometry_columns(self):
+        from django_hana.gis.models import HanaGeometryColumns
+        return HanaGeometryColumns
+
+    def spatial_ref_sys(self):
+        from django_hana.gis.models import HanaSpatialRefSys
+        return HanaSpatialRefSys
@@ -0,0 +1,345 @@
+"""
+Mapbox vector tiles (https://github.com/mapbox/vector-tile-spec, version 2) of a queryset:
+
+    tile = vector_tile(Road.objects.filter(kind='highway'), 'geometry', z, x, y, properties=['name'])
+    return HttpResponse(tile, content_type='application/vnd.mapbox-vector-tile')
+
+SAP HANA selects the rows intersecting the tile (ST_IntersectsRect), transforms their geometries to web mercator
+(SRID 3857), clips them to the tile and its buffer, simplifies them to the tile resolution and snaps them to the pixel
+grid. Python only encodes the resulting pixel coordinates and the properties, no geometries are processed with GEOS.
+"""
+from __future__ import division
+
+import struct
+
+from django.db import connections
+from django.db.models import BinaryField, F, Func, IntegerField
+from django.utils import six
+from django.utils.encoding import force_bytes
+
+WEB_MERCATOR = 3857
+WEB_MERCATOR_EXTENT = 20037508.342789244
+
+TILE_FILTER = 'hana_tile_filter'
+TILE_GEOMETRY = 'hana_tile_geometry'
+
+POINT, LINESTRING, POLYGON = 1, 2, 3
+MOVE_TO, LINE_TO, CLOSE_PATH = 1, 2, 7
+
+
+def tile_bounds(z, x, y):
+    """
+    Return (xmin, ymin, xmax, ymax) of a tile in web mercator.
+    """
+    size = 2 * WEB_MERCATOR_EXTENT / 2 ** z
+    xmin = -WEB_MERCATOR_EXTENT + x * size
+    ymax = WEB_MERCATOR_EXTENT - y * size
+    return xmin, ymax - size, xmin + size, ymax
+
+
+def _web_mercator_sql(wkt_placeholder, srid):
+    sql = 'ST_GEOMFROMTEXT(%s, %s)' % (wkt_placeholder, WEB_MERCATOR)
+    return sql if srid == WEB_MERCATOR else '%s.ST_TRANSFORM(%s)' % (sql, srid)
+
+
+class IntersectsTile(Func):
+    """
+    1 if the geometry intersects the given web mercator bounds (converted to the SRID of the geometry).
+    """
+
+    def __init__(self, expression, srid, bounds, **extra):
+        extra.setdefault('output_field', IntegerField())
+        super(IntersectsTile, self).__init__(expression, **extra)
+        self.srid = srid
+        self.bounds = bounds
+
+    def as_sql(self, compiler, connection):
+        sql, params = compiler.compile(self.source_expressions[0])
+        xmin, ymin, xmax, ymax = self.bounds
+        corner = _web_mercator_sql('%s', self.srid)
+        return '%s.ST_INTERSECTSRECT(%s, %s)' % (sql, corner, corner), list(params) + [
+            'POINT(%r %r)' % (xmin, ymin), 'POINT(%r %r)' % (xmax, ymax),
+        ]
+
+
+class TileGeometry(Func):
+    """
+    The geometry in web mercator, clipped to the given bounds, simplified and snapped to the given resolution.
+    """
+
+    def __init__(self, expression, srid, bounds, resolution, **extra):
+        extra.setdefault('output_field', BinaryField())
+        super(TileGeometry, self).__init__(expression, **extra)
+        self.srid = srid
+        self.bounds = bounds
+        self.resolution = resolution
+
+    def as_sql(self, compiler, connection):
+        sql, params = compiler.compile(self.source_expressions[0])
+        if self.srid != WEB_MERCATOR:
+            sql = '%s.ST_TRANSFORM(%s)' % (sql, WEB_MERCATOR)
+        xmin, ymin, xmax, ymax = self.bounds
+        clip = 'POLYGON((%r %r, %r %r, %r %r, %r %r, %r %r))' % (
+            xmin, ymin, xmax, ymin, xmax, ymax, xmin, ymax, xmin, ymin,
+        )
+        sql = '%s.ST_INTERSECTION(ST_GEOMFROMTEXT(%%s, %s)).ST_SIMPLIFY(%%s).ST_SNAPTOGRID(%%s)' % (sql, WEB_MERCATOR)
+        return sql, list(params) + [clip, self.resolution, self.resolution]
+
+
+def _column_srid(queryset, field):
+    """
+    Return the SRID the geometries of a field are stored in: that of the geometry column (see
+    django_hana.gis.metadata), which may differ from the field's for tables not created by Django, else the field's.
+    """
+    model_field = queryset.model._meta.get_field(field)
+    metadata = connections[queryset.db].spatial_metadata
+    return metadata.get_column_srid(queryset.model._meta.db_table, model_field.column) or model_field.srid
+
+
+def vector_tile(queryset, field, z, x, y, properties=(), layer=None, extent=4096, buffer=64):
+    """
+    Return the encoded tile z/x/y with one layer (named after the model by default) containing a feature per row of
+    the queryset, with the primary key as id and the given fields as properties.
+    """
+    xmin, ymin, xmax, ymax = tile_bounds(z, x, y)
+    resolution = (xmax - xmin) / extent
+    margin = buffer * resolution
+    buffered = (xmin - margin, ymin - margin, xmax + margin, ymax + margin)
+    srid = _column_srid(queryset, field)
+
+    rows = queryset.annotate(**{
+        TILE_FILTER: IntersectsTile(F(field), srid, buffered),
+        TILE_GEOMETRY: TileGeometry(F(field), srid, buffered, resolution),
+    }).filter(**{TILE_FILTER: 1}).values_list('pk', *(list(properties) + [TILE_GEOMETRY]))
+
+    encoder = TileLayerEncoder(layer or queryset.model._meta.model_name, extent, (xmin, ymax), resolution)
+    # annotations are selected after the fields
+    for row in rows:
+        encoder.add_feature(row[0], row[-1], zip(properties, row[1:-1]))
+    return encoder.tile()
+
+
+def _varint(value):
+    out = bytearray()
+    while True:
+        byte = value & 0x7f
+        value >>= 7
+        if value:
+            out.append(byte | 0x80)
+        else:
+            out.append(byte)
+            return bytes(out)
+
+
+def _zigzag(value):
+    return value << 1 if value >= 0 else (-value << 1) - 1
+
+
+def _message_field(number, payload):
+    return _varint(number << 3 | 2) + _varint(len(payload)) + payload
+
+
+def _varint_field(number, value):
+    return _varint(number << 3) + _varint(value)
+
+
+def _packed_field(number, values):
+    return _message_field(number, b''.join(_varint(value) for value in values))
+
+
+def _encode_value(value):
+    if isinstance(value, bool):
+        return _varint_field(7, int(value))
+    elif isinstance(value, six.integer_types):
+        return _varint_field(5, value) if value >= 0 else _varint_field(6, _zigzag(value))
+    elif isinstance(value, float):
+        return _varint(3 << 3 | 1) + struct.pack('<d', value)
+    return _message_field(1, force_bytes(six.text_type(value)))
+
+
+def parse_wkb(data, offset=0):
+    """
+    Return the points, lines and polygons (lists of rings) of a (multi) geometry or geometry collection in WKB (or
+    EWKB, ISO WKB with Z/M) as dict by type, and the offset after the geometry.
+    """
+    endian = '<' if struct.unpack_from('B', data, offset)[0] == 1 else '>'
+    wkb_type = struct.unpack_from(endian + 'I', data, offset + 1)[0]
+    offset += 5
+    if wkb_type & 0x20000000:
+        offset += 4
+    dimensions = 2 + bool(wkb_type & 0x80000000) + bool(wkb_type & 0x40000000)
+    wkb_type &= 0x0fffffff
+    dimensions += {1: 1, 2: 1, 3: 2}.get(wkb_type // 1000, 0)
+    wkb_type %= 1000
+
+    def read_count():
+        return struct.unpack_from(endian + 'I', data, offset)[0], offset + 4
+
+    def read_points(offset, count):
+        points = []
+        for i in range(count):
+            points.append(struct.unpack_from(endian + 'dd', data, offset))
+            offset += 8 * dimensions
+        return points, offset
+
+    parts = {POINT: [], LINESTRING: [], POLYGON: []}
+    if wkb_type == 1:
+        (point,), offset = read_points(offset, 1)
+        # empty points have NaN coordinates
+        if point[0] == point[0]:
+            parts[POINT].append(point)
+    elif wkb_type == 2:
+        count, offset = read_count()
+        line, offset = read_points(offset, count)
+        parts[LINESTRING].append(line)
+    elif wkb_type == 3:
+        count, offset = read_count()
+        rings = []
+        for i in range(count):
+            points, offset = struct.unpack_from(endian + 'I', data, offset)[0], offset + 4
+            ring, offset = read_points(offset, points)
+            rings.append(ring)
+        parts[POLYGON].append(rings)
+    elif wkb_type in (4, 5, 6, 7):
+        count, offset = read_count()
+        for i in range(count):
+            member, offset = parse_wkb(data, offset)
+            for geom_type, items in member.items():
+                parts[geom_type].extend(items)
+    else:
+        raise ValueError('Unsupported WKB geometry type %d.' % wkb_type)
+    return parts, offset
+
+
+class TileLayerEncoder(object):
+    """
+    Encodes the features of a tile layer. Coordinates are converted to pixels of the tile, whose top left corner is
+    origin, with the given resolution (web mercator units per pixel).
+    """
+
+    def __init__(self, name, extent, origin, resolution):
+        self.name = name
+        self.extent = extent
+        self.origin = origin
+        self.resolution = resolution
+        self.features = []
+        self.keys = []
+        self.values = []
+        self.key_indexes = {}
+        self.value_indexes = {}
+
+    def _pixels(self, points):
+        pixels = []
+        for x, y in points:
+            pixel = (
+                int(round((x - self.origin[0]) / self.resolution)),
+                int(round((self.origin[1] - y) / self.resolution)),
+            )
+            if not pixels or pixels[-1] != pixel:
+                pixels.append(pixel)
+        return pixels
+
+    def _ring(self, ring, exterior):
+        pixels = self._pixels(ring)
+        if len(pixels) > 1 and pixels[0] == pixels[-1]:
+            pixels.pop()
+        if len(pixels) < 3:
+            return None
+        # exterior rings are clockwise (positive area with y pointing down), interior rings counter-clockwise
+        area = sum(
+            x1 * y2 - x2 * y1 for (x1, y1), (x2, y2) in zip(pixels, pixels[1:] + pixels[:1])
+        )
+        if not area:
+            return None
+        if (area > 0) != exterior:
+            pixels.reverse()
+        return pixels
+
+    def geometry(self, parts):
+        """
+        Return the type and the commands of the geometry, or (None, None) if nothing is left at the tile resolution.
+        Only the parts of the highest dimension are encoded, e.g. the polygons of a geometry collection.
+        """
+        commands = []
+        cursor = [0, 0]
+
+        def path(pixels, close=False):
+            for index, (x, y) in enumerate(pixels):
+                if index == 0:
+                    commands.append(MOVE_TO | 1 << 3)
+                elif index == 1:
+                    commands.append(LINE_TO | (len(pixels) - 1) << 3)
+                commands.extend((_zigzag(x - cursor[0]), _zigzag(y - cursor[1])))
+                cursor[:] = [x, y]
+            if close:
+                commands.append(CLOSE_PATH | 1 << 3)
+
+        if parts[POLYGON]:
+            for rings in parts[POLYGON]:
+                exterior = self._ring(rings[0], True)
+                if exterior is None:
+                    continue
+                path(exterior, close=True)
+                for ring in rings[1:]:
+                    interior = self._ring(ring, False)
+                    if interior is not None:
+                        path(interior, close=True)
+            return (POLYGON, commands) if commands else (None, None)
+        if parts[LINESTRING]:
+            for line in parts[LINESTRING]:
+                pixels = self._pixels(line)
+                if len(pixels) > 1:
+                    path(pixels)
+            return (LINESTRING, commands) if commands else (None, None)
+        if parts[POINT]:
+            pixels = self._pixels(parts[POINT])
+            commands.append(MOVE_TO | len(pixels) << 3)
+            for x, y in pixels:
+                commands.extend((_zigzag(x - cursor[0]), _zigzag(y - cursor[1])))
+                cursor[:] = [x, y]
+            return POINT, commands
+        return None, None
+
+    def _index(self, item, items, indexes):
+        if item not in indexes:
+            indexes[item] = len(items)
+            items.append(item)
+        return indexes[item]
+
+    def add_feature(self, feature_id, wkb, properties):
+        if not wkb:
+            return
+        geom_type, commands = self.geometry(parse_wkb(bytes(wkb))[0])
+        if geom_type is None:
+            return
+        tags = []
+        for key, value in properties:
+            if value is None:
+                continue
+            tags.append(self._index(key, self.keys, self.key_indexes))
+            # bool is a subclass of int, True and 1 are different values
+            tags.append(self._index((type(value), value), self.values, self.value_indexes))
+        feature = b''
+        if isinstance(feature_id, six.integer_types) and feature_id >= 0:
+            feature += _varint_field(1, feature_id)
+        if tags:
+            feature += _packed_field(2, tags)
+        feature += _varint_field(3, geom_type) + _packed_field(4, commands)
+        self.features.append(feature)
+
+    def layer(self):
+        return b''.join(
+            [_varint_field(15, 2), _message_field(1, force_bytes(self.name))]
+            + [_message_field(2, feature) for feature in self.features]
+            + [_message_field(3, force_bytes(key)) for key in self.keys]
+            + [_message_field(4, _encode_value(value)) for value_type, value in self.values]
+            + [_varint_field(5, self.extent)]
+        )
+
+    def tile(self):
+        """
+        Return the encoded tile, which is empty if the layer has no features.
+        """
+        if not self.features:
+            return b''
+        return _message_field(3, self.layer())
@@ -0,0 +1,67 @@
+"""
+Subtotals with GROUP BY ROLLUP, CUBE and GROUPING SETS, i.e. all aggregation levels in a single query:
+
+    class Sale(models.Model):
+        ...
+        objects = GroupingQuerySet.as_manager()
+
+    Sale.objects.values('region', 'month').annotate(total=Sum('amount')).rollup('region', 'month')
+
+returns the totals per region and month, per region ('month' is None) and the grand total (both are None). The
+'grouping' of each row tells the levels apart: bit n (from the right) is set if the n-th last grouping field is
+aggregated, e.g. 0 for region and month, 1 for the region totals and 3 for the grand total.
+"""
+from django.db.models import Func, IntegerField, QuerySet
+from django.db.models.sql import Query
+
+
+class GroupingId(Func):
+    function = 'GROUPING_ID'
+    contains_aggregate = True
+
+    def __init__(self, *expressions, **extra):
+        extra.setdefault('output_field', IntegerField())
+        super(GroupingId, self).__init__(*expressions, **extra)
+
+
+class GroupingQuery(Query):
+    """
+    A query with a grouping, which is a tuple of the kind (ROLLUP, CUBE or GROUPING SETS) and the sets of field names.
+    """
+    grouping = None
+
+    def clone(self, klass=None, memo=None, **kwargs):
+        kwargs.setdefault('grouping', self.grouping)
+        return super(GroupingQuery, self).clone(klass, memo, **kwargs)
+
+
+class GroupingQuerySet(QuerySet):
+    def _grouping(self, kind, sets, indicator='grouping'):
+        fields = []
+        for grouping_set in sets:
+            for field in grouping_set:
+                if field not in fields:
+                    fields.append(field)
+        clone = self._clone()
+        if indicator:
+            clone = clone.annotate(**{indicator: GroupingId(*fields)})
+        clone.query = clone.query.clone(klass=GroupingQuery, grouping=(kind, tuple(tuple(s) for s in sets)))
+        return clone
+
+    def rollup(self, *fields, **kwargs):
+        """
+        Group by all leading subsets of the fields, e.g. (a, b), (a) and ().
+        """
+        return self._grouping('ROLLUP', [fields], **kwargs)
+
+    def cube(self, *fields, **kwargs):
+        """
+        Group by all subsets of the fields, e.g. (a, b), (a), (b) and ().
+        """
+        return self._grouping('CUBE', [fields], **kwargs)
+
+    def grouping_sets(self, *sets, **kwargs):
+        """
+        Group by each of the given sets of fields, e.g. grouping_sets(('a', 'b'), ('a',), ()).
+        """
+        return self._grouping('GROUPING SETS', sets, **kwargs)
@@ -0,0 +1,36 @@
+"""
+Row locks that don't wait (forever) for other transactions, e.g. for many workers consuming the same queue table:
+
+    class Job(models.Model):
+        ...
+        objects = LockingQuerySet.as_manager()
+
+    with transaction.atomic():
+        jobs = list(Job.objects.filter(state='new').select_for_update(skip_locked=True)[:10])
+
+skip_locked=True (FOR UPDATE IGNORE LOCKED) skips the rows locked by other transactions, so each worker claims a
+different batch. wait=n (FOR UPDATE WAIT n) fails after waiting n seconds for a lock.
+"""
+from django.db.models import QuerySet
+from django.db.models.sql import Query
+
+
+class LockingQuery(Query):
+    select_for_update_skip_locked = False
+    select_for_update_wait = None
+
+    def clone(self, klass=None, memo=None, **kwargs):
+        kwargs.setdefault('select_for_update_skip_locked', self.select_for_update_skip_locked)
+        kwargs.setdefault('select_for_update_wait', self.select_for_update_wait)
+        return super(LockingQuery, self).clone(klass, memo, **kwargs)
+
+
+class LockingQuerySet(QuerySet):
+    def select_for_update(self, nowait=False, skip_locked=False, wait=None):
+        if len([option for option in (nowait, skip_locked, wait is not None) if option]) > 1:
+            raise ValueError('The nowait, skip_locked and wait options are mutually exclusive.')
+        obj = super(LockingQuerySet, self).select_for_update(nowait=nowait)
+        obj.query = obj.query.clone(
+            klass=LockingQuery, select_for_update_skip_locked=skip_locked, select_for_update_wait=wait,
+        )
+        return obj
@@ -0,0 +1,243 @@
+"""
+SAP HANA specific migration operations.
+"""
+from django.db.migrations.operations.base import Operation
+
+TABLE_TYPES = ('COLUMN', 'ROW')
+
+
+class HanaModelOperation(Operation):
+    """
+    Base class of operations that change the table of a model in a SAP HANA specific way. They aren't part of the
+    migration state and are skipped on other databases.
+    """
+    reduces_to_sql = True
+
+    def state_forwards(self, app_label, state):
+        pass
+
+    def references_model(self, name, app_label=None):
+        return name.lower() == self.name.lower()
+
+    def _run(self, app_label, schema_editor, state, method, *args, **kwargs):
+        if schema_editor.connection.vendor != 'hana':
+            return
+        model = state.apps.get_model(app_label, self.name)
+        if self.allow_migrate_model(schema_editor.connection.alias, model):
+            getattr(schema_editor, method)(model, *args, **kwargs)
+
+
+class AlterModelStore(HanaModelOperation):
+    """
+    Convert the table of a model between the ROW and the COLUMN store. The table type isn't part of the migration
+    state, so keep the column_store/row_store decorator of the model in sync.
+    """
+
+    def __init__(self, name, store, old_store=None):
+        if store not in TABLE_TYPES or old_store not in TABLE_TYPES + (None,):
+            raise ValueError('The store of a model has to be one of %s.' % ', '.join(TABLE_TYPES))
+        self.name = name
+        self.store = store
+        self.old_store = old_store
+
+    @property
+    def reversible(self):
+        return self.old_store is not None
+
+    def deconstruct(self):
+        kwargs = {
+            'name': self.name,
+            'store': self.store,
+        }
+        if self.old_store is not None:
+            kwargs['old_store'] = self.old_store
+        return (
+            self.__class__.__name__,
+            [],
+            kwargs
+        )
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        self._run(app_label, schema_editor, to_state, 'alter_table_type', self.store)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        self._run(app_label, schema_editor, to_state, 'alter_table_type', self.old_store)
+
+    def describe(self):
+        return 'Convert table of %s to %s store' % (self.name, self.store)
+
+
+class AlterModelPartitioning(HanaModelOperation):
+    """
+    Partition the table of a model created by a migration or repartition an existing table (see
+    django_hana.partitioning). An empty partitioning merges all partitions. Keep the partition_by decorator of the model
+    in sync.
+    """
+
+    def __init__(self, name, partitioning, old_partitioning=None):
+        self.name = name
+        self.partitioning = list(partitioning)
+        self.old_partitioning = list(old_partitioning) if old_partitioning is not None else None
+
+    @property
+    def reversible(self):
+        return self.old_partitioning is not None
+
+    def deconstruct(self):
+        kwargs = {
+            'name': self.name,
+            'partitioning': self.partitioning,
+        }
+        if self.old_partitioning is not None:
+            kwargs['old_partitioning'] = self.old_partitioning
+        return (
+            self.__class__.__name__,
+            [],
+            kwargs
+        )
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        self._run(app_label, schema_editor, to_state, 'alter_partitioning', self.partitioning)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        self._run(app_label, schema_editor, to_state, 'alter_partitioning', self.old_partitioning)
+
+    def describe(self):
+        return 'Alter partitioning of %s' % self.name
+
+
+class RangePartitionOperation(HanaModelOperation):
+    def __init__(self, name, lower=None, upper=None, value=None):
+        self.name = name
+        self.lower = lower
+        self.upper = upper
+        self.value = value
+
+    def deconstruct(self):
+        kwargs = {'name': self.name}
+        for attr in ('lower', 'upper', 'value'):
+            if getattr(self, attr) is not None:
+                kwargs[attr] = getattr(self, attr)
+        return (
+            self.__class__.__name__,
+            [],
+            kwargs
+        )
+
+    def _alter(self, app_label, schema_editor, state, method):
+        self._run(app_label, schema_editor, state, method, lower=self.lower, upper=self.upper, value=self.value)
+
+
+class AddRangePartition(RangePartitionOperation):
+    """
+    Add a range partition (lower <= values < upper), a single value partition or the OTHERS partition to a range
+    partitioned table.
+    """
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        self._alter(app_label, schema_editor, to_state, 'add_range_partition')
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        self._alter(app_label, schema_editor, to_state, 'drop_range_partition')
+
+    def describe(self):
+        return 'Add range partition to %s' % self.name
+
+
+class DropRangePartition(RangePartitionOperation):
+    """
+    Drop a range partition including its rows. Reversing the operation recreates the empty partition.
+    """
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        self._alter(app_label, schema_editor, to_state, 'drop_range_partition')
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        self._alter(app_label, schema_editor, to_state, 'add_range_partition')
+
+    def describe(self):
+        return 'Drop range partition of %s' % self.name
+
+
+class FulltextIndexOperation(HanaModelOperation):
+    def __init__(self, name, index):
+        self.name = name
+        self.index = index
+
+    def deconstruct(self):
+        return (
+            self.__class__.__name__,
+            [],
+            {'name': self.name, 'index': self.index}
+        )
+
+
+class AddFulltextIndex(FulltextIndexOperation):
+    """
+    Create a fulltext index (django_hana.search.FulltextIndex) on a table created by a migration or on an existing
+    table. Keep the fulltext_index decorator of the model in sync.
+    """
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        self._run(app_label, schema_editor, to_state, 'create_fulltext_index', self.index)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        self._run(app_label, schema_editor, to_state, 'delete_fulltext_index', self.index)
+
+    def describe(self):
+        return 'Create fulltext index on %s.%s' % (self.name, self.index.field)
+
+
+class RemoveFulltextIndex(FulltextIndexOperation):
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        self._run(app_label, schema_editor, to_state, 'delete_fulltext_index', self.index)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        self._run(app_label, schema_editor, to_state, 'create_fulltext_index', self.index)
+
+    def describe(self):
+        return 'Remove fulltext index on %s.%s' % (self.name, self.index.field)
+
+
+class CaseInsensitiveIndexOperation(HanaModelOperation):
+    def __init__(self, name, field):
+        self.name = name
+        self.field = field
+
+    def deconstruct(self):
+        return (
+            self.__class__.__name__,
+            [],
+            {'name': self.name, 'field': self.field}
+        )
+
+    def _alter(self, app_label, schema_editor, state, method):
+        model = state.apps.get_model(app_label, self.name)
+        self._run(app_label, schema_editor, state, method, model._meta.get_field(self.field))
+
+
+class AddCaseInsensitiveIndex(CaseInsensitiveIndexOperation):
+    """
+    Add the indexed upper case copy of a column to a table created by a migration or to an existing table. The
+    generated column is filled for all existing rows. Keep the case_insensitive_index decorator of the model in sync.
+    """
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        self._alter(app_label, schema_editor, to_state, 'create_case_insensitive_index')
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        self._alter(app_label, schema_editor, to_state, 'delete_case_insensitive_index')
+
+    def describe(self):
+        return 'Add case-insensitive index on %s.%s' % (self.name, self.field)
+
+
+class RemoveCaseInsensitiveIndex(CaseInsensitiveIndexOperation):
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        self._alter(app_label, schema_editor, to_state, 'delete_case_insensitive_index')
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        self._alter(app_label, schema_editor, to_state, 'create_case_insensitive_index')
+
+    def describe(self):
+        return 'Remove case-insensitive index on %s.%s' % (self.name, self.field)
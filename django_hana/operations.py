@@ -1,58 +1,30 @@
 from __future__ import unicode_literals
 
+import re
 import uuid
+from collections import OrderedDict
 
-from django.contrib.gis.db.backends.base.adapter import WKTAdapter
-from django.contrib.gis.db.backends.base.operations import BaseSpatialOperations
-from django.contrib.gis.db.backends.utils import SpatialOperator
-from django.contrib.gis.geometry.backend import Geometry
-from django.contrib.gis.measure import Distance
 from django.db.backends.base.operations import BaseDatabaseOperations
 from django.utils import six
 from django.utils.encoding import force_text
 
-from .base import Database
-
-
-class HanaSpatialOperator(SpatialOperator):
-    sql_template = '%(lhs)s.%(func)s(%(rhs)s)'
+import django_hana
+from django_hana import compat
 
+from .base import Database
 
-class HanaIsOneSpatialOperator(SpatialOperator):
-    sql_template = '%(lhs)s.%(func)s(%(rhs)s) = 1'
+python_end_of_string_re = re.compile(r'(?<!\\)((?:\\\\)*)\\Z')
+python_flags_re = re.compile(r'\(\?([aiLmsux]+)\)')
 
 
-class HanaIsValueSpatialOperator(SpatialOperator):
-    sql_template = '%(lhs)s.%(func)s(%(rhs)s) %(op)s %%s'
+def _pcre_flags(match):
+    flags = re.sub('[aLu]', '', match.group(1))
+    return '(?%s)' % flags if flags else ''
 
 
-class DatabaseOperations(BaseDatabaseOperations, BaseSpatialOperations):
+class DatabaseOperations(BaseDatabaseOperations):
     compiler_module = 'django_hana.compiler'
 
-    Adapter = WKTAdapter
-    Adaptor = Adapter  # Backwards-compatibility alias.
-
-    gis_operators = {
-        'contains': HanaIsOneSpatialOperator(func='ST_CONTAINS'),
-        'coveredby': HanaIsOneSpatialOperator(func='ST_COVEREDBY'),
-        'covers': HanaIsOneSpatialOperator(func='ST_COVERS'),
-        'crosses': HanaIsOneSpatialOperator(func='ST_CROSSES'),
-        'disjoint': HanaIsOneSpatialOperator(func='ST_DISJOINT'),
-        'distance': HanaIsValueSpatialOperator(func='ST_DISTANCE', op='='),
-        'distance_gt': HanaIsValueSpatialOperator(func='ST_DISTANCE', op='>'),
-        'distance_gte': HanaIsValueSpatialOperator(func='ST_DISTANCE', op='>='),
-        'distance_lt': HanaIsValueSpatialOperator(func='ST_DISTANCE', op='<'),
-        'distance_lte': HanaIsValueSpatialOperator(func='ST_DISTANCE', op='<='),
-        'equals': HanaIsOneSpatialOperator(func='ST_EQUALS'),
-        'exact': HanaIsOneSpatialOperator(func='ST_EQUALS'),
-        'intersects': HanaIsOneSpatialOperator(func='ST_INTERSECTS'),
-        'overlaps': HanaIsOneSpatialOperator(func='ST_OVERLAPS'),
-        'same_as': HanaIsOneSpatialOperator(func='ST_EQUALS'),
-        'relate': HanaIsOneSpatialOperator(func='ST_RELATE'),
-        'touches': HanaIsOneSpatialOperator(func='ST_TOUCHES'),
-        'within': HanaIsValueSpatialOperator(func='ST_WITHINDISTANCE', op='<='),
-    }
-
     def __init__(self, connection):
         super(DatabaseOperations, self).__init__(connection)
 
@@ -66,25 +38,62 @@ class DatabaseOperations(BaseDatabaseOperations, BaseSpatialOperations):
         seq_sql = 'CREATE SEQUENCE %(seq_name)s RESET BY SELECT IFNULL(MAX(%(column)s),0) + 1 FROM %(table)s' % locals()
         return [seq_sql]
 
+    # Intervals used by SERIES_ROUND. The default origin (0001-01-01) is a Monday and the start of a quarter.
+    trunc_intervals = {
+        'year': 'INTERVAL 1 YEAR',
+        'quarter': 'INTERVAL 3 MONTH',
+        'month': 'INTERVAL 1 MONTH',
+        'week': 'INTERVAL 7 DAY',
+        'day': 'INTERVAL 1 DAY',
+        'hour': 'INTERVAL 1 HOUR',
+        'minute': 'INTERVAL 1 MINUTE',
+        'second': 'INTERVAL 1 SECOND',
+    }
+
     def date_extract_sql(self, lookup_type, field_name):
         if lookup_type == 'week_day':
             # For consistency across backends, we return Sunday=1, Saturday=7.
-            return 'MOD(WEEKDAY (%s) + 2,7)' % field_name
-        else:
-            return 'EXTRACT(%s FROM %s)' % (lookup_type, field_name)
+            return 'MOD(WEEKDAY(%s) + 1, 7) + 1' % field_name
+        elif lookup_type == 'week':
+            # ISO-8601 week number, ISOWEEK returns e.g. 2017-W01
+            return "TO_INTEGER(SUBSTR_AFTER(ISOWEEK(%s), 'W'))" % field_name
+        elif lookup_type == 'iso_year':
+            return 'TO_INTEGER(LEFT(ISOWEEK(%s), 4))' % field_name
+        elif lookup_type == 'quarter':
+            return 'FLOOR((EXTRACT(MONTH FROM %s) + 2) / 3)' % field_name
+        elif lookup_type == 'second':
+            return 'TO_INTEGER(EXTRACT(SECOND FROM %s))' % field_name
+        elif lookup_type in ('year', 'month', 'day', 'hour', 'minute'):
+            return 'EXTRACT(%s FROM %s)' % (lookup_type.upper(), field_name)
+        raise ValueError('Unsupported lookup type: %r' % lookup_type)
+
+    def datetime_extract_sql(self, lookup_type, field_name, tzname):
+        return compat.datetimeSql(self.date_extract_sql(lookup_type, field_name))
+
+    def series_round_sql(self, lookup_type, field_name):
+        """
+        Rounds down the given date, time or timestamp to the given specificity. The result has the same type.
+        """
+        try:
+            interval = self.trunc_intervals[lookup_type]
+        except KeyError:
+            raise ValueError('Unsupported lookup type: %r' % lookup_type)
+        return "SERIES_ROUND(%s, '%s', ROUND_DOWN)" % (field_name, interval)
 
     def date_trunc_sql(self, lookup_type, field_name):
-        # very low tech, code should be optimized
-        ltypes = {
-            'year': 'YYYY',
-            'month': 'YYYY-MM',
-            'day': 'YYYY-MM-DD',
-        }
-        cur_type = ltypes.get(lookup_type)
-        if not cur_type:
-            return field_name
-        sql = 'TO_DATE(TO_VARCHAR(%s, "%s"))' % (field_name, cur_type)
-        return sql
+        return self.series_round_sql(lookup_type, field_name)
+
+    def datetime_trunc_sql(self, lookup_type, field_name, tzname):
+        return compat.datetimeSql(self.series_round_sql(lookup_type, field_name))
+
+    def time_trunc_sql(self, lookup_type, field_name):
+        return self.series_round_sql(lookup_type, field_name)
+
+    def datetime_cast_date_sql(self, field_name, tzname):
+        return compat.datetimeSql('TO_DATE(%s)' % field_name)
+
+    def datetime_cast_time_sql(self, field_name, tzname):
+        return compat.datetimeSql('TO_TIME(%s)' % field_name)
 
     def no_limit_value(self):
         return None
@@ -96,33 +105,58 @@ class DatabaseOperations(BaseDatabaseOperations, BaseSpatialOperations):
         return 2500
 
     def sql_flush(self, style, tables, sequences, allow_cascades=False):
+        # Only tables that have been written to since the last flush need to be emptied
+        tables = self.connection.dirty_tables.filter(tables)
+        dirty = set(tables)
+        sequences = [sequence_info for sequence_info in sequences if sequence_info['table'] in dirty]
         if tables:
-            sql = [
-                ' '.join([
-                    style.SQL_KEYWORD('DELETE'),
-                    style.SQL_KEYWORD('FROM'),
-                    style.SQL_FIELD(self.quote_name(table)),
-                ])
+            # TRUNCATE is not allowed for tables referenced by a foreign key
+            referenced_tables = self._referenced_tables()
+            statements = OrderedDict(
+                (
+                    ' '.join([
+                        style.SQL_KEYWORD('DELETE'),
+                        style.SQL_KEYWORD('FROM'),
+                        style.SQL_FIELD(self.quote_name(table)),
+                    ])
+                    if table.upper() in referenced_tables else
+                    ' '.join([
+                        style.SQL_KEYWORD('TRUNCATE'),
+                        style.SQL_KEYWORD('TABLE'),
+                        style.SQL_FIELD(self.quote_name(table)),
+                    ]),
+                    self.quote_name(table),
+                )
                 for table in tables
-            ]
+            )
+            # the tables are clean once these statements have been executed (and committed)
+            self.connection.dirty_tables.expect_flush(statements)
+            sql = list(statements)
             sql.extend(self.sequence_reset_by_name_sql(style, sequences))
             return sql
         else:
             return []
 
+    def _referenced_tables(self):
+        from django.apps import apps
+        referenced_tables = set()
+        for model in apps.get_models(include_auto_created=True):
+            for field in model._meta.local_fields:
+                if field.is_relation and getattr(field, 'db_constraint', False):
+                    referenced_tables.add(field.related_model._meta.db_table.upper())
+        return referenced_tables
+
     def sequence_reset_by_name_sql(self, style, sequences):
+        # The tables have just been emptied, so there's no need to scan them for the current maximum
         sql = []
         for sequence_info in sequences:
             table_name = sequence_info['table']
-            column_name = sequence_info['column']
+            column_name = sequence_info['column'] or 'id'
             seq_name = self.get_seq_name(table_name, column_name)
             sql.append(' '.join([
-                'ALTER SEQUENCE',
-                seq_name,
-                'RESET BY SELECT IFNULL(MAX(',
-                column_name,
-                '),0) + 1 from',
-                table_name,
+                style.SQL_KEYWORD('ALTER SEQUENCE'),
+                style.SQL_TABLE(self.quote_name(seq_name)),
+                style.SQL_KEYWORD('RESTART WITH 1'),
             ]))
         return sql
 
@@ -153,21 +187,12 @@ class DatabaseOperations(BaseDatabaseOperations, BaseSpatialOperations):
                     ]))
         return output
 
+    def fulltext_search_sql(self, field_name):
+        return 'CONTAINS(%s, %%s)' % field_name
+
     def prep_for_iexact_query(self, x):
         return x
 
-    def check_aggregate_support(self, aggregate):
-        """
-        Check that the backend supports the provided aggregate.
-
-        This is used on specific backends to rule out known aggregates
-        that are known to have faulty implementations. If the named
-        aggregate function has a known problem, the backend should
-        raise NotImplementedError.
-        """
-        if aggregate.sql_function in ('STDDEV_POP', 'VAR_POP'):
-                raise NotImplementedError()
-
     def max_name_length(self):
         """
         Returns the maximum length of table and column names, or None if there
@@ -209,6 +234,40 @@ class DatabaseOperations(BaseDatabaseOperations, BaseSpatialOperations):
             )
         return six.text_type(value)
 
+    def case_insensitive_column_name(self, column):
+        return '%s_upper' % column
+
+    def case_insensitive_column(self, field):
+        """
+        Returns the generated upper case column of a field registered with case_insensitive_index, or None.
+        """
+        if field.model is not None and field.name in django_hana.get_model_case_insensitive_fields(field.model):
+            return self.case_insensitive_column_name(field.column)
+        return None
+
+    def for_update_sql(self, nowait=False, skip_locked=False, wait=None):
+        if nowait:
+            return 'FOR UPDATE NOWAIT'
+        elif skip_locked:
+            return 'FOR UPDATE IGNORE LOCKED'
+        elif wait is not None:
+            return 'FOR UPDATE WAIT %d' % wait
+        return 'FOR UPDATE'
+
+    def regex_lookup(self, lookup_type):
+        if lookup_type == 'regex':
+            return '%s LIKE_REGEXPR %s'
+        return "%s LIKE_REGEXPR %s FLAG 'i'"
+
+    def regex_pattern(self, pattern):
+        """
+        Translates a Python regular expression to the PCRE syntax of LIKE_REGEXPR.
+        """
+        # \Z is the very end of the string in Python, but allows a trailing newline in PCRE
+        pattern = python_end_of_string_re.sub(r'\1\\z', pattern)
+        # PCRE has no ASCII, locale and unicode flags
+        return python_flags_re.sub(_pcre_flags, pattern)
+
     def lookup_cast(self, lookup_type, internal_type=None):
         if lookup_type in ('iexact', 'icontains', 'istartswith', 'iendswith'):
             return 'UPPER(%s)'
@@ -246,25 +305,16 @@ class DatabaseOperations(BaseDatabaseOperations, BaseSpatialOperations):
         return tuple(self.sanitize_bool(param) for param in params)
 
     def modify_params(self, params):
-        return tuple(self.sanitize_geometry(param) for param in params)
+        return tuple(params)
 
     def sanitize_bool(self, param):
         if type(param) is bool:
             return 1 if param else 0
         return param
 
-    def sanitize_geometry(self, param):
-        if type(param) is WKTAdapter:
-            return str(param)
-        return param
-
     def get_db_converters(self, expression):
         converters = super(DatabaseOperations, self).get_db_converters(expression)
         internal_type = expression.output_field.get_internal_type()
-        geometry_fields = (
-            'PointField', 'LineStringField', 'PolygonField',
-            'MultiPointField', 'MultiLineStringField', 'MultiPolygonField',
-        )
         if internal_type == 'TextField':
             converters.append(self.convert_textfield_value)
         elif internal_type == 'BinaryField':
@@ -273,10 +323,6 @@ class DatabaseOperations(BaseDatabaseOperations, BaseSpatialOperations):
             converters.append(self.convert_booleanfield_value)
         elif internal_type == 'UUIDField':
             converters.append(self.convert_uuidfield_value)
-        elif internal_type in geometry_fields:
-            converters.append(self.convert_geometry_value)
-        if hasattr(expression.output_field, 'geom_type'):
-            converters.append(self.convert_geometry)
         return converters
 
     def convert_textfield_value(self, value, expression, connection, context):
@@ -298,59 +344,3 @@ class DatabaseOperations(BaseDatabaseOperations, BaseSpatialOperations):
         if value is not None:
             value = uuid.UUID(value)
         return value
-
-    def convert_geometry_value(self, value, expression, connection, context):
-        if value is not None:
-            value = ''.join('{:02x}'.format(x) for x in value)
-        return value
-
-    def convert_geometry(self, value, expression, connection, context):
-        if value:
-            value = Geometry(value)
-            if 'transformed_srid' in context:
-                value.srid = context['transformed_srid']
-        return value
-
-    def _geo_db_type(self, f):
-        return 'ST_%s' % f.geom_type
-
-    def geo_db_type(self, f):
-        internal_type = self._geo_db_type(f)
-        return internal_type if f.geom_type == 'POINT' else 'ST_GEOMETRY'
-
-    def get_distance(self, f, value, lookup_type):
-        if not value:
-            return []
-        value = value[0]
-        if isinstance(value, Distance):
-            if f.geodetic(self.connection):
-                raise ValueError('SAP HANA does not support distance queries on '
-                                 'geometry fields with a geodetic coordinate system. '
-                                 'Distance objects; use a numeric value of your '
-                                 'distance in degrees instead.')
-            else:
-                dist_param = getattr(value, Distance.unit_attname(f.units_name(self.connection)))
-        else:
-            dist_param = value
-        return [dist_param]
-
-    def get_geom_placeholder(self, f, value, compiler):
-        if value is None:
-            placeholder = '%s'
-        else:
-            db_type = self._geo_db_type(f)
-            placeholder = 'NEW %s(%%s, %s)' % (db_type, f.srid)
-
-        if hasattr(value, 'as_sql'):
-            sql, _ = compiler.compile(value)
-            placeholder = placeholder % sql
-
-        return placeholder
-
-    def geometry_columns(self):
-        from django_hana.models import HanaGeometryColumns
-        return HanaGeometryColumns
-
-    def spatial_ref_sys(self):
-        from django_hana.models import HanaSpatialRefSys
-        return HanaSpatialRefSys
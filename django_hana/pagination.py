@@ -0,0 +1,130 @@
+"""
+Keyset (seek) pagination. Instead of skipping the rows of all previous pages with OFFSET, each page continues after the
+sort key of the last row of the previous page, which an index or the column store can seek to directly:
+
+    paginator = KeysetPaginator(Order.objects.filter(shop=shop), 50, ordering=('-created', 'pk'))
+    page = paginator.page(request.GET.get('cursor'))
+    # page.object_list, page.has_next(), page.next_cursor
+"""
+import base64
+import datetime
+import json
+import operator
+from functools import reduce
+
+from django.core.paginator import InvalidPage
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+from django.utils import six
+from django.utils.encoding import force_bytes, force_text
+
+
+class CursorEncoder(DjangoJSONEncoder):
+    """
+    Keeps the microseconds of datetimes and times, which DjangoJSONEncoder truncates to milliseconds. Rows differing
+    only in the microseconds would be skipped otherwise.
+    """
+
+    def default(self, o):
+        if isinstance(o, (datetime.datetime, datetime.time)):
+            return o.isoformat()
+        return super(CursorEncoder, self).default(o)
+
+
+class KeysetPage(object):
+    def __init__(self, object_list, next_cursor):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+
+    def __repr__(self):
+        return '<KeysetPage of %s objects>' % len(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+
+class KeysetPaginator(object):
+    """
+    Paginates a queryset by the given ordering (by default the ordering of the queryset or model). The ordering is
+    made unique by adding the primary key unless it already contains a unique field, so no row is skipped or repeated.
+    Note that SAP HANA sorts NULL values first in ascending and last in descending order.
+    """
+
+    def __init__(self, queryset, per_page, ordering=None):
+        self.queryset = queryset
+        self.per_page = int(per_page)
+        opts = queryset.model._meta
+        if ordering is None:
+            ordering = queryset.query.order_by or opts.ordering
+        self.ordering = []
+        for name in ordering:
+            if not isinstance(name, six.string_types) or '__' in name or name.lstrip('-') == '?':
+                raise ValueError('KeysetPaginator only supports ordering by fields of the model, got %r.' % name)
+            descending = name.startswith('-')
+            name = name.lstrip('-')
+            field = opts.pk if name == 'pk' else opts.get_field(name)
+            self.ordering.append((field, descending))
+        if not any(field.primary_key or field.unique for field, descending in self.ordering):
+            self.ordering.append((opts.pk, False))
+
+    def encode_cursor(self, obj):
+        values = [getattr(obj, field.attname) for field, descending in self.ordering]
+        return force_text(base64.urlsafe_b64encode(force_bytes(json.dumps(values, cls=CursorEncoder))))
+
+    def decode_cursor(self, cursor):
+        try:
+            values = json.loads(force_text(base64.urlsafe_b64decode(force_bytes(cursor))))
+            if len(values) != len(self.ordering):
+                raise ValueError('Wrong number of values.')
+            return [
+                None if value is None else field.to_python(value)
+                for (field, descending), value in zip(self.ordering, values)
+            ]
+        except Exception:
+            raise InvalidPage('Invalid cursor: %r' % cursor)
+
+    def seek_filter(self, values):
+        """
+        Return the filter for the rows after the given sort key, i.e. (a, b) > (x, y) as a > x OR (a = x AND b > y), or
+        None if no row can come after it.
+        """
+        alternatives = []
+        equal = Q()
+        for (field, descending), value in zip(self.ordering, values):
+            name = field.attname
+            if value is None:
+                # NULL is the smallest value, nothing comes after it in descending order
+                after = None if descending else Q(**{'%s__isnull' % name: False})
+                same = Q(**{'%s__isnull' % name: True})
+            else:
+                after = Q(**{'%s__%s' % (name, 'lt' if descending else 'gt'): value})
+                if descending:
+                    after |= Q(**{'%s__isnull' % name: True})
+                same = Q(**{name: value})
+            if after is not None:
+                alternatives.append(equal & after)
+            equal &= same
+        return reduce(operator.or_, alternatives) if alternatives else None
+
+    def page(self, cursor=None):
+        queryset = self.queryset.order_by(*[
+            '%s%s' % ('-' if descending else '', field.attname) for field, descending in self.ordering
+        ])
+        if cursor:
+            seek_filter = self.seek_filter(self.decode_cursor(cursor))
+            queryset = queryset.none() if seek_filter is None else queryset.filter(seek_filter)
+        object_list = list(queryset[:self.per_page + 1])
+        next_cursor = None
+        if len(object_list) > self.per_page:
+            object_list = object_list[:self.per_page]
+            next_cursor = self.encode_cursor(object_list[-1])
+        return KeysetPage(object_list, next_cursor)
@@ -0,0 +1,145 @@
+"""
+Partitioning specifications of column store tables.
+
+A table is partitioned by one specification or, for multi-level partitioning, by two of them, e.g.
+HASH on the primary key for the first level and RANGE on a date column for the second level. Note that SAP HANA
+requires the columns of a single-level HASH or RANGE partitioning (and of the first level of a multi-level one) to be
+part of the primary key.
+"""
+from django.db.models import Q
+from django.utils import six
+from django.utils.deconstruct import deconstructible
+
+import django_hana
+
+
+def quote_value(value):
+    if isinstance(value, six.integer_types + (float,)) and not isinstance(value, bool):
+        return six.text_type(value)
+    return "'%s'" % six.text_type(value).replace("'", "''")
+
+
+def range_partition_sql(lower=None, upper=None, value=None):
+    """
+    Return the definition of a single range partition: a range of values, a single value or the rest.
+    """
+    if value is not None:
+        return 'VALUE = %s' % quote_value(value)
+    if lower is not None and upper is not None:
+        return '%s <= VALUES < %s' % (quote_value(lower), quote_value(upper))
+    return 'OTHERS'
+
+
+class Partitioning(object):
+    kind = None
+
+    def __init__(self, *fields):
+        self.fields = fields
+
+    def __eq__(self, other):
+        return isinstance(other, self.__class__) and self.deconstruct() == other.deconstruct()
+
+    def __ne__(self, other):
+        return not self == other
+
+    def columns_sql(self, model, quote_name):
+        return ', '.join(quote_name(model._meta.get_field(field).column) for field in self.fields)
+
+    def as_sql(self, model, quote_name):
+        raise NotImplementedError('Subclasses of Partitioning must provide an as_sql() method.')
+
+
+@deconstructible(path='django_hana.partitioning.Hash')
+class Hash(Partitioning):
+    """
+    Distribute the rows by the hash of the given fields. Without a number of partitions, the table gets one partition
+    per server of a scale-out system.
+    """
+    kind = 'HASH'
+
+    def __init__(self, *fields, **kwargs):
+        super(Hash, self).__init__(*fields)
+        self.partitions = kwargs.pop('partitions', None)
+        if kwargs:
+            raise TypeError('Unexpected keyword arguments: %s' % ', '.join(kwargs))
+
+    def as_sql(self, model, quote_name):
+        partitions = self.partitions or 'GET_NUM_SERVERS()'
+        return 'HASH (%s) PARTITIONS %s' % (self.columns_sql(model, quote_name), partitions)
+
+
+@deconstructible(path='django_hana.partitioning.RoundRobin')
+class RoundRobin(Partitioning):
+    kind = 'ROUNDROBIN'
+
+    def __init__(self, partitions=None):
+        super(RoundRobin, self).__init__()
+        self.partitions = partitions
+
+    def as_sql(self, model, quote_name):
+        return 'ROUNDROBIN PARTITIONS %s' % (self.partitions or 'GET_NUM_SERVERS()')
+
+
+@deconstructible(path='django_hana.partitioning.Range')
+class Range(Partitioning):
+    """
+    One partition per range between two consecutive boundaries, one per single value and (by default) one for all
+    remaining values.
+    """
+    kind = 'RANGE'
+
+    def __init__(self, field, boundaries=(), values=(), others=True):
+        super(Range, self).__init__(field)
+        self.field = field
+        self.boundaries = list(boundaries)
+        self.values = list(values)
+        self.others = others
+
+    def ranges(self):
+        return list(zip(self.boundaries[:-1], self.boundaries[1:]))
+
+    def as_sql(self, model, quote_name):
+        partitions = [range_partition_sql(lower, upper) for lower, upper in self.ranges()]
+        partitions.extend(range_partition_sql(value=value) for value in self.values)
+        if self.others:
+            partitions.append(range_partition_sql())
+        return 'RANGE (%s) (%s)' % (
+            self.columns_sql(model, quote_name),
+            ', '.join('PARTITION %s' % partition for partition in partitions),
+        )
+
+    def filters(self):
+        """
+        Return one filter per range partition, the last one for the rest (values outside of the boundaries and NULL)
+        unless there is no OTHERS partition. Querying partition by partition lets SAP HANA prune all other partitions,
+        e.g. to process a large table in chunks or in parallel.
+        """
+        filters = [
+            Q(**{'%s__gte' % self.field: lower, '%s__lt' % self.field: upper})
+            for lower, upper in self.ranges()
+        ]
+        filters.extend(Q(**{self.field: value}) for value in self.values)
+        if self.others:
+            filters.append(self.others_filter())
+        return filters
+
+    def others_filter(self):
+        ranges = self.ranges()
+        if ranges:
+            outside = Q(**{'%s__lt' % self.field: ranges[0][0]}) | Q(**{'%s__gte' % self.field: ranges[-1][1]})
+        else:
+            outside = Q(**{'%s__isnull' % self.field: False})
+        if self.values:
+            outside &= ~Q(**{'%s__in' % self.field: self.values})
+        return outside | Q(**{'%s__isnull' % self.field: True})
+
+
+def partition_filters(model):
+    """
+    Return the filters of all range partitions of a model (see Range.filters).
+    """
+    filters = []
+    for partitioning in django_hana.get_model_partitioning(model):
+        if isinstance(partitioning, Range):
+            filters.extend(partitioning.filters())
+    return filters
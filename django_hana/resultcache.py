@@ -0,0 +1,169 @@
+"""
+Process-wide cache of query results for models registered with the cache_results decorator, e.g. reference data
+that rarely changes.
+
+Results are keyed by SQL and params and tagged with the tables the statement reads. Any write or DDL statement on one
+of these tables executed by this process invalidates the results, and again when its transaction is committed or rolled
+back (other threads may have cached the old rows in between). Rows read while one of their tables is invalidated aren't
+cached. Writes of other processes are NOT noticed, so only register models whose tables are written by the application
+itself (or can be stale for a while). Queries in transactions (atomic blocks or without autocommit) bypass the cache.
+The least recently used results are evicted to stay within RESULT_CACHE_SIZE bytes (the cache is disabled unless it's
+set).
+"""
+import re
+import sys
+import threading
+from collections import OrderedDict
+
+from django_hana.tracking import READ_KEYWORDS, normalize_table_name, table_re, truncate_re, written_table
+
+ALL_TABLES = '*'
+
+read_table_re = re.compile(r'\b(?:FROM|JOIN)\s+%s' % table_re, re.IGNORECASE)
+temporary_ddl_re = re.compile(
+    r'^\s*(?:CREATE\s+(?:LOCAL\s+|GLOBAL\s+)?TEMPORARY\s+(?:COLUMN\s+|ROW\s+)?TABLE|DROP\s+TABLE)\s+"?#',
+    re.IGNORECASE,
+)
+
+
+def read_tables(sql):
+    """
+    Return the (normalized) names of all tables a statement reads, including those of subqueries.
+    """
+    return set(normalize_table_name(match.group(1)) for match in read_table_re.finditer(sql))
+
+
+def result_size(rows):
+    """
+    Rough estimate of the memory used by the rows of a result.
+    """
+    return sys.getsizeof(rows) + sum(sys.getsizeof(row) + sum(sys.getsizeof(value) for value in row) for row in rows)
+
+
+class ResultCache(object):
+    def __init__(self, max_size):
+        self.lock = threading.Lock()
+        self.max_size = max_size
+        # incremented by each invalidation, see version()
+        self.generation = 0
+        self.table_generations = {}
+        self.clear()
+        self.hits = {}
+        self.misses = {}
+
+    def clear(self):
+        with self.lock:
+            self.results = OrderedDict()
+            self.tables = {}
+            self.size = 0
+            self.generation += 1
+
+    def version(self, tables):
+        """
+        Return the version of the tables, to be passed to set() with the rows read after calling this.
+        """
+        with self.lock:
+            return self._version(tables)
+
+    def _version(self, tables):
+        return self.generation, dict((table, self.table_generations.get(table, 0)) for table in tables)
+
+    def _remove(self, key):
+        rows, tables, size = self.results.pop(key)
+        self.size -= size
+        for table in tables:
+            keys = self.tables.get(table)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self.tables[table]
+
+    def get(self, key, label):
+        with self.lock:
+            entry = self.results.get(key)
+            counter = self.misses if entry is None else self.hits
+            counter[label] = counter.get(label, 0) + 1
+            if entry is None:
+                return None
+            # most recently used
+            self.results.pop(key)
+            self.results[key] = entry
+            return entry[0]
+
+    def set(self, key, rows, tables, version=None):
+        """
+        Cache the rows of a query reading the tables, unless one of them has been invalidated since version() returned
+        the given version (the rows may be stale then).
+        """
+        size = result_size(rows)
+        if size > self.max_size:
+            return
+        with self.lock:
+            if version is not None and version != self._version(version[1]):
+                return
+            if key in self.results:
+                self._remove(key)
+            while self.results and self.size + size > self.max_size:
+                self._remove(next(iter(self.results)))
+            self.results[key] = (rows, tables, size)
+            self.size += size
+            for table in tables:
+                self.tables.setdefault(table, set()).add(key)
+
+    def invalidate(self, table):
+        if table == ALL_TABLES:
+            return self.clear()
+        with self.lock:
+            self.table_generations[table] = self.table_generations.get(table, 0) + 1
+            for key in list(self.tables.get(table, ())):
+                self._remove(key)
+
+    def track(self, sql):
+        """
+        Invalidate the results a statement may change. Return the table written (ALL_TABLES for DDL, procedure calls,
+        etc.) or None for reads and statements on temporary tables.
+        """
+        table = written_table(sql)
+        if table is None:
+            match = truncate_re.match(sql)
+            table = normalize_table_name(match.group(1)) if match else None
+        if (table or '').startswith('#') or (table is None and temporary_ddl_re.match(sql)):
+            # results of temporary tables aren't cached
+            return None
+        if table is None and not sql.lstrip().upper().startswith(READ_KEYWORDS):
+            table = ALL_TABLES
+        if table is not None:
+            self.invalidate(table)
+        return table
+
+    def stats(self):
+        """
+        Return the number of hits and misses and the hit ratio, in total and per model, and the memory used.
+        """
+        with self.lock:
+            labels = sorted(set(self.hits) | set(self.misses))
+            models = dict(
+                (label, self._ratio(self.hits.get(label, 0), self.misses.get(label, 0))) for label in labels
+            )
+            total = self._ratio(sum(self.hits.values()), sum(self.misses.values()))
+            total.update({'entries': len(self.results), 'size': self.size, 'models': models})
+            return total
+
+    def _ratio(self, hits, misses):
+        return {'hits': hits, 'misses': misses, 'hit_ratio': float(hits) / (hits + misses) if hits + misses else 0.0}
+
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def get_result_cache(alias, max_size):
+    """
+    Return the cache shared by the connections of all threads to the database alias, or None if it's disabled.
+    """
+    if not max_size:
+        return None
+    with _caches_lock:
+        if alias not in _caches:
+            _caches[alias] = ResultCache(max_size)
+        return _caches[alias]
@@ -1,6 +1,9 @@
+from django.apps import apps as global_apps
+from django.core.exceptions import ImproperlyConfigured
 from django.db.backends.base.schema import BaseDatabaseSchemaEditor
 
 import django_hana
+from django_hana.partitioning import range_partition_sql
 
 
 class DatabaseSchemaEditor(BaseDatabaseSchemaEditor):
@@ -11,6 +14,12 @@ class DatabaseSchemaEditor(BaseDatabaseSchemaEditor):
     sql_create_table_unique = 'UNIQUE (%(columns)s)'
     sql_rename_table = 'RENAME TABLE %(old_table)s TO %(new_table)s'
     sql_retablespace_table = 'ALTER TABLE %(table)s MOVE TO %(new_tablespace)s'
+    sql_alter_table_type = 'ALTER TABLE %(table)s %(table_type)s'
+    sql_partition_by = 'PARTITION BY %(partitions)s'
+    sql_alter_table_partitioning = 'ALTER TABLE %(table)s %(partition_by)s'
+    sql_merge_partitions = 'ALTER TABLE %(table)s MERGE PARTITIONS'
+    sql_add_partition = 'ALTER TABLE %(table)s ADD PARTITION %(partition)s'
+    sql_drop_partition = 'ALTER TABLE %(table)s DROP PARTITION %(partition)s'
     # sql_delete_table = 'DROP TABLE %(table)s CASCADE'
 
     sql_create_column = 'ALTER TABLE %(table)s ADD (%(column)s %(definition)s)'
@@ -39,6 +48,9 @@ class DatabaseSchemaEditor(BaseDatabaseSchemaEditor):
 
     sql_create_index = 'CREATE INDEX %(name)s ON %(table)s (%(columns)s)%(extra)s'
     sql_delete_index = 'DROP INDEX %(name)s'
+    sql_create_fulltext_index = 'CREATE FULLTEXT INDEX %(name)s ON %(table)s (%(column)s) %(parameters)s'
+    sql_delete_fulltext_index = 'DROP FULLTEXT INDEX %(name)s'
+    sql_create_upper_column = 'ALTER TABLE %(table)s ADD (%(column)s %(type)s GENERATED ALWAYS AS UPPER(%(source)s))'
 
     # sql_create_pk = 'ALTER TABLE %(table)s ADD CONSTRAINT %(name)s PRIMARY KEY (%(columns)s)'
     # sql_delete_pk = 'ALTER TABLE %(table)s DROP CONSTRAINT %(name)s'
@@ -50,10 +62,128 @@ class DatabaseSchemaEditor(BaseDatabaseSchemaEditor):
         # entire methods of Django to support this behavior, we will skip creating default constraints entirely.
         return True
 
+    def is_historical_model(self, model):
+        """
+        Whether the model is one of a migration state. The decorators describe the current models, so in migrations
+        the SAP HANA specific operations (django_hana.migration_operations) are responsible for the partitioning, the
+        fulltext indexes and the upper case columns.
+        """
+        return model._meta.apps is not global_apps
+
     def create_model(self, model):
         # To support creating column and row table, we have to use this workaround. It sets the sql format string
         # according to the table type of the model.
         store_type = self.connection.settings_dict.get('DEFAULT_MODEL_STORE', 'COLUMN')
-        table_type = django_hana.MODEL_STORE.get(model.__name__, store_type)
+        table_type = django_hana.get_model_store(model, store_type)
         self.sql_create_table = self.sql_create_table_template % {'table_type': table_type}
+        partitioning = () if self.is_historical_model(model) else django_hana.get_model_partitioning(model)
+        if partitioning:
+            if table_type != 'COLUMN':
+                raise ImproperlyConfigured('Only column store tables can be partitioned (%s).' % model.__name__)
+            self.sql_create_table += ' ' + self.partition_by_sql(model, partitioning).replace('%', '%%')
         super(DatabaseSchemaEditor, self).create_model(model)
+        if not self.is_historical_model(model):
+            for index in django_hana.get_model_fulltext_indexes(model):
+                self.create_fulltext_index(model, index)
+            for field_name in django_hana.get_model_case_insensitive_fields(model):
+                self.create_case_insensitive_index(model, model._meta.get_field(field_name))
+
+    def remove_field(self, model, field):
+        if self.connection.ops.case_insensitive_column(field):
+            self.delete_case_insensitive_index(model, field)
+        super(DatabaseSchemaEditor, self).remove_field(model, field)
+
+    def alter_field(self, model, old_field, new_field, strict=False):
+        # The generated column depends on the column and has the same type
+        recreate = bool(self.connection.ops.case_insensitive_column(old_field)) and (
+            old_field.column != new_field.column or
+            old_field.db_type(self.connection) != new_field.db_type(self.connection)
+        )
+        if recreate:
+            self.delete_case_insensitive_index(model, old_field)
+        super(DatabaseSchemaEditor, self).alter_field(model, old_field, new_field, strict=strict)
+        if recreate:
+            self.create_case_insensitive_index(model, new_field)
+
+    def alter_table_type(self, model, table_type):
+        """
+        Convert the table of a model to the ROW or COLUMN store.
+        """
+        self.execute(self.sql_alter_table_type % {
+            'table': self.quote_name(model._meta.db_table),
+            'table_type': table_type,
+        })
+
+    def partition_by_sql(self, model, partitioning):
+        return self.sql_partition_by % {
+            'partitions': ', '.join(level.as_sql(model, self.quote_name) for level in partitioning),
+        }
+
+    def alter_partitioning(self, model, partitioning):
+        """
+        Repartition the table of a model. Without partitioning all partitions are merged.
+        """
+        if partitioning:
+            self.execute(self.sql_alter_table_partitioning % {
+                'table': self.quote_name(model._meta.db_table),
+                'partition_by': self.partition_by_sql(model, partitioning),
+            })
+        else:
+            self.execute(self.sql_merge_partitions % {'table': self.quote_name(model._meta.db_table)})
+
+    def add_range_partition(self, model, lower=None, upper=None, value=None):
+        self.execute(self.sql_add_partition % {
+            'table': self.quote_name(model._meta.db_table),
+            'partition': range_partition_sql(lower, upper, value),
+        })
+
+    def drop_range_partition(self, model, lower=None, upper=None, value=None):
+        self.execute(self.sql_drop_partition % {
+            'table': self.quote_name(model._meta.db_table),
+            'partition': range_partition_sql(lower, upper, value),
+        })
+
+    def _fulltext_index_name(self, model, index):
+        column = model._meta.get_field(index.field).column
+        return index.name or self._create_index_name(model, [column], suffix='_fti')
+
+    def create_fulltext_index(self, model, index):
+        self.execute(self.sql_create_fulltext_index % {
+            'name': self.quote_name(self._fulltext_index_name(model, index)),
+            'table': self.quote_name(model._meta.db_table),
+            'column': self.quote_name(model._meta.get_field(index.field).column),
+            'parameters': index.parameters_sql(),
+        })
+
+    def delete_fulltext_index(self, model, index):
+        self.execute(self.sql_delete_fulltext_index % {
+            'name': self.quote_name(self._fulltext_index_name(model, index)),
+        })
+
+    def create_case_insensitive_index(self, model, field):
+        """
+        Add a generated upper case copy of the field's column (filled for existing rows as well) and index it.
+        """
+        column = self.connection.ops.case_insensitive_column_name(field.column)
+        self.execute(self.sql_create_upper_column % {
+            'table': self.quote_name(model._meta.db_table),
+            'column': self.quote_name(column),
+            'type': field.db_type(self.connection),
+            'source': self.quote_name(field.column),
+        })
+        self.execute(self.sql_create_index % {
+            'name': self.quote_name(self._create_index_name(model, [column])),
+            'table': self.quote_name(model._meta.db_table),
+            'columns': self.quote_name(column),
+            'extra': '',
+        })
+
+    def delete_case_insensitive_index(self, model, field):
+        column = self.connection.ops.case_insensitive_column_name(field.column)
+        self.execute(self.sql_delete_index % {
+            'name': self.quote_name(self._create_index_name(model, [column])),
+        })
+        self.execute(self.sql_delete_column % {
+            'table': self.quote_name(model._meta.db_table),
+            'column': self.quote_name(column),
+        })
@@ -0,0 +1,86 @@
+"""
+Full-text search backed by SAP HANA's CONTAINS() predicate and fulltext indexes.
+
+Importing this module registers the `search` and `fuzzy_search` lookups on CharField and TextField (unless another
+`search` lookup, e.g. of django.contrib.postgres, is registered already). They are only supported by SAP HANA:
+
+    Product.objects.filter(description__search='red shoes').annotate(score=SearchScore()).order_by('-score')
+"""
+from django.db.models import CharField, FloatField, Func, Lookup, TextField
+from django.utils.deconstruct import deconstructible
+
+
+@deconstructible(path='django_hana.search.FulltextIndex')
+class FulltextIndex(object):
+    """
+    A fulltext index on a single column, see the fulltext_index decorator.
+    """
+
+    def __init__(self, field, name=None, fuzzy_search_index=False, sync=True):
+        self.field = field
+        self.name = name
+        self.fuzzy_search_index = fuzzy_search_index
+        self.sync = sync
+
+    def __eq__(self, other):
+        return isinstance(other, self.__class__) and self.deconstruct() == other.deconstruct()
+
+    def __ne__(self, other):
+        return not self == other
+
+    def parameters_sql(self):
+        parameters = ['SYNC' if self.sync else 'ASYNC']
+        if self.fuzzy_search_index:
+            parameters.append('FUZZY SEARCH INDEX ON')
+        return ' '.join(parameters)
+
+
+class Search(Lookup):
+    lookup_name = 'search'
+    template = 'CONTAINS(%(lhs)s, %(rhs)s)'
+    threshold = None
+
+    def as_sql(self, compiler, connection):
+        raise NotImplementedError(
+            'The %s lookup of django_hana.search is only supported by SAP HANA.' % self.lookup_name
+        )
+
+    def as_hana(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return self.template % {'lhs': lhs, 'rhs': rhs, 'threshold': self.threshold}, lhs_params + rhs_params
+
+
+class FuzzySearch(Search):
+    """
+    Fault-tolerant search. Matches above the threshold (0 to 1, default 0.8) are returned. Pass the terms and the
+    threshold as tuple to change it, e.g. `description__fuzzy_search=('red shoes', 0.7)`.
+    """
+    lookup_name = 'fuzzy_search'
+    template = 'CONTAINS(%(lhs)s, %(rhs)s, FUZZY(%(threshold)s))'
+    threshold = 0.8
+
+    def __init__(self, lhs, rhs):
+        if isinstance(rhs, (list, tuple)):
+            rhs, threshold = rhs
+            # part of the statement text
+            self.threshold = float(threshold)
+        super(FuzzySearch, self).__init__(lhs, rhs)
+
+
+class SearchScore(Func):
+    """
+    Relevance (0 to 1) of a row for the search lookups of the same query.
+    """
+    template = 'SCORE()'
+
+    def __init__(self, **extra):
+        extra.setdefault('output_field', FloatField())
+        super(SearchScore, self).__init__(**extra)
+
+
+for field_class in (CharField, TextField):
+    # don't replace the search lookup of other backends, e.g. of django.contrib.postgres
+    if 'search' not in field_class.__dict__.get('class_lookups', {}):
+        field_class.register_lookup(Search)
+    field_class.register_lookup(FuzzySearch)
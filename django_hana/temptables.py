@@ -0,0 +1,115 @@
+"""
+Session-local temporary tables holding the values of large IN lookups and the rows of bulk updates.
+
+Above IN_TABLE_THRESHOLD values, `column IN (?, ?, ...)` is compiled to
+`column IN (SELECT "VALUE" FROM "#DJANGO_HANA_IN_<n>" WHERE "SET_ID" = ?)` instead, which doesn't hit the parameter
+limit and always has the same statement text. The set id is passed as InValues parameter, whose values are loaded with
+executemany by the cursor right before the statement is executed (compiling a query has no side effects). There is one
+table per column type and connection, which is emptied and reused by later statements. SAP HANA commits DDL statements,
+so the tables are only created outside of transactions; until then lookups in transactions use placeholders.
+
+BulkQuerySet.bulk_update (see django_hana.bulk) loads the rows into a staging table per table and set of columns, which
+is reused the same way.
+"""
+
+
+class InValues(object):
+    """
+    Parameter standing for the id of a set of values in the temporary table of the column type.
+    """
+
+    def __init__(self, db_type, values):
+        self.db_type = db_type
+        self.values = list(values)
+
+    def __repr__(self):
+        return '<InValues: %d values>' % len(self.values)
+
+
+class TemporaryTables(object):
+    def __init__(self, connection):
+        self.connection = connection
+        self.names = {}
+        self.reset()
+
+    def reset(self):
+        """
+        Called on connect, temporary tables don't survive the session.
+        """
+        self.created = set()
+
+    def available(self, key):
+        """
+        Whether the table exists or can be created without committing a transaction.
+        """
+        return key in self.created or (self.connection.get_autocommit() and not self.connection.in_atomic_block)
+
+
+class InValueTables(TemporaryTables):
+    table_name = '#DJANGO_HANA_IN_%d'
+
+    @property
+    def threshold(self):
+        return self.connection.settings_dict.get('IN_TABLE_THRESHOLD', 1000)
+
+    def table(self, db_type):
+        """
+        Return the name of the table for values of the column type.
+        """
+        if db_type not in self.names:
+            self.names[db_type] = self.connection.ops.quote_name(self.table_name % (len(self.names) + 1))
+        return self.names[db_type]
+
+    def load(self, cursor, params):
+        """
+        Load the values of the InValues parameters of a statement with the given (raw) cursor and return the params
+        with their set ids instead. Values of earlier statements are removed.
+        """
+        if not isinstance(params, (list, tuple)) or not any(isinstance(param, InValues) for param in params):
+            return params
+        sets = [param for param in params if isinstance(param, InValues)]
+        for db_type in set(values.db_type for values in sets):
+            name = self.table(db_type)
+            if db_type in self.created:
+                cursor.execute('DELETE FROM %s' % name)
+            else:
+                cursor.execute('CREATE LOCAL TEMPORARY COLUMN TABLE %s ("SET_ID" INTEGER, "VALUE" %s)' % (
+                    name, db_type,
+                ))
+                self.created.add(db_type)
+        ops = self.connection.ops
+        set_ids = {}
+        for values in sets:
+            if id(values) in set_ids:
+                continue
+            set_id = set_ids[id(values)] = len(set_ids) + 1
+            rows = ops.modify_insert_params(None, [[set_id, value] for value in values.values])
+            batch_size = max(ops.bulk_batch_size(['SET_ID', 'VALUE'], rows), 1)
+            for start in range(0, len(rows), batch_size):
+                cursor.executemany(
+                    'INSERT INTO %s VALUES (?, ?)' % self.table(values.db_type), rows[start:start + batch_size],
+                )
+        return type(params)(set_ids[id(param)] if isinstance(param, InValues) else param for param in params)
+
+
+class StagingTables(TemporaryTables):
+    table_name = '#%s_update_%d'
+
+    def table(self, db_table, columns):
+        """
+        Return the name of the staging table for rows of the table with the given column definitions.
+        """
+        if (db_table, columns) not in self.names:
+            number = len([key for key in self.names if key[0] == db_table]) + 1
+            self.names[(db_table, columns)] = self.connection.ops.quote_name(self.table_name % (db_table, number))
+        return self.names[(db_table, columns)]
+
+    def create(self, cursor, db_table, columns):
+        """
+        Create the staging table unless it exists and return its name.
+        """
+        name = self.table(db_table, columns)
+        if (db_table, columns) not in self.created:
+            cursor.execute('CREATE LOCAL TEMPORARY COLUMN TABLE %s (%s)' % (name, ', '.join(columns)))
+            self.created.add((db_table, columns))
+        return name
@@ -0,0 +1,77 @@
+"""
+Time series aggregation with server-side gap filling.
+
+SAP HANA generates the series of periods (SERIES_GENERATE_TIMESTAMP) and the aggregated rows of a queryset are joined
+to it, so every period between start and end is returned, even if no rows fall into it:
+
+    gap_filled(Reading.objects.filter(sensor=sensor), 'measured_at', 'hour', start, end, value=Avg('value'))
+"""
+from django.db import connections
+from django.db.models import DateTimeField, Func
+
+BUCKET = 'hana_bucket'
+
+
+class SeriesRound(Func):
+    """
+    The given date or timestamp rounded down to the start of its period (e.g. 'hour' or 'week').
+    """
+
+    def __init__(self, expression, kind, **extra):
+        extra.setdefault('output_field', DateTimeField())
+        super(SeriesRound, self).__init__(expression, **extra)
+        self.kind = kind
+
+    def as_sql(self, compiler, connection):
+        sql, params = compiler.compile(self.source_expressions[0])
+        return connection.ops.series_round_sql(self.kind, sql), params
+
+
+def gap_filled_sql(queryset, field, kind, start, end, default=None, **aggregates):
+    """
+    Return the SQL and params of gap_filled().
+    """
+    connection = connections[queryset.db]
+    qn = connection.ops.quote_name
+    interval = connection.ops.trunc_intervals[kind]
+
+    data = queryset.annotate(**{BUCKET: SeriesRound(field, kind)}).values(BUCKET).annotate(**aggregates).order_by()
+    data_sql, data_params = data.query.get_compiler(queryset.db).as_sql()
+
+    columns = []
+    params = []
+    for name in aggregates:
+        if default is None:
+            columns.append('data.%s' % qn(name))
+        else:
+            columns.append('COALESCE(data.%s, %%s)' % qn(name))
+            params.append(default)
+    sql = (
+        'SELECT series.GENERATED_PERIOD_START, %(columns)s '
+        "FROM SERIES_GENERATE_TIMESTAMP('%(interval)s', SERIES_ROUND(%%s, '%(interval)s', ROUND_DOWN), %%s) series "
+        'LEFT OUTER JOIN (%(data)s) data ON data.%(bucket)s = series.GENERATED_PERIOD_START '
+        'ORDER BY series.GENERATED_PERIOD_START'
+    ) % {
+        'columns': ', '.join(columns),
+        'interval': interval,
+        'data': data_sql,
+        'bucket': qn(BUCKET),
+    }
+    return sql, tuple(params) + (start, end) + tuple(data_params)
+
+
+def gap_filled(queryset, field, kind, start, end, default=None, **aggregates):
+    """
+    Aggregate the queryset per period of the given kind (second, minute, hour, day, week, month, quarter or year)
+    between start (inclusive) and end (exclusive).
+
+    Return one dict per period with the start of the period as 'period' and the aggregates. The aggregates of empty
+    periods are None or the given default.
+    """
+    if not aggregates:
+        raise TypeError('gap_filled() requires at least one aggregate.')
+    sql, params = gap_filled_sql(queryset, field, kind, start, end, default, **aggregates)
+    names = ['period'] + list(aggregates)
+    with connections[queryset.db].cursor() as cursor:
+        cursor.execute(sql, params)
+        return [dict(zip(names, row)) for row in cursor.fetchall()]
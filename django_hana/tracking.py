@@ -0,0 +1,254 @@
+"""
+Bookkeeping of the statements executed through the backend's cursors.
+"""
+import re
+import threading
+
+from django.apps import apps
+
+import django_hana
+
+identifier = r'(?:"(?:[^"]|"")+"|[\w$#]+)'
+table_re = r'(%s(?:\s*\.\s*%s)?)' % (identifier, identifier)
+
+write_re = re.compile(
+    r'^\s*(?:INSERT\s+INTO|UPDATE|DELETE\s+FROM|UPSERT|REPLACE|MERGE\s+INTO)\s+%s' % table_re,
+    re.IGNORECASE,
+)
+truncate_re = re.compile(r'^\s*TRUNCATE\s+TABLE\s+%s\s*$' % table_re, re.IGNORECASE)
+select_re = re.compile(r'^\s*SELECT\b(.*?)\bFROM\s+%s(.*)$' % table_re, re.IGNORECASE | re.DOTALL)
+where_re = re.compile(r'\bWHERE\b(.*?)(?:\bGROUP\s+BY\b|\bORDER\s+BY\b|\bLIMIT\b|\bFOR\s+UPDATE\b|$)',
+                      re.IGNORECASE | re.DOTALL)
+and_re = re.compile(r'\bAND\b', re.IGNORECASE)
+equality_re = re.compile(r'^\s*\(?\s*%s(?:\s*\.\s*%s)?\s*=\s*(?:%%s|\?|-?\d+|\'[^\']*\')\s*\)?\s*$' % (
+    identifier, identifier,
+))
+aggregate_re = re.compile(
+    r'\b(?:COUNT|SUM|AVG|MIN|MAX|STDDEV\w*|VAR\w*|MEDIAN|PERCENTILE_\w+|ST_\w+AGGR)\s*\(|\bGROUP\s+BY\b',
+    re.IGNORECASE,
+)
+copy_data_re = re.compile(r'\bWITH\s+DATA\b|\bAS\s*\(?\s*SELECT\b', re.IGNORECASE)
+
+# Statements that never add rows to a table
+READ_KEYWORDS = ('SELECT', 'WITH', 'EXPLAIN', 'SET', 'COMMIT', 'ROLLBACK', 'SAVEPOINT', 'RELEASE', 'LOCK')
+DDL_KEYWORDS = ('CREATE', 'ALTER', 'DROP', 'RENAME', 'COMMENT', 'GRANT', 'REVOKE', 'MERGE DELTA')
+
+
+def normalize_table_name(name):
+    """
+    Return the name of a table as stored in the catalog, i.e. without schema and quotes. Unquoted identifiers are
+    upper case in SAP HANA.
+    """
+    name = re.split(r'\.(?=(?:[^"]*"[^"]*")*[^"]*$)', name.strip())[-1].strip()
+    if name.startswith('"') and name.endswith('"'):
+        return name[1:-1].replace('""', '"')
+    return name.upper()
+
+
+def written_table(sql):
+    """
+    Return the (normalized) name of the table a DML statement writes to, or None.
+    """
+    match = write_re.match(sql)
+    if match:
+        return normalize_table_name(match.group(1))
+    return None
+
+
+def is_point_lookup(select_list, remainder):
+    """
+    A point lookup selects rows by equality predicates only (e.g. by primary key) and doesn't aggregate.
+    """
+    if aggregate_re.search(select_list) or aggregate_re.search(remainder):
+        return False
+    match = where_re.search(remainder)
+    if not match:
+        return False
+    return all(equality_re.match(predicate) for predicate in and_re.split(match.group(1)))
+
+
+class DirtyTables(object):
+    """
+    Keeps track of the tables that may contain rows or whose sequence has advanced, i.e. the tables that were written to
+    since they were flushed the last time. The state is unknown (None) until the first flush, in which case every table
+    has to be flushed.
+
+    A table is only clean once the statement emptying it, as generated by sql_flush, has been executed (and committed,
+    see DatabaseWrapper.track_dirty_tables). Deleting its rows otherwise doesn't restart its sequence.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.schema = None
+        self.tables = None
+        self.flush_statements = {}
+        self.unknown_tables = None
+
+    def bind(self, schema):
+        """
+        Called on connect. Anything known about the tables of a different schema is meaningless.
+        """
+        with self.lock:
+            if schema != self.schema:
+                self.schema = schema
+                self.tables = None
+                self.flush_statements = {}
+                self.unknown_tables = None
+
+    def reset(self):
+        with self.lock:
+            self.tables = set()
+
+    def expect_flush(self, statements):
+        """
+        Called by sql_flush with the statements emptying the tables ({statement: table}).
+        """
+        with self.lock:
+            self.flush_statements = dict(
+                (statement, normalize_table_name(table)) for statement, table in statements.items()
+            )
+            # the state is known once all tables have been flushed
+            self.unknown_tables = set(self.flush_statements.values()) if self.tables is None else None
+
+    def flushed(self, tables):
+        """
+        Mark the tables as clean, their flush statements have been executed and committed.
+        """
+        with self.lock:
+            if self.tables is not None:
+                self.tables.difference_update(tables)
+            elif self.unknown_tables is not None:
+                self.unknown_tables.difference_update(tables)
+                if not self.unknown_tables:
+                    self.tables = set()
+                    self.unknown_tables = None
+
+    def track(self, sql):
+        """
+        Record a statement. Return the table it empties if it's a flush statement, see expect_flush.
+        """
+        with self.lock:
+            table = self.flush_statements.pop(sql, None)
+            if table is not None:
+                return table
+            if self.tables is None:
+                return None
+            table = written_table(sql)
+            if table:
+                self.tables.add(table)
+                return None
+            if truncate_re.match(sql):
+                # TRUNCATE doesn't add rows, but only a flush restarts the sequence
+                return None
+            statement = sql.lstrip().upper()
+            if statement.startswith(READ_KEYWORDS):
+                return None
+            if statement.startswith(DDL_KEYWORDS) and not copy_data_re.search(sql):
+                return None
+            # Procedure calls, anonymous blocks, CREATE TABLE ... AS SELECT, etc. may write to any table
+            self.tables = None
+            return None
+
+    def filter(self, tables):
+        """
+        Return the subset of the given tables that may contain rows.
+        """
+        with self.lock:
+            if self.tables is None:
+                return list(tables)
+            return [table for table in tables if normalize_table_name(table) in self.tables]
+
+
+class WorkloadStats(object):
+    """
+    Counts reads, writes, point lookups and scans per table to recommend the table type (ROW or COLUMN store) that
+    fits the observed workload.
+    """
+    # Minimum number of statements on a table before a recommendation is given
+    min_statements = 100
+    # The row store pays off for write-heavy tables that are mostly read by point lookups
+    row_store_write_ratio = 0.5
+    row_store_point_lookup_ratio = 0.8
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.tables = {}
+
+    def record(self, sql, count=1):
+        table = written_table(sql)
+        if table:
+            kind = 'writes'
+        else:
+            match = select_re.match(sql)
+            if not match:
+                return
+            select_list, table, remainder = match.groups()
+            table = normalize_table_name(table)
+            kind = 'point_lookups' if is_point_lookup(select_list, remainder) else 'scans'
+        with self.lock:
+            counts = self.tables.setdefault(table, {'writes': 0, 'point_lookups': 0, 'scans': 0})
+            counts[kind] += count
+
+    def clear(self):
+        with self.lock:
+            self.tables = {}
+
+    def recommend(self, counts):
+        reads = counts['point_lookups'] + counts['scans']
+        total = reads + counts['writes']
+        if total < self.min_statements:
+            return None
+        write_ratio = float(counts['writes']) / total
+        point_lookup_ratio = float(counts['point_lookups']) / reads if reads else 1.0
+        if write_ratio >= self.row_store_write_ratio and point_lookup_ratio >= self.row_store_point_lookup_ratio:
+            return 'ROW'
+        return 'COLUMN'
+
+    def report(self, connection):
+        """
+        Return one entry per table seen so far with its counters, the current and the recommended table type.
+        """
+        models = {}
+        for model in apps.get_models(include_auto_created=True):
+            models[normalize_table_name(connection.ops.quote_name(model._meta.db_table))] = model
+        default_store = connection.settings_dict.get('DEFAULT_MODEL_STORE', 'COLUMN')
+
+        with self.lock:
+            tables = dict((table, dict(counts)) for table, counts in self.tables.items())
+        report = []
+        for table in sorted(tables):
+            counts = tables[table]
+            model = models.get(table)
+            reads = counts['point_lookups'] + counts['scans']
+            report.append({
+                'table': table,
+                'model': django_hana._model_label(model) if model else None,
+                'store': django_hana.get_model_store(model, default_store) if model else None,
+                'reads': reads,
+                'writes': counts['writes'],
+                'point_lookups': counts['point_lookups'],
+                'scans': counts['scans'],
+                'recommendation': self.recommend(counts),
+            })
+        return report
+
+
+_trackers = {}
+_trackers_lock = threading.Lock()
+
+
+def _get_tracker(tracker_class, alias):
+    # Trackers are shared by the connections of all threads, since connections of other threads (e.g. of a live
+    # server) work on the same tables.
+    with _trackers_lock:
+        if (tracker_class, alias) not in _trackers:
+            _trackers[tracker_class, alias] = tracker_class()
+        return _trackers[tracker_class, alias]
+
+
+def get_dirty_tables(alias):
+    return _get_tracker(DirtyTables, alias)
+
+
+def get_workload_stats(alias):
+    return _get_tracker(WorkloadStats, alias)
@@ -9,6 +9,6 @@ setup(
     author='Max Bothe, Kapil Ratnani',
     author_email='mathebox@gmail.com, kapil.ratnani@iiitb.net',
     url='https://github.com/mathebox/django_hana',
-    packages=['django_hana'],
+    packages=['django_hana', 'django_hana.gis'],
     test_suite='runtests.runtests',
 )
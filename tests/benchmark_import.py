@@ -0,0 +1,44 @@
+"""
+Cold start of the plain and the spatial backend: django.setup() plus loading the backend (the first access to
+connection.ops), measured in fresh interpreters:
+
+    python -m tests.benchmark_import [runs]
+
+The plain backend (ENGINE 'django_hana') must not import GeoDjango, see TestSpatialBackend.test_lazy_import.
+"""
+import os
+import subprocess
+import sys
+
+MEASURE = """
+import sys
+import time
+
+start = time.time()
+import django
+django.setup()
+from django.db import connections
+connections[sys.argv[1]].ops
+print('%f %d' % (time.time() - start, any(name.startswith('django.contrib.gis') for name in sys.modules)))
+"""
+
+
+def measure(alias):
+    env = dict(os.environ, DJANGO_SETTINGS_MODULE='tests.test_settings')
+    cwd = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    output = subprocess.check_output([sys.executable, '-c', MEASURE, alias], env=env, cwd=cwd)
+    duration, gis_imported = output.decode().split()
+    return float(duration), bool(int(gis_imported))
+
+
+def main(runs=11):
+    for alias, engine in (('default', 'django_hana'), ('gis', 'django_hana.gis')):
+        results = [measure(alias) for run in range(runs)]
+        durations = sorted(duration for duration, gis_imported in results)
+        print('%-16s median %6.1f ms, min %6.1f ms, django.contrib.gis imported: %s' % (
+            engine, durations[len(durations) // 2] * 1000, durations[0] * 1000, results[0][1],
+        ))
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -1,6 +1,8 @@
+from django.contrib.gis.db import models as gis_models
 from django.db import models
 
-from django_hana import column_store, row_store
+from django_hana import cache_results, case_insensitive_index, column_store, fulltext_index, partition_by, row_store
+from django_hana.partitioning import Hash, Range
 
 
 class SimpleModel(models.Model):
@@ -62,3 +64,46 @@ class SimpleRowModel(models.Model):
 
     class Meta:
         app_label = 'test_dhp'
+
+
+@column_store
+@partition_by(Hash('id', partitions=4), Range('date_field', boundaries=['2016-01-01', '2017-01-01', '2018-01-01']))
+class PartitionedModel(models.Model):
+    date_field = models.DateField()
+
+    class Meta:
+        app_label = 'test_dhp'
+
+
+@column_store
+@fulltext_index('text_field', fuzzy_search_index=True)
+class FulltextModel(models.Model):
+    text_field = models.TextField()
+
+    class Meta:
+        app_label = 'test_dhp'
+
+
+@column_store
+@case_insensitive_index('email_field')
+class CaseInsensitiveModel(models.Model):
+    email_field = models.EmailField()
+
+    class Meta:
+        app_label = 'test_dhp'
+
+
+@cache_results
+class CachedModel(models.Model):
+    char_field = models.CharField(max_length=100)
+
+    class Meta:
+        app_label = 'test_dhp'
+
+
+class SpatialModel(models.Model):
+    point_field = gis_models.PointField()
+    polygon_field = gis_models.PolygonField(null=True)
+
+    class Meta:
+        app_label = 'test_dhp'
@@ -1,19 +1,52 @@
 import datetime
 import decimal
+import os
+import socket
+import subprocess
+import sys
 import unittest
 import uuid
 
 import django
 import mock
-from django.db import connection, models
+from django.contrib.gis.db.models import Collect, Extent, MakeLine, PointField, Union
+from django.contrib.gis.geos import Point, Polygon
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management.color import no_style
+from django.core.paginator import InvalidPage
+from django.db import connection, connections, migrations, models, transaction
+from django.db.migrations.state import ModelState, ProjectState
 from django.db.models.fields.files import FieldFile
 from django.utils import six
 from mock import call
 
+from django_hana.aggregates import Median, PercentileCont, PercentileDisc
 from django_hana.base import Database
+from django_hana.bulk import BulkQuerySet
+from django_hana.endpoints import EndpointPool, get_endpoint_pool, parse_endpoints
+from django_hana.gis.aggregates import Centroid
+from django_hana.gis.nearest import nearest
+from django_hana.gis.vectortiles import vector_tile
+from django_hana.grouping import GroupingQuerySet
+from django_hana.locking import LockingQuerySet
+from django_hana.migration_operations import (
+    AddCaseInsensitiveIndex, AddFulltextIndex, AddRangePartition, AlterModelPartitioning, AlterModelStore,
+    DropRangePartition
+)
+from django_hana.pagination import KeysetPaginator
+from django_hana.partitioning import Hash, Range, partition_filters
+from django_hana.search import FulltextIndex, SearchScore
+from django_hana.timeseries import gap_filled, gap_filled_sql
+from django_hana.tracking import WorkloadStats
 
-from .mock_db import mock_hana, patch_db_execute, patch_db_executemany, patch_db_fetchmany, patch_db_fetchone
-from .models import ComplexModel, RelationModel, SimpleColumnModel, SimpleModel, SimpleRowModel
+from .mock_db import (
+    MockConnection, mock_hana, patch_db_execute, patch_db_executemany, patch_db_fetchall, patch_db_fetchmany,
+    patch_db_fetchone
+)
+from .models import (
+    CachedModel, CaseInsensitiveModel, ComplexModel, FulltextModel, PartitionedModel, RelationModel, SimpleColumnModel,
+    SimpleModel, SimpleRowModel, SpatialModel
+)
 
 
 class DatabaseConnectionMixin(object):
@@ -27,6 +60,22 @@ class DatabaseConnectionMixin(object):
 
 
 class TestSetup(DatabaseConnectionMixin, unittest.TestCase):
+    def migrate(self, model, *operations):
+        """
+        Replay the migration creating the table of a model followed by the given operations.
+        """
+        model_state = ModelState.from_model(model)
+        operations = (
+            migrations.CreateModel(model_state.name, model_state.fields, model_state.options, model_state.bases),
+        ) + operations
+        state = ProjectState()
+        with connection.schema_editor() as editor:
+            for operation in operations:
+                new_state = state.clone()
+                operation.state_forwards('test_dhp', new_state)
+                operation.database_forwards('test_dhp', editor, state, new_state)
+                state = new_state
+
     @mock_hana
     @patch_db_execute
     def test_create_table(self, mock_execute):
@@ -195,6 +244,216 @@ class TestSetup(DatabaseConnectionMixin, unittest.TestCase):
             editor.create_model(SimpleRowModel)
         self.assertSequenceEqual(mock_execute.call_args_list, expected_statements)
 
+    @mock_hana
+    @patch_db_execute
+    def test_alter_model_store(self, mock_execute):
+        expected_statements = [
+            call('ALTER TABLE "TEST_DHP_SIMPLEROWMODEL" COLUMN', []),
+            call('ALTER TABLE "TEST_DHP_SIMPLEROWMODEL" ROW', []),
+        ]
+        state = ProjectState()
+        state.add_model(ModelState.from_model(SimpleRowModel))
+        operation = AlterModelStore('SimpleRowModel', 'COLUMN', old_store='ROW')
+
+        with connection.schema_editor() as editor:
+            operation.database_forwards('test_dhp', editor, state, state)
+            operation.database_backwards('test_dhp', editor, state, state)
+        self.assertSequenceEqual(mock_execute.call_args_list, expected_statements)
+
+    @mock_hana
+    @patch_db_execute
+    def test_create_partitioned_table(self, mock_execute):
+        expected_statements = [
+            call(
+                'CREATE COLUMN TABLE "TEST_DHP_PARTITIONEDMODEL" '
+                '("ID" INTEGER NOT NULL PRIMARY KEY, "DATE_FIELD" DATE NOT NULL) '
+                'PARTITION BY HASH ("ID") PARTITIONS 4, '
+                "RANGE (\"DATE_FIELD\") (PARTITION '2016-01-01' <= VALUES < '2017-01-01', "
+                "PARTITION '2017-01-01' <= VALUES < '2018-01-01', PARTITION OTHERS)",
+                None
+            ),
+            call(
+                'CREATE SEQUENCE "TEST_DHP_PARTITIONEDMODEL_ID_SEQ" '
+                'RESET BY SELECT IFNULL(MAX("ID"),0) + 1 FROM "TEST_DHP_PARTITIONEDMODEL"',
+                []
+            ),
+        ]
+
+        with connection.schema_editor() as editor:
+            editor.create_model(PartitionedModel)
+        self.assertSequenceEqual(mock_execute.call_args_list, expected_statements)
+
+    @mock_hana
+    @patch_db_execute
+    def test_alter_partitioning(self, mock_execute):
+        expected_statements = [
+            call('ALTER TABLE "TEST_DHP_PARTITIONEDMODEL" PARTITION BY HASH ("ID") PARTITIONS GET_NUM_SERVERS()', []),
+            call('ALTER TABLE "TEST_DHP_PARTITIONEDMODEL" MERGE PARTITIONS', []),
+            call('ALTER TABLE "TEST_DHP_PARTITIONEDMODEL" ADD PARTITION \'2018-01-01\' <= VALUES < \'2019-01-01\'', []),
+            call(
+                'ALTER TABLE "TEST_DHP_PARTITIONEDMODEL" DROP PARTITION \'2016-01-01\' <= VALUES < \'2017-01-01\'',
+                []
+            ),
+        ]
+        state = ProjectState()
+        state.add_model(ModelState.from_model(PartitionedModel))
+        operations = [
+            AlterModelPartitioning('PartitionedModel', [Hash('id')]),
+            AlterModelPartitioning('PartitionedModel', []),
+            AddRangePartition('PartitionedModel', lower='2018-01-01', upper='2019-01-01'),
+            DropRangePartition('PartitionedModel', lower='2016-01-01', upper='2017-01-01'),
+        ]
+
+        with connection.schema_editor() as editor:
+            for operation in operations:
+                operation.database_forwards('test_dhp', editor, state, state)
+        self.assertSequenceEqual(mock_execute.call_args_list, expected_statements)
+
+    @mock_hana
+    @patch_db_execute
+    def test_migrate_partitioning(self, mock_execute):
+        # the table created by the migration is partitioned as of the migration, not as the decorator says
+        expected_statements = [
+            call('CREATE COLUMN TABLE "TEST_DHP_PARTITIONEDMODEL" '
+                 '("ID" INTEGER NOT NULL PRIMARY KEY, "DATE_FIELD" DATE NOT NULL)', None),
+            call(
+                'ALTER TABLE "TEST_DHP_PARTITIONEDMODEL" PARTITION BY HASH ("ID") PARTITIONS 4, '
+                "RANGE (\"DATE_FIELD\") (PARTITION '2016-01-01' <= VALUES < '2017-01-01', PARTITION OTHERS)",
+                []
+            ),
+            call('ALTER TABLE "TEST_DHP_PARTITIONEDMODEL" ADD PARTITION \'2017-01-01\' <= VALUES < \'2018-01-01\'', []),
+            call(
+                'CREATE SEQUENCE "TEST_DHP_PARTITIONEDMODEL_ID_SEQ" '
+                'RESET BY SELECT IFNULL(MAX("ID"),0) + 1 FROM "TEST_DHP_PARTITIONEDMODEL"',
+                []
+            ),
+        ]
+
+        self.migrate(
+            PartitionedModel,
+            AlterModelPartitioning('PartitionedModel', [
+                Hash('id', partitions=4), Range('date_field', boundaries=['2016-01-01', '2017-01-01']),
+            ]),
+            AddRangePartition('PartitionedModel', lower='2017-01-01', upper='2018-01-01'),
+        )
+        self.assertSequenceEqual(mock_execute.call_args_list, expected_statements)
+
+    @mock_hana
+    @patch_db_execute
+    def test_create_fulltext_index(self, mock_execute):
+        expected_statements = [
+            call('CREATE COLUMN TABLE "TEST_DHP_FULLTEXTMODEL" ("ID" INTEGER NOT NULL PRIMARY KEY, '
+                 '"TEXT_FIELD" NCLOB NOT NULL)', None),
+            call(
+                'CREATE FULLTEXT INDEX "TEST_DHP_FULLTEXTMODEL_TEXT_FIELD_7D030168_FTI" ON "TEST_DHP_FULLTEXTMODEL" '
+                '("TEXT_FIELD") SYNC FUZZY SEARCH INDEX ON',
+                []
+            ),
+            call(
+                'CREATE SEQUENCE "TEST_DHP_FULLTEXTMODEL_ID_SEQ" '
+                'RESET BY SELECT IFNULL(MAX("ID"),0) + 1 FROM "TEST_DHP_FULLTEXTMODEL"',
+                []
+            ),
+        ]
+
+        with connection.schema_editor() as editor:
+            editor.create_model(FulltextModel)
+        self.assertSequenceEqual(mock_execute.call_args_list, expected_statements)
+
+    @mock_hana
+    @patch_db_execute
+    def test_migrate_fulltext_index(self, mock_execute):
+        # the table created by the migration doesn't get the index of the decorator, only the operation creates it
+        expected_statements = [
+            call('CREATE COLUMN TABLE "TEST_DHP_FULLTEXTMODEL" ("ID" INTEGER NOT NULL PRIMARY KEY, '
+                 '"TEXT_FIELD" NCLOB NOT NULL)', None),
+            call(
+                'CREATE FULLTEXT INDEX "TEST_DHP_FULLTEXTMODEL_TEXT_FIELD_7D030168_FTI" ON "TEST_DHP_FULLTEXTMODEL" '
+                '("TEXT_FIELD") SYNC FUZZY SEARCH INDEX ON',
+                []
+            ),
+            call(
+                'CREATE SEQUENCE "TEST_DHP_FULLTEXTMODEL_ID_SEQ" '
+                'RESET BY SELECT IFNULL(MAX("ID"),0) + 1 FROM "TEST_DHP_FULLTEXTMODEL"',
+                []
+            ),
+        ]
+
+        self.migrate(
+            FulltextModel, AddFulltextIndex('FulltextModel', FulltextIndex('text_field', fuzzy_search_index=True)),
+        )
+        self.assertSequenceEqual(mock_execute.call_args_list, expected_statements)
+
+    @mock_hana
+    @patch_db_execute
+    def test_create_case_insensitive_index(self, mock_execute):
+        expected_statements = [
+            call('CREATE COLUMN TABLE "TEST_DHP_CASEINSENSITIVEMODEL" ("ID" INTEGER NOT NULL PRIMARY KEY, '
+                 '"EMAIL_FIELD" NVARCHAR(254) NOT NULL)', None),
+            call(
+                'ALTER TABLE "TEST_DHP_CASEINSENSITIVEMODEL" '
+                'ADD ("EMAIL_FIELD_UPPER" NVARCHAR(254) GENERATED ALWAYS AS UPPER("EMAIL_FIELD"))',
+                []
+            ),
+            call(
+                'CREATE INDEX "TEST_DHP_CASEINSENSITIVEMODEL_208A58AD" ON "TEST_DHP_CASEINSENSITIVEMODEL" '
+                '("EMAIL_FIELD_UPPER")',
+                []
+            ),
+            call(
+                'CREATE SEQUENCE "TEST_DHP_CASEINSENSITIVEMODEL_ID_SEQ" '
+                'RESET BY SELECT IFNULL(MAX("ID"),0) + 1 FROM "TEST_DHP_CASEINSENSITIVEMODEL"',
+                []
+            ),
+        ]
+
+        with connection.schema_editor() as editor:
+            editor.create_model(CaseInsensitiveModel)
+        self.assertSequenceEqual(mock_execute.call_args_list, expected_statements)
+
+    @mock_hana
+    @patch_db_execute
+    def test_migrate_case_insensitive_index(self, mock_execute):
+        # the table created by the migration doesn't get the column of the decorator, only the operation adds it
+        expected_statements = [
+            call('CREATE COLUMN TABLE "TEST_DHP_CASEINSENSITIVEMODEL" ("ID" INTEGER NOT NULL PRIMARY KEY, '
+                 '"EMAIL_FIELD" NVARCHAR(254) NOT NULL)', None),
+            call(
+                'ALTER TABLE "TEST_DHP_CASEINSENSITIVEMODEL" '
+                'ADD ("EMAIL_FIELD_UPPER" NVARCHAR(254) GENERATED ALWAYS AS UPPER("EMAIL_FIELD"))',
+                []
+            ),
+            call(
+                'CREATE INDEX "TEST_DHP_CASEINSENSITIVEMODEL_208A58AD" ON "TEST_DHP_CASEINSENSITIVEMODEL" '
+                '("EMAIL_FIELD_UPPER")',
+                []
+            ),
+            call(
+                'CREATE SEQUENCE "TEST_DHP_CASEINSENSITIVEMODEL_ID_SEQ" '
+                'RESET BY SELECT IFNULL(MAX("ID"),0) + 1 FROM "TEST_DHP_CASEINSENSITIVEMODEL"',
+                []
+            ),
+        ]
+
+        self.migrate(CaseInsensitiveModel, AddCaseInsensitiveIndex('CaseInsensitiveModel', 'email_field'))
+        self.assertSequenceEqual(mock_execute.call_args_list, expected_statements)
+
+    def test_partition_filters(self):
+        filters = partition_filters(PartitionedModel)
+        self.assertEqual(len(filters), 3)
+        self.assertEqual(
+            sorted(filters[1].children),
+            [('date_field__gte', '2017-01-01'), ('date_field__lt', '2018-01-01')],
+        )
+        # the OTHERS partition
+        sql, params = PartitionedModel.objects.filter(filters[2]).query.get_compiler(connection=connection).as_sql()
+        self.assertEqual(
+            sql.split(' WHERE ')[1],
+            '("TEST_DHP_PARTITIONEDMODEL"."DATE_FIELD" < %s OR "TEST_DHP_PARTITIONEDMODEL"."DATE_FIELD" >= %s '
+            'OR "TEST_DHP_PARTITIONEDMODEL"."DATE_FIELD" IS NULL)',
+        )
+        self.assertEqual(params, ('2016-01-01', '2018-01-01'))
+
     @mock_hana
     @patch_db_execute
     def test_add_column_default_value(self, mock_execute):
@@ -213,6 +472,156 @@ class TestSetup(DatabaseConnectionMixin, unittest.TestCase):
         self.assertSequenceEqual(mock_execute.call_args_list, expected_statements)
 
 
+class TestTestDatabase(DatabaseConnectionMixin, unittest.TestCase):
+    @mock_hana
+    @patch_db_execute
+    @patch_db_fetchone
+    @patch_db_fetchall
+    def test_clone_test_db(self, mock_fetchall, mock_fetchone, mock_execute):
+        reset_by_query = 'SELECT IFNULL(MAX("ID"),0) + 1 FROM "TEST_DHP_SIMPLEMODEL"'
+        expected_statements = [
+            call('SELECT (1) AS a FROM schemas WHERE schema_name = ?', ['TESTING_DJANGO_HANA_1']),
+            call('CREATE SCHEMA "TESTING_DJANGO_HANA_1" ', ()),
+            call(
+                'SELECT table_name FROM tables WHERE schema_name = ? AND is_temporary = ?',
+                ['TESTING_DJANGO_HANA', 'FALSE']
+            ),
+            call(
+                'CREATE TABLE "TESTING_DJANGO_HANA_1"."TEST_DHP_SIMPLEMODEL" '
+                'LIKE "TESTING_DJANGO_HANA"."TEST_DHP_SIMPLEMODEL" WITH DATA',
+                ()
+            ),
+            call('SELECT sequence_name, reset_by_query FROM sequences WHERE schema_name = ?', ['TESTING_DJANGO_HANA']),
+            call(reset_by_query, ()),
+            call(
+                'CREATE SEQUENCE "TESTING_DJANGO_HANA_1"."TEST_DHP_SIMPLEMODEL_ID_SEQ" START WITH 5 '
+                'RESET BY ' + reset_by_query,
+                ()
+            ),
+        ]
+        mock_fetchone.side_effect = [None, [5]]
+        mock_fetchall.side_effect = [
+            [('TEST_DHP_SIMPLEMODEL',)],
+            [('TEST_DHP_SIMPLEMODEL_ID_SEQ', reset_by_query)],
+        ]
+
+        connection.creation._clone_test_db(1, verbosity=0)
+        self.assertSequenceEqual(mock_execute.call_args_list, expected_statements)
+
+    @mock_hana
+    @patch_db_execute
+    @patch_db_fetchone
+    def test_clone_test_db_keepdb(self, mock_fetchone, mock_execute):
+        expected_statements = [
+            call('SELECT (1) AS a FROM schemas WHERE schema_name = ?', ['TESTING_DJANGO_HANA_1']),
+        ]
+        mock_fetchone.side_effect = [[1]]
+
+        connection.creation._clone_test_db(1, verbosity=0, keepdb=True)
+        self.assertSequenceEqual(mock_execute.call_args_list, expected_statements)
+
+    @mock_hana
+    @patch_db_execute
+    @patch_db_fetchone
+    @mock.patch('django_hana.creation.time.sleep')
+    def test_destroy_test_db_waits_for_sessions(self, mock_sleep, mock_fetchone, mock_execute):
+        wait_statement = call(
+            'SELECT COUNT(*) FROM m_connections '
+            'WHERE current_schema_name = ? AND connection_id <> CURRENT_CONNECTION',
+            ['TEST_FOOBAR']
+        )
+        expected_statements = [
+            wait_statement,
+            wait_statement,
+            call('DROP SCHEMA "TEST_FOOBAR" CASCADE', ()),
+        ]
+        mock_fetchone.side_effect = [[1], [0]]
+
+        connection.creation._destroy_test_db('test_foobar', verbosity=0)
+        self.assertEqual(mock_sleep.call_count, 1)
+        self.assertSequenceEqual(mock_execute.call_args_list, expected_statements)
+
+
+class TestFlush(DatabaseConnectionMixin, unittest.TestCase):
+    tables = ['auth_group', 'auth_user', 'test_dhp_simplemodel']
+    sequences = [
+        {'table': 'auth_group', 'column': 'id'},
+        {'table': 'auth_user', 'column': 'id'},
+        {'table': 'test_dhp_simplemodel', 'column': 'id'},
+    ]
+
+    @mock_hana
+    @patch_db_execute
+    def test_flush_dirty_tables(self, mock_execute):
+        expected_statements = [
+            'DELETE FROM "AUTH_GROUP"',
+            'DELETE FROM "AUTH_USER"',
+            'TRUNCATE TABLE "TEST_DHP_SIMPLEMODEL"',
+            'ALTER SEQUENCE "AUTH_GROUP_ID_SEQ" RESTART WITH 1',
+            'ALTER SEQUENCE "AUTH_USER_ID_SEQ" RESTART WITH 1',
+            'ALTER SEQUENCE "TEST_DHP_SIMPLEMODEL_ID_SEQ" RESTART WITH 1',
+        ]
+        connection.dirty_tables.reset()
+        with connection.cursor() as cursor:
+            cursor.execute('INSERT INTO "AUTH_USER" ("USERNAME") VALUES (%s)', ['foobar'])
+            cursor.execute('UPDATE "TEST_DHP_SIMPLEMODEL" SET "CHAR_FIELD" = %s', ['foobar'])
+            # deleting the rows doesn't restart the sequence
+            cursor.execute('INSERT INTO "AUTH_GROUP" ("NAME") VALUES (%s)', ['foobar'])
+            cursor.execute('DELETE FROM "AUTH_GROUP"')
+
+        # only generated (sqlflush)
+        statements = connection.ops.sql_flush(no_style(), self.tables, self.sequences)
+        self.assertSequenceEqual(statements, expected_statements)
+
+        for rollback in (True, False):
+            statements = connection.ops.sql_flush(no_style(), self.tables, self.sequences)
+            self.assertSequenceEqual(statements, expected_statements)
+            with transaction.atomic():
+                with connection.cursor() as cursor:
+                    for statement in statements:
+                        cursor.execute(statement)
+                transaction.set_rollback(rollback)
+        self.assertSequenceEqual(connection.ops.sql_flush(no_style(), self.tables, self.sequences), [])
+
+    @mock_hana
+    @patch_db_execute
+    def test_flush_unknown_writes(self, mock_execute):
+        connection.dirty_tables.reset()
+        with connection.cursor() as cursor:
+            cursor.execute('CALL "SOME_PROCEDURE"()')
+
+        statements = connection.ops.sql_flush(no_style(), self.tables, self.sequences)
+        self.assertEqual(len(statements), 6)
+
+
+class TestWorkloadStats(unittest.TestCase):
+    def test_report(self):
+        stats = WorkloadStats()
+        stats.min_statements = 10
+        for i in range(8):
+            stats.record('INSERT INTO "AUTH_USER" ("USERNAME") VALUES (%s)')
+            stats.record('SELECT "AUTH_USER"."ID" FROM "AUTH_USER" WHERE "AUTH_USER"."ID" = %s')
+        stats.record('UPDATE "AUTH_GROUP" SET "NAME" = %s WHERE "AUTH_GROUP"."ID" = %s', count=10)
+        stats.record('SELECT COUNT(*) FROM "AUTH_GROUP" WHERE "AUTH_GROUP"."NAME" = %s')
+        stats.record('SELECT "AUTH_GROUP"."ID" FROM "AUTH_GROUP" WHERE "AUTH_GROUP"."NAME" LIKE %s')
+        stats.record('SELECT "X" FROM "UNKNOWN_TABLE"')
+
+        self.assertSequenceEqual(stats.report(connection), [
+            {
+                'table': 'AUTH_GROUP', 'model': 'auth.Group', 'store': 'COLUMN', 'reads': 2, 'writes': 10,
+                'point_lookups': 0, 'scans': 2, 'recommendation': 'COLUMN',
+            },
+            {
+                'table': 'AUTH_USER', 'model': 'auth.User', 'store': 'COLUMN', 'reads': 8, 'writes': 8,
+                'point_lookups': 8, 'scans': 0, 'recommendation': 'ROW',
+            },
+            {
+                'table': 'UNKNOWN_TABLE', 'model': None, 'store': None, 'reads': 1, 'writes': 0,
+                'point_lookups': 0, 'scans': 1, 'recommendation': None,
+            },
+        ])
+
+
 class TestCreation(DatabaseConnectionMixin, unittest.TestCase):
     @mock_hana
     @patch_db_execute
@@ -343,6 +752,88 @@ class TestCreation(DatabaseConnectionMixin, unittest.TestCase):
 
         self.assertSequenceEqual(mock_execute.call_args_list, expected_statements)
 
+    @mock_hana
+    @patch_db_execute
+    @patch_db_executemany
+    def test_bulk_upsert(self, mock_executemany, mock_execute):
+        expected_many_statements = [
+            call(
+                'UPSERT "TEST_DHP_SIMPLEMODEL" ("ID", "CHAR_FIELD") VALUES (?, ?) WITH PRIMARY KEY',
+                ([1, 'foobar'], [2, 'barbaz'])
+            ),
+        ]
+        expected_statements = [
+            call(
+                'MERGE INTO "TEST_DHP_SIMPLEMODEL" '
+                'USING (SELECT CAST(? AS NVARCHAR(100)) AS "CHAR_FIELD" FROM DUMMY) source '
+                'ON ("TEST_DHP_SIMPLEMODEL"."CHAR_FIELD" = source."CHAR_FIELD") '
+                'WHEN NOT MATCHED THEN INSERT (id, "CHAR_FIELD") '
+                'VALUES (test_dhp_simplemodel_id_seq.nextval, source."CHAR_FIELD")',
+                ['foobar']
+            ),
+        ]
+
+        objects = BulkQuerySet(SimpleModel)
+        objects.bulk_upsert([SimpleModel(id=1, char_field='foobar'), SimpleModel(id=2, char_field='barbaz')])
+        objects.bulk_upsert([SimpleModel(char_field='foobar')], keys=['char_field'])
+
+        self.assertSequenceEqual(mock_executemany.call_args_list, expected_many_statements)
+        self.assertSequenceEqual(mock_execute.call_args_list, expected_statements)
+
+        with self.assertRaises(ValueError):
+            objects.bulk_upsert([SimpleModel(char_field='foobar')])
+
+    @mock_hana
+    @patch_db_execute
+    @patch_db_executemany
+    def test_bulk_update(self, mock_executemany, mock_execute):
+        staging = '"#TEST_DHP_SIMPLEMODEL_UPDATE_1"'
+        merge = call(
+            'MERGE INTO "TEST_DHP_SIMPLEMODEL" USING %(staging)s '
+            'ON ("TEST_DHP_SIMPLEMODEL"."ID" = %(staging)s."ID") '
+            'WHEN MATCHED THEN UPDATE SET '
+            '"TEST_DHP_SIMPLEMODEL"."CHAR_FIELD" = %(staging)s."CHAR_FIELD"' % {'staging': staging},
+            ()
+        )
+        expected_statements = [
+            call('CREATE LOCAL TEMPORARY COLUMN TABLE %s ("ID" INTEGER, "CHAR_FIELD" NVARCHAR(100))' % staging, ()),
+            merge,
+            call('DELETE FROM %s' % staging, ()),
+            # the staging table is reused in a transaction
+            merge,
+            call('DELETE FROM %s' % staging, ()),
+        ]
+        expected_many_statements = [
+            call('INSERT INTO %s VALUES (?, ?)' % staging, [[1, 'foo'], [2, 'bar']]),
+            call('INSERT INTO %s VALUES (?, ?)' % staging, [[3, 'baz']]),
+            call('INSERT INTO %s VALUES (?, ?)' % staging, [[1, 'foo']]),
+            # creating it in a transaction would commit the transaction
+            call('UPDATE "TEST_DHP_SIMPLEMODEL" SET "CHAR_FIELD" = ? WHERE "ID" = ?', [['foo', 1], ['bar', 2]]),
+        ]
+        objs = [
+            SimpleModel(id=1, char_field='foo'),
+            SimpleModel(id=2, char_field='bar'),
+            SimpleModel(id=3, char_field='baz'),
+        ]
+        cache = connections['default'].result_cache
+        cache.clear()
+        cache.set(('SELECT * FROM "TEST_DHP_CACHEDMODEL"', ()), [(1, 'foo')], {'TEST_DHP_CACHEDMODEL'})
+        connection.staging_tables.reset()
+
+        BulkQuerySet(SimpleModel).bulk_update(objs, ['char_field'], batch_size=2)
+        with transaction.atomic():
+            BulkQuerySet(SimpleModel).bulk_update(objs[:1], ['char_field'])
+        connection.staging_tables.reset()
+        with transaction.atomic():
+            BulkQuerySet(SimpleModel).bulk_update(objs[:2], ['char_field'])
+        connection.staging_tables.reset()
+
+        self.assertSequenceEqual(mock_execute.call_args_list, expected_statements)
+        self.assertSequenceEqual(mock_executemany.call_args_list, expected_many_statements)
+        # the temporary table doesn't invalidate cached results
+        self.assertEqual(cache.stats()['entries'], 1)
+        cache.clear()
+
 
 class TestSelection(DatabaseConnectionMixin, unittest.TestCase):
     valid_db_values = [
@@ -446,6 +937,79 @@ class TestSelection(DatabaseConnectionMixin, unittest.TestCase):
         self.assertSequenceEqual(mock_execute.call_args_list, expected_statements)
 
 
+class TestSearch(DatabaseConnectionMixin, unittest.TestCase):
+    @mock_hana
+    @patch_db_execute
+    @patch_db_fetchmany
+    def test_search(self, mock_fetchmany, mock_execute):
+        expected_statements = [
+            call(
+                'SELECT "TEST_DHP_FULLTEXTMODEL"."ID", "TEST_DHP_FULLTEXTMODEL"."TEXT_FIELD", SCORE() AS "SCORE" '
+                'FROM "TEST_DHP_FULLTEXTMODEL" '
+                'WHERE CONTAINS("TEST_DHP_FULLTEXTMODEL"."TEXT_FIELD", ?) '
+                'ORDER BY "SCORE" DESC',
+                ('red shoes',)
+            ),
+            call(
+                'SELECT "TEST_DHP_FULLTEXTMODEL"."ID", "TEST_DHP_FULLTEXTMODEL"."TEXT_FIELD" '
+                'FROM "TEST_DHP_FULLTEXTMODEL" '
+                'WHERE CONTAINS("TEST_DHP_FULLTEXTMODEL"."TEXT_FIELD", ?, FUZZY(0.8))',
+                ('red shoes',)
+            ),
+            call(
+                'SELECT "TEST_DHP_FULLTEXTMODEL"."ID", "TEST_DHP_FULLTEXTMODEL"."TEXT_FIELD" '
+                'FROM "TEST_DHP_FULLTEXTMODEL" '
+                'WHERE CONTAINS("TEST_DHP_FULLTEXTMODEL"."TEXT_FIELD", ?, FUZZY(0.7))',
+                ('red shoes',)
+            ),
+        ]
+        mock_fetchmany.side_effect = [[], [], []]
+
+        qs = FulltextModel.objects.filter(text_field__search='red shoes')
+        list(qs.annotate(score=SearchScore()).order_by('-score'))
+        list(FulltextModel.objects.filter(text_field__fuzzy_search='red shoes'))
+        list(FulltextModel.objects.filter(text_field__fuzzy_search=('red shoes', 0.7)))
+        self.assertSequenceEqual(mock_execute.call_args_list, expected_statements)
+
+        # only supported by SAP HANA
+        lookup = qs.query.where.children[0]
+        with self.assertRaises(NotImplementedError):
+            lookup.as_sql(qs.query.get_compiler(connection=connection), connection)
+
+
+class TestCaseInsensitiveLookups(DatabaseConnectionMixin, unittest.TestCase):
+    @mock_hana
+    @patch_db_execute
+    @patch_db_fetchmany
+    def test_case_insensitive_lookups(self, mock_fetchmany, mock_execute):
+        expected_statements = [
+            call(
+                'SELECT "TEST_DHP_CASEINSENSITIVEMODEL"."ID", "TEST_DHP_CASEINSENSITIVEMODEL"."EMAIL_FIELD" '
+                'FROM "TEST_DHP_CASEINSENSITIVEMODEL" '
+                'WHERE "TEST_DHP_CASEINSENSITIVEMODEL"."EMAIL_FIELD_UPPER" = UPPER(?)',
+                ('foo@foobar.com',)
+            ),
+            call(
+                'SELECT "TEST_DHP_CASEINSENSITIVEMODEL"."ID", "TEST_DHP_CASEINSENSITIVEMODEL"."EMAIL_FIELD" '
+                'FROM "TEST_DHP_CASEINSENSITIVEMODEL" '
+                'WHERE "TEST_DHP_CASEINSENSITIVEMODEL"."EMAIL_FIELD_UPPER" LIKE UPPER(?)',
+                ('foo%',)
+            ),
+            call(
+                'SELECT "TEST_DHP_SIMPLEMODEL"."ID", "TEST_DHP_SIMPLEMODEL"."CHAR_FIELD" '
+                'FROM "TEST_DHP_SIMPLEMODEL" '
+                'WHERE UPPER("TEST_DHP_SIMPLEMODEL"."CHAR_FIELD") = UPPER(?)',
+                ('foobar',)
+            ),
+        ]
+        mock_fetchmany.side_effect = [[], [], []]
+
+        list(CaseInsensitiveModel.objects.filter(email_field__iexact='foo@foobar.com'))
+        list(CaseInsensitiveModel.objects.filter(email_field__istartswith='foo'))
+        list(SimpleModel.objects.filter(char_field__iexact='foobar'))
+        self.assertSequenceEqual(mock_execute.call_args_list, expected_statements)
+
+
 class TestAggregation(DatabaseConnectionMixin, unittest.TestCase):
     @mock_hana
     @patch_db_execute
@@ -508,3 +1072,782 @@ class TestAggregation(DatabaseConnectionMixin, unittest.TestCase):
         self.assertIn('num_fields__sum', data)
         self.assertEqual(data['num_fields__sum'], num_fields)
         self.assertSequenceEqual(mock_execute.call_args_list, expected_statements)
+
+    @mock_hana
+    @patch_db_execute
+    @patch_db_fetchone
+    def test_statistical_aggregates(self, mock_fetchone, mock_execute):
+        expected_statements = [
+            call(
+                'SELECT STDDEV_POP("TEST_DHP_COMPLEXMODEL"."FLOAT_FIELD") AS "STDDEV", '
+                'VAR_SAMP("TEST_DHP_COMPLEXMODEL"."FLOAT_FIELD") AS "VARIANCE", '
+                'MEDIAN("TEST_DHP_COMPLEXMODEL"."FLOAT_FIELD") AS "MEDIAN", '
+                'PERCENTILE_CONT(0.9) WITHIN GROUP (ORDER BY "TEST_DHP_COMPLEXMODEL"."FLOAT_FIELD") AS "P90", '
+                'PERCENTILE_DISC(0.5) WITHIN GROUP (ORDER BY "TEST_DHP_COMPLEXMODEL"."INTEGER_FIELD") AS "P50" '
+                'FROM "TEST_DHP_COMPLEXMODEL"',
+                ()
+            ),
+        ]
+        mock_fetchone.side_effect = [[1.5, 2.25, 3, 4.5, 5]]
+
+        data = ComplexModel.objects.aggregate(
+            stddev=models.StdDev('float_field'),
+            variance=models.Variance('float_field', sample=True),
+            median=Median('float_field'),
+            p90=PercentileCont('float_field', 0.9),
+            p50=PercentileDisc('integer_field', 0.5),
+        )
+
+        self.assertEqual(data, {'stddev': 1.5, 'variance': 2.25, 'median': 3.0, 'p90': 4.5, 'p50': 5})
+        self.assertSequenceEqual(mock_execute.call_args_list, expected_statements)
+
+
+class TestTimeSeries(DatabaseConnectionMixin, unittest.TestCase):
+    @mock_hana
+    @patch_db_execute
+    @patch_db_fetchmany
+    def test_date_lookups(self, mock_fetchmany, mock_execute):
+        expected_statements = [
+            call(
+                'SELECT "TEST_DHP_COMPLEXMODEL"."ID" FROM "TEST_DHP_COMPLEXMODEL" '
+                'WHERE MOD(WEEKDAY("TEST_DHP_COMPLEXMODEL"."DATE_FIELD") + 1, 7) + 1 = ?',
+                (7,)
+            ),
+            call(
+                'SELECT "TEST_DHP_COMPLEXMODEL"."ID" FROM "TEST_DHP_COMPLEXMODEL" '
+                'WHERE EXTRACT(HOUR FROM "TEST_DHP_COMPLEXMODEL"."DATE_TIME_FIELD") = ?',
+                (13,)
+            ),
+            call(
+                'SELECT DISTINCT SERIES_ROUND("TEST_DHP_COMPLEXMODEL"."DATE_FIELD", \'INTERVAL 1 MONTH\', ROUND_DOWN) '
+                'AS "DATEFIELD" FROM "TEST_DHP_COMPLEXMODEL" '
+                'WHERE "TEST_DHP_COMPLEXMODEL"."DATE_FIELD" IS NOT NULL ORDER BY "DATEFIELD" ASC',
+                ()
+            ),
+        ]
+        mock_fetchmany.side_effect = [[], [], []]
+
+        list(ComplexModel.objects.filter(date_field__week_day=7).values_list('id', flat=True))
+        list(ComplexModel.objects.filter(date_time_field__hour=13).values_list('id', flat=True))
+        list(ComplexModel.objects.dates('date_field', 'month'))
+        self.assertSequenceEqual(mock_execute.call_args_list, expected_statements)
+
+    @mock_hana
+    @patch_db_execute
+    @patch_db_fetchall
+    def test_gap_filled(self, mock_fetchall, mock_execute):
+        start = datetime.datetime(2017, 1, 1)
+        end = datetime.datetime(2017, 1, 1, 3)
+        expected_statements = [
+            call(
+                'SELECT series.GENERATED_PERIOD_START, COALESCE(data."TOTAL", ?) '
+                "FROM SERIES_GENERATE_TIMESTAMP('INTERVAL 1 HOUR', "
+                "SERIES_ROUND(?, 'INTERVAL 1 HOUR', ROUND_DOWN), ?) series "
+                'LEFT OUTER JOIN (SELECT SERIES_ROUND("TEST_DHP_COMPLEXMODEL"."DATE_TIME_FIELD", '
+                '\'INTERVAL 1 HOUR\', ROUND_DOWN) AS "HANA_BUCKET", '
+                'SUM("TEST_DHP_COMPLEXMODEL"."INTEGER_FIELD") AS "TOTAL" '
+                'FROM "TEST_DHP_COMPLEXMODEL" WHERE "TEST_DHP_COMPLEXMODEL"."BOOLEAN_FIELD" = ? '
+                'GROUP BY SERIES_ROUND("TEST_DHP_COMPLEXMODEL"."DATE_TIME_FIELD", \'INTERVAL 1 HOUR\', ROUND_DOWN)) '
+                'data ON data."HANA_BUCKET" = series.GENERATED_PERIOD_START '
+                'ORDER BY series.GENERATED_PERIOD_START',
+                (0, start, end, True)
+            ),
+        ]
+        mock_fetchall.return_value = [
+            (datetime.datetime(2017, 1, 1, 0), 3),
+            (datetime.datetime(2017, 1, 1, 1), 0),
+            (datetime.datetime(2017, 1, 1, 2), 5),
+        ]
+
+        rows = gap_filled(
+            ComplexModel.objects.filter(boolean_field=True), 'date_time_field', 'hour', start, end, default=0,
+            total=models.Sum('integer_field'),
+        )
+
+        self.assertEqual(rows[1], {'period': datetime.datetime(2017, 1, 1, 1), 'total': 0})
+        self.assertEqual(len(rows), 3)
+        self.assertSequenceEqual(mock_execute.call_args_list, expected_statements)
+
+        # the data is compiled for the database of the queryset
+        with mock.patch.object(connection.ops, 'series_round_sql', side_effect=AssertionError):
+            sql, params = gap_filled_sql(
+                ComplexModel.objects.using('gis').filter(boolean_field=True), 'date_time_field', 'hour', start, end,
+                default=0, total=models.Sum('integer_field'),
+            )
+        self.assertEqual(sql.replace('%s', '?'), expected_statements[0][1][0])
+        self.assertEqual(params, (0, start, end, True))
+
+
+class TestRegexLookups(DatabaseConnectionMixin, unittest.TestCase):
+    @mock_hana
+    @patch_db_execute
+    @patch_db_fetchmany
+    def test_regex_lookups(self, mock_fetchmany, mock_execute):
+        expected_statements = [
+            call(
+                'SELECT "TEST_DHP_SIMPLEMODEL"."ID", "TEST_DHP_SIMPLEMODEL"."CHAR_FIELD" '
+                'FROM "TEST_DHP_SIMPLEMODEL" '
+                'WHERE "TEST_DHP_SIMPLEMODEL"."CHAR_FIELD" LIKE_REGEXPR ?',
+                ('^foo[0-9]+\\z',)
+            ),
+            call(
+                'SELECT "TEST_DHP_SIMPLEMODEL"."ID", "TEST_DHP_SIMPLEMODEL"."CHAR_FIELD" '
+                'FROM "TEST_DHP_SIMPLEMODEL" '
+                "WHERE \"TEST_DHP_SIMPLEMODEL\".\"CHAR_FIELD\" LIKE_REGEXPR ? FLAG 'i'",
+                ('(?s)^bar',)
+            ),
+        ]
+        mock_fetchmany.side_effect = [[], []]
+
+        list(SimpleModel.objects.filter(char_field__regex=r'^foo[0-9]+\Z'))
+        list(SimpleModel.objects.filter(char_field__iregex=r'(?su)^bar'))
+        self.assertSequenceEqual(mock_execute.call_args_list, expected_statements)
+
+
+class TestGrouping(DatabaseConnectionMixin, unittest.TestCase):
+    @mock_hana
+    @patch_db_execute
+    @patch_db_fetchmany
+    def test_rollup(self, mock_fetchmany, mock_execute):
+        expected_statements = [
+            call(
+                'SELECT "TEST_DHP_COMPLEXMODEL"."CHAR_FIELD", "TEST_DHP_COMPLEXMODEL"."DATE_FIELD", '
+                'SUM("TEST_DHP_COMPLEXMODEL"."INTEGER_FIELD") AS "TOTAL", '
+                'GROUPING_ID("TEST_DHP_COMPLEXMODEL"."CHAR_FIELD", "TEST_DHP_COMPLEXMODEL"."DATE_FIELD") '
+                'AS "GROUPING" '
+                'FROM "TEST_DHP_COMPLEXMODEL" '
+                'GROUP BY ROLLUP ("TEST_DHP_COMPLEXMODEL"."CHAR_FIELD", "TEST_DHP_COMPLEXMODEL"."DATE_FIELD")',
+                ()
+            ),
+            call(
+                'SELECT "TEST_DHP_COMPLEXMODEL"."CHAR_FIELD", "TEST_DHP_COMPLEXMODEL"."DATE_FIELD", '
+                'SUM("TEST_DHP_COMPLEXMODEL"."INTEGER_FIELD") AS "TOTAL" '
+                'FROM "TEST_DHP_COMPLEXMODEL" '
+                'GROUP BY GROUPING SETS (("TEST_DHP_COMPLEXMODEL"."CHAR_FIELD"), '
+                '("TEST_DHP_COMPLEXMODEL"."DATE_FIELD"), ())',
+                ()
+            ),
+        ]
+        mock_fetchmany.side_effect = [
+            [['foo', datetime.date(2017, 1, 1), 3, 0], ['foo', None, 3, 1], [None, None, 3, 3]],
+            [],
+        ]
+
+        queryset = GroupingQuerySet(ComplexModel).values('char_field', 'date_field').annotate(
+            total=models.Sum('integer_field'),
+        )
+        rows = list(queryset.rollup('char_field', 'date_field').filter())
+        list(queryset.grouping_sets(('char_field',), ('date_field',), (), indicator=None))
+
+        self.assertEqual(rows[2], {'char_field': None, 'date_field': None, 'total': 3, 'grouping': 3})
+        self.assertSequenceEqual(mock_execute.call_args_list, expected_statements)
+
+
+class TestKeysetPagination(DatabaseConnectionMixin, unittest.TestCase):
+    @mock_hana
+    @patch_db_execute
+    @patch_db_fetchmany
+    def test_keyset_pagination(self, mock_fetchmany, mock_execute):
+        expected_statements = [
+            call(
+                'SELECT "TEST_DHP_SIMPLEMODEL"."ID", "TEST_DHP_SIMPLEMODEL"."CHAR_FIELD" '
+                'FROM "TEST_DHP_SIMPLEMODEL" '
+                'ORDER BY "TEST_DHP_SIMPLEMODEL"."CHAR_FIELD" DESC, "TEST_DHP_SIMPLEMODEL"."ID" ASC LIMIT 3',
+                ()
+            ),
+            call(
+                'SELECT "TEST_DHP_SIMPLEMODEL"."ID", "TEST_DHP_SIMPLEMODEL"."CHAR_FIELD" '
+                'FROM "TEST_DHP_SIMPLEMODEL" '
+                'WHERE ("TEST_DHP_SIMPLEMODEL"."CHAR_FIELD" < ? OR "TEST_DHP_SIMPLEMODEL"."CHAR_FIELD" IS NULL '
+                'OR ("TEST_DHP_SIMPLEMODEL"."CHAR_FIELD" = ? AND "TEST_DHP_SIMPLEMODEL"."ID" > ?)) '
+                'ORDER BY "TEST_DHP_SIMPLEMODEL"."CHAR_FIELD" DESC, "TEST_DHP_SIMPLEMODEL"."ID" ASC LIMIT 3',
+                ('b', 'b', 2)
+            ),
+        ]
+        mock_fetchmany.side_effect = [
+            [[1, 'c'], [2, 'b'], [3, 'b']],
+            [],
+            [[3, 'b']],
+            [],
+        ]
+
+        paginator = KeysetPaginator(SimpleModel.objects.all(), 2, ordering=('-char_field',))
+        page = paginator.page()
+        self.assertEqual([obj.pk for obj in page], [1, 2])
+        self.assertTrue(page.has_next())
+
+        page = paginator.page(page.next_cursor)
+        self.assertEqual([obj.pk for obj in page], [3])
+        self.assertFalse(page.has_next())
+        self.assertSequenceEqual(mock_execute.call_args_list, expected_statements)
+
+        with self.assertRaises(InvalidPage):
+            paginator.page('foobar')
+
+    @mock_hana
+    @patch_db_execute
+    def test_keyset_cursor(self, mock_execute):
+        value = datetime.datetime(2017, 1, 1, 12, 0, 0, 123456)
+        paginator = KeysetPaginator(ComplexModel.objects.all(), 2, ordering=('-date_time_field',))
+        cursor = paginator.encode_cursor(ComplexModel(pk=1, date_time_field=value))
+        self.assertEqual(paginator.decode_cursor(cursor), [value, 1])
+
+        # nothing comes after NULL of a unique field in descending order
+        with mock.patch.object(SimpleModel._meta.get_field('char_field'), '_unique', True):
+            paginator = KeysetPaginator(SimpleModel.objects.all(), 2, ordering=('-char_field',))
+            page = paginator.page(paginator.encode_cursor(SimpleModel(pk=1, char_field=None)))
+        self.assertEqual(list(page), [])
+        self.assertFalse(page.has_next())
+        mock_execute.assert_not_called()
+
+
+class TestLocking(DatabaseConnectionMixin, unittest.TestCase):
+    @mock_hana
+    @patch_db_execute
+    @patch_db_fetchmany
+    def test_select_for_update(self, mock_fetchmany, mock_execute):
+        expected_statements = [
+            call(
+                'SELECT "TEST_DHP_SIMPLEMODEL"."ID", "TEST_DHP_SIMPLEMODEL"."CHAR_FIELD" '
+                'FROM "TEST_DHP_SIMPLEMODEL" LIMIT 10 FOR UPDATE IGNORE LOCKED',
+                ()
+            ),
+            call(
+                'SELECT "TEST_DHP_SIMPLEMODEL"."ID", "TEST_DHP_SIMPLEMODEL"."CHAR_FIELD" '
+                'FROM "TEST_DHP_SIMPLEMODEL" WHERE "TEST_DHP_SIMPLEMODEL"."ID" = ? FOR UPDATE WAIT 5',
+                (1,)
+            ),
+            call(
+                'SELECT "TEST_DHP_SIMPLEMODEL"."ID", "TEST_DHP_SIMPLEMODEL"."CHAR_FIELD" '
+                'FROM "TEST_DHP_SIMPLEMODEL" FOR UPDATE NOWAIT',
+                ()
+            ),
+        ]
+        mock_fetchmany.side_effect = [[], [], []]
+
+        with transaction.atomic():
+            list(LockingQuerySet(SimpleModel).select_for_update(skip_locked=True)[:10])
+            list(LockingQuerySet(SimpleModel).select_for_update(wait=5).filter(pk=1))
+            list(LockingQuerySet(SimpleModel).select_for_update(nowait=True))
+        self.assertSequenceEqual(mock_execute.call_args_list, expected_statements)
+
+        with self.assertRaises(ValueError):
+            LockingQuerySet(SimpleModel).select_for_update(nowait=True, wait=5)
+
+
+class TestInValueTables(DatabaseConnectionMixin, unittest.TestCase):
+    @mock_hana
+    @patch_db_execute
+    @patch_db_executemany
+    @patch_db_fetchmany
+    def test_large_in_lookup(self, mock_fetchmany, mock_executemany, mock_execute):
+        expected_statements = [
+            call('CREATE LOCAL TEMPORARY COLUMN TABLE "#DJANGO_HANA_IN_1" ("SET_ID" INTEGER, "VALUE" INTEGER)'),
+            call(
+                'SELECT "TEST_DHP_SIMPLEMODEL"."ID", "TEST_DHP_SIMPLEMODEL"."CHAR_FIELD" '
+                'FROM "TEST_DHP_SIMPLEMODEL" '
+                'WHERE "TEST_DHP_SIMPLEMODEL"."ID" IN (SELECT "VALUE" FROM "#DJANGO_HANA_IN_1" WHERE "SET_ID" = ?)',
+                (1,)
+            ),
+            call('DELETE FROM "#DJANGO_HANA_IN_1"'),
+            call(
+                'SELECT "TEST_DHP_SIMPLEMODEL"."ID", "TEST_DHP_SIMPLEMODEL"."CHAR_FIELD" '
+                'FROM "TEST_DHP_SIMPLEMODEL" '
+                'WHERE "TEST_DHP_SIMPLEMODEL"."ID" IN (SELECT "VALUE" FROM "#DJANGO_HANA_IN_1" WHERE "SET_ID" = ?)',
+                (1,)
+            ),
+            call(
+                'SELECT "TEST_DHP_SIMPLEMODEL"."ID", "TEST_DHP_SIMPLEMODEL"."CHAR_FIELD" '
+                'FROM "TEST_DHP_SIMPLEMODEL" WHERE "TEST_DHP_SIMPLEMODEL"."ID" IN (?, ?)',
+                (1, 2)
+            ),
+        ]
+        expected_many_statements = [
+            call('INSERT INTO "#DJANGO_HANA_IN_1" VALUES (?, ?)', [[1, 1], [1, 2], [1, 3]]),
+            call('INSERT INTO "#DJANGO_HANA_IN_1" VALUES (?, ?)', [[1, 4], [1, 5], [1, 6]]),
+        ]
+        mock_fetchmany.side_effect = [[], [], []]
+
+        with mock.patch.dict(connection.settings_dict, {'IN_TABLE_THRESHOLD': 2}):
+            # compiling doesn't load any values
+            str(SimpleModel.objects.filter(pk__in=[7, 8, 9]).query)
+            list(SimpleModel.objects.filter(pk__in=[1, 2, 3]))
+            list(SimpleModel.objects.filter(pk__in=[4, 5, 6]))
+            list(SimpleModel.objects.filter(pk__in=[1, 2]))
+
+        self.assertSequenceEqual(mock_execute.call_args_list, expected_statements)
+        self.assertSequenceEqual(mock_executemany.call_args_list, expected_many_statements)
+
+    @mock_hana
+    @patch_db_execute
+    @patch_db_executemany
+    @patch_db_fetchmany
+    def test_large_in_lookup_in_transaction(self, mock_fetchmany, mock_executemany, mock_execute):
+        select = (
+            'SELECT "TEST_DHP_SIMPLEMODEL"."ID", "TEST_DHP_SIMPLEMODEL"."CHAR_FIELD" FROM "TEST_DHP_SIMPLEMODEL" '
+            'WHERE "TEST_DHP_SIMPLEMODEL"."ID" IN %s'
+        )
+        expected_statements = [
+            # creating the table would commit the transaction
+            call(select % '(?, ?, ?)', (1, 2, 3)),
+            call('CREATE LOCAL TEMPORARY COLUMN TABLE "#DJANGO_HANA_IN_1" ("SET_ID" INTEGER, "VALUE" INTEGER)'),
+            call(select % '(SELECT "VALUE" FROM "#DJANGO_HANA_IN_1" WHERE "SET_ID" = ?)', (1,)),
+            # the existing table is used
+            call('DELETE FROM "#DJANGO_HANA_IN_1"'),
+            call(select % '(SELECT "VALUE" FROM "#DJANGO_HANA_IN_1" WHERE "SET_ID" = ?)', (1,)),
+        ]
+        mock_fetchmany.side_effect = [[], [], []]
+        connection.in_value_tables.reset()
+
+        with mock.patch.dict(connection.settings_dict, {'IN_TABLE_THRESHOLD': 2}):
+            with transaction.atomic():
+                list(SimpleModel.objects.filter(pk__in=[1, 2, 3]))
+            list(SimpleModel.objects.filter(pk__in=[1, 2, 3]))
+            with transaction.atomic():
+                list(SimpleModel.objects.filter(pk__in=[1, 2, 3]))
+        connection.in_value_tables.reset()
+
+        self.assertSequenceEqual(mock_execute.call_args_list, expected_statements)
+        self.assertEqual(mock_executemany.call_count, 2)
+
+
+class TestResultCache(DatabaseConnectionMixin, unittest.TestCase):
+    @mock_hana
+    @patch_db_execute
+    @patch_db_fetchall
+    @patch_db_fetchmany
+    def test_result_cache(self, mock_fetchmany, mock_fetchall, mock_execute):
+        select = (
+            'SELECT "TEST_DHP_CACHEDMODEL"."ID", "TEST_DHP_CACHEDMODEL"."CHAR_FIELD" '
+            'FROM "TEST_DHP_CACHEDMODEL" WHERE "TEST_DHP_CACHEDMODEL"."CHAR_FIELD" = ?'
+        )
+        expected_statements = [
+            call(select, ('foo',)),
+            call('UPDATE "TEST_DHP_CACHEDMODEL" SET "CHAR_FIELD" = ? WHERE "ID" = ?', ['bar', 1]),
+            call(select, ('foo',)),
+            call(
+                'SELECT "TEST_DHP_SIMPLEMODEL"."ID", "TEST_DHP_SIMPLEMODEL"."CHAR_FIELD" FROM "TEST_DHP_SIMPLEMODEL"',
+                ()
+            ),
+        ]
+        # LOBs can only be read once
+        mock_fetchall.side_effect = [[[1, Database.NClob('foo')]], []]
+        mock_fetchmany.side_effect = [[]]
+        connection.result_cache.clear()
+
+        self.assertEqual([obj.char_field for obj in CachedModel.objects.filter(char_field='foo')], ['foo'])
+        self.assertEqual([obj.char_field for obj in CachedModel.objects.filter(char_field='foo')], ['foo'])
+        with connection.cursor() as cursor:
+            cursor.execute('UPDATE "TEST_DHP_CACHEDMODEL" SET "CHAR_FIELD" = %s WHERE "ID" = %s', ['bar', 1])
+        self.assertEqual(list(CachedModel.objects.filter(char_field='foo')), [])
+        list(SimpleModel.objects.all())
+
+        self.assertSequenceEqual(mock_execute.call_args_list, expected_statements)
+        stats = connection.result_cache.stats()
+        self.assertEqual(stats['models']['test_dhp.CachedModel'], {'hits': 1, 'misses': 2, 'hit_ratio': 1.0 / 3})
+        self.assertEqual(stats['entries'], 1)
+
+    @mock_hana
+    @patch_db_execute
+    def test_invalidate_on_commit(self, mock_execute):
+        cache = connection.result_cache
+        cache.clear()
+        key = ('SELECT * FROM "TEST_DHP_CACHEDMODEL"', ())
+
+        for exit_atomic in (lambda: None, lambda: transaction.set_rollback(True)):
+            with transaction.atomic():
+                with connection.cursor() as cursor:
+                    cursor.execute('UPDATE "TEST_DHP_CACHEDMODEL" SET "CHAR_FIELD" = %s', ['bar'])
+                # cached by another thread before the transaction ends
+                cache.set(key, [(1, 'foo')], {'TEST_DHP_CACHEDMODEL'})
+                self.assertEqual(cache.get(key, 'test'), [(1, 'foo')])
+                exit_atomic()
+            self.assertIsNone(cache.get(key, 'test'))
+
+    @mock_hana
+    @patch_db_execute
+    @patch_db_fetchall
+    @patch_db_fetchmany
+    def test_stale_results(self, mock_fetchmany, mock_fetchall, mock_execute):
+        cache = connection.result_cache
+        cache.clear()
+        queryset = CachedModel.objects.filter(char_field='foo')
+
+        # another thread writes while the rows are read, they aren't cached
+        def fetchall():
+            cache.invalidate('TEST_DHP_CACHEDMODEL')
+            return [[1, 'foo']]
+        mock_fetchall.side_effect = fetchall
+        self.assertEqual(len(list(queryset)), 1)
+        self.assertEqual(cache.stats()['entries'], 0)
+
+        # uncommitted rows aren't cached
+        mock_fetchmany.side_effect = [[[1, 'foo']], []]
+        connection.set_autocommit(False)
+        try:
+            self.assertEqual(len(list(queryset)), 1)
+        finally:
+            connection.set_autocommit(True)
+        self.assertEqual(cache.stats()['entries'], 0)
+        self.assertEqual(mock_fetchall.call_count, 1)
+
+
+class TestTransactions(DatabaseConnectionMixin, unittest.TestCase):
+    @mock_hana
+    @patch_db_execute
+    def test_savepoints(self, mock_execute):
+        setautocommit = connection.connection.setautocommit
+        with mock.patch.object(connection.connection, 'setautocommit', wraps=setautocommit) as mock_setautocommit:
+            with transaction.atomic():
+                with transaction.atomic():
+                    pass
+                try:
+                    with transaction.atomic():
+                        raise ValueError
+                except ValueError:
+                    pass
+            transaction.set_autocommit(True)
+
+        statements = [statement for (statement, params), kwargs in mock_execute.call_args_list]
+        self.assertEqual(len(statements), 5)
+        self.assertRegexpMatches(statements[0], r'^SAVEPOINT "S\w+_X1"$')
+        self.assertEqual(statements[1], statements[0].replace('SAVEPOINT', 'RELEASE SAVEPOINT'))
+        self.assertRegexpMatches(statements[2], r'^SAVEPOINT "S\w+_X2"$')
+        self.assertEqual(statements[3], statements[2].replace('SAVEPOINT', 'ROLLBACK TO SAVEPOINT'))
+        self.assertEqual(statements[4], statements[2].replace('SAVEPOINT', 'RELEASE SAVEPOINT'))
+        # autocommit is only switched off and on again once
+        self.assertSequenceEqual(mock_setautocommit.call_args_list, [call(False), call(True)])
+
+
+class TestReadReplica(DatabaseConnectionMixin, unittest.TestCase):
+    @mock_hana
+    @patch_db_execute
+    @patch_db_fetchmany
+    def test_read_routing(self, mock_fetchmany, mock_execute):
+        select = 'SELECT "TEST_DHP_SIMPLEMODEL"."ID", "TEST_DHP_SIMPLEMODEL"."CHAR_FIELD" FROM "TEST_DHP_SIMPLEMODEL"'
+        update = 'UPDATE "TEST_DHP_SIMPLEMODEL" SET "CHAR_FIELD" = ?'
+        replica = MockConnection()
+        replica_cursor = mock.Mock(**{'fetchmany.return_value': []})
+        replica.cursor = mock.Mock(return_value=replica_cursor)
+        mock_fetchmany.return_value = []
+        settings = {'READ_REPLICA': {'HOST': 'secondary', 'PORT': '30041'}, 'READ_REPLICA_STICKINESS': 5}
+        connection.last_write = None
+
+        with mock.patch.dict(connection.settings_dict, settings), \
+                mock.patch('pyhdb.connect', return_value=replica) as mock_connect:
+            list(SimpleModel.objects.all())
+            with transaction.atomic():
+                list(SimpleModel.objects.all())
+            with connection.cursor() as cursor:
+                cursor.execute('UPDATE "TEST_DHP_SIMPLEMODEL" SET "CHAR_FIELD" = %s', ['foo'])
+            # sticks to the primary after a write
+            list(SimpleModel.objects.all())
+            connection.last_write -= 5
+            list(SimpleModel.objects.all())
+        connection.replica_connection = None
+
+        mock_connect.assert_called_once_with(host='secondary', port=30041, user='foo', password='foo')
+        self.assertTrue(replica.autocommit)
+        self.assertSequenceEqual(replica_cursor.execute.call_args_list, [
+            call('set schema TESTING_DJANGO_HANA'),
+            call(select, ()),
+            call(select, ()),
+        ])
+        self.assertSequenceEqual(mock_execute.call_args_list, [
+            call(select, ()),
+            call(update, ['foo']),
+            call(select, ()),
+        ])
+
+    @mock_hana
+    @patch_db_execute
+    @patch_db_fetchmany
+    def test_unreachable_replica(self, mock_fetchmany, mock_execute):
+        select = 'SELECT "TEST_DHP_SIMPLEMODEL"."ID", "TEST_DHP_SIMPLEMODEL"."CHAR_FIELD" FROM "TEST_DHP_SIMPLEMODEL"'
+        mock_fetchmany.return_value = []
+        settings = {'READ_REPLICA': {'HOST': 'secondary', 'PORT': '30041'}, 'READ_REPLICA_RETRY': 30}
+        connection.last_write = None
+
+        # pyhdb raises socket errors (ConnectionRefusedError) if the host is down
+        with mock.patch.dict(connection.settings_dict, settings), \
+                mock.patch('pyhdb.connect', side_effect=socket.error(111, 'Connection refused')) as mock_connect:
+            list(SimpleModel.objects.all())
+            # not tried again for READ_REPLICA_RETRY seconds
+            list(SimpleModel.objects.all())
+            self.assertEqual(mock_connect.call_count, 1)
+            connection.replica_retry_at -= 30
+            list(SimpleModel.objects.all())
+            self.assertEqual(mock_connect.call_count, 2)
+        connection.replica_retry_at = None
+
+        self.assertSequenceEqual(mock_execute.call_args_list, [call(select, ())] * 3)
+
+
+class TestEndpoints(unittest.TestCase):
+    def test_parse(self):
+        self.assertSequenceEqual(parse_endpoints('hana1:30015, hana2', '30115'), [('hana1', 30015), ('hana2', 30115)])
+        self.assertSequenceEqual(parse_endpoints(['hana1', 'hana2:30215'], 30115), [('hana1', 30115), ('hana2', 30215)])
+        with self.assertRaises(ImproperlyConfigured):
+            parse_endpoints('hana1:30015, hana2', None)
+        with self.assertRaises(ImproperlyConfigured):
+            parse_endpoints('', 30015)
+
+    def test_selection(self):
+        pool = EndpointPool([('hana1', 30015), ('hana2', 30015), ('hana3', 30015)])
+        error = socket.error('unreachable')
+        connect = mock.Mock(side_effect=[error, 'hana2 connection'])
+
+        self.assertEqual(pool.connect(connect, socket.error), 'hana2 connection')
+        self.assertSequenceEqual(connect.call_args_list, [call('hana1', 30015), call('hana2', 30015)])
+        # the failed endpoint is quarantined, the measured one comes first
+        self.assertSequenceEqual(pool.candidates(), [('hana2', 30015), ('hana3', 30015), ('hana1', 30015)])
+        self.assertEqual(pool.states[('hana1', 30015)].failures, 1)
+
+        with mock.patch('socket.create_connection', side_effect=[mock.Mock(), error, mock.Mock()]):
+            pool.probe()
+        self.assertEqual(pool.states[('hana1', 30015)].failures, 0)
+        self.assertEqual(pool.states[('hana2', 30015)].failures, 1)
+        self.assertEqual(pool.candidates()[-1], ('hana2', 30015))
+
+        connect = mock.Mock(side_effect=error)
+        with self.assertRaises(socket.error):
+            pool.connect(connect, socket.error)
+        self.assertEqual(connect.call_count, 3)
+        self.assertEqual(pool.states[('hana2', 30015)].failures, 2)
+
+    def test_replaced_pool(self):
+        with mock.patch.object(EndpointPool, 'probe'):
+            pool = get_endpoint_pool('test', 'hana1, hana2', 30015, probe_interval=0.01)
+            pool.start_probing()
+            self.assertIs(get_endpoint_pool('test', 'hana1, hana2', 30015, probe_interval=0.01), pool)
+            # the prober of a pool replaced after a settings change stops
+            new_pool = get_endpoint_pool('test', 'hana1, hana3', 30015, probe_interval=0.01)
+            self.assertIsNot(new_pool, pool)
+            new_pool.start_probing()
+            pool.prober.join(1)
+            self.assertFalse(pool.prober.is_alive())
+            self.assertTrue(new_pool.prober.is_alive())
+            new_pool.stop_probing()
+            new_pool.prober.join(1)
+            self.assertFalse(new_pool.prober.is_alive())
+
+
+class TestSpatialBackend(unittest.TestCase):
+    maxDiff = None
+
+    @mock_hana
+    @patch_db_execute
+    @patch_db_fetchone
+    def setUp(self, mock_fetchone, mock_execute):
+        connections['gis'].ensure_connection()
+
+    def test_lazy_import(self):
+        # the plain backend doesn't load GeoDjango (or GEOS)
+        code = (
+            'import sys, django; django.setup(); from django.db import connection; connection.ops; '
+            "print(any(name.startswith('django.contrib.gis') for name in sys.modules))"
+        )
+        output = subprocess.check_output(
+            [sys.executable, '-c', code],
+            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+            env=dict(os.environ, DJANGO_SETTINGS_MODULE='tests.test_settings'),
+        )
+        self.assertEqual(output.strip(), b'False')
+        self.assertFalse(connection.features.gis_enabled)
+
+    def test_gis_backend(self):
+        gis_connection = connections['gis']
+        self.assertTrue(gis_connection.features.gis_enabled)
+        self.assertEqual(gis_connection.ops.compiler_module, 'django_hana.compiler')
+        self.assertIn('intersects', gis_connection.ops.gis_operators)
+
+    @mock_hana
+    @patch_db_execute
+    @patch_db_executemany
+    def test_bulk_insert_geometries(self, mock_executemany, mock_execute):
+        points = [Point(1, 2, srid=4326), Point(3, 4, srid=4326), Point(5, 6, srid=4326)]
+        square = Polygon(((0, 0), (0, 1), (1, 1), (1, 0), (0, 0)), srid=4326)
+        SpatialModel.objects.using('gis').bulk_create([
+            SpatialModel(point_field=points[0]),
+            SpatialModel(point_field=points[1]),
+            SpatialModel(point_field=points[2], polygon_field=square),
+        ])
+
+        sql = (
+            'INSERT INTO "TEST_DHP_SPATIALMODEL" (id,"POINT_FIELD", "POLYGON_FIELD") '
+            'VALUES (test_dhp_spatialmodel_id_seq.nextval, ST_GEOMFROMWKB(?, 4326), %s)'
+        )
+        self.assertSequenceEqual(mock_executemany.call_args_list, [
+            call(sql % '?', ([bytes(points[0].wkb), None], [bytes(points[1].wkb), None])),
+        ])
+        self.assertSequenceEqual(mock_execute.call_args_list, [
+            call(sql % 'ST_GEOMFROMWKB(?, 4326)', [bytes(points[2].wkb), bytes(square.wkb)]),
+        ])
+
+    @mock_hana
+    @patch_db_execute
+    @patch_db_fetchone
+    def test_aggregates(self, mock_fetchone, mock_execute):
+        square = Polygon(((0, 0), (0, 2), (2, 2), (2, 0), (0, 0)))
+        points = Point(1, 1).union(Point(2, 2))
+        mock_fetchone.return_value = (bytes(square.wkb), bytes(Point(1, 1).wkb), bytes(points.wkb), None)
+
+        result = SpatialModel.objects.using('gis').aggregate(
+            extent=Extent('polygon_field'),
+            centroid=Centroid('polygon_field'),
+            collect=Collect('point_field'),
+            union=Union('polygon_field'),
+        )
+
+        self.assertSequenceEqual(mock_execute.call_args_list, [call(
+            'SELECT ST_ENVELOPEAGGR("TEST_DHP_SPATIALMODEL"."POLYGON_FIELD") AS "EXTENT", '
+            'ST_CENTROIDAGGR("TEST_DHP_SPATIALMODEL"."POLYGON_FIELD") AS "CENTROID", '
+            'ST_COLLECTAGGR("TEST_DHP_SPATIALMODEL"."POINT_FIELD") AS "COLLECT", '
+            'ST_UNIONAGGR("TEST_DHP_SPATIALMODEL"."POLYGON_FIELD") AS "UNION" '
+            'FROM "TEST_DHP_SPATIALMODEL"',
+            (),
+        )])
+        self.assertEqual(result['extent'], (0, 0, 2, 2))
+        self.assertEqual(result['centroid'], Point(1, 1))
+        self.assertEqual(result['centroid'].srid, 4326)
+        self.assertEqual(result['collect'], points)
+        self.assertIsNone(result['union'])
+
+        with self.assertRaises(NotImplementedError):
+            SpatialModel.objects.using('gis').aggregate(line=MakeLine('point_field'))
+
+    @mock_hana
+    @patch_db_execute
+    @patch_db_fetchmany
+    def test_spatial_metadata(self, mock_fetchmany, mock_execute):
+        gis_connection = connections['gis']
+        wgs84 = (
+            'GEOGCS["WGS 84",DATUM["WGS_1984",SPHEROID["WGS 84",6378137,298.257223563]],PRIMEM["Greenwich",0],'
+            'UNIT["degree",0.0174532925199433]]'
+        )
+        srs = (
+            'SYSTEM', 4326, 'WGS 84', 'TRUE', 'LATITUDE', 0.0, 0.0, 6378137.0, 6356752.314, 298.257223563, -180.0,
+            180.0, -90.0, 90.0, None, None, 'EPSG', 4326, 'GEOGRAPHIC', 'metre', 'degree', 'EVENODD', 'INTERNAL', wgs84,
+            None,
+        )
+        mock_fetchmany.side_effect = [[srs], [], [('TEST_DHP_SPATIALMODEL', 'POINT_FIELD', 4326)], []]
+        gis_connection.spatial_metadata.clear()
+
+        gis_connection.spatial_metadata.preload()
+        field = SpatialModel._meta.get_field('point_field')
+        self.assertEqual(field.units_name(gis_connection), 'degree')
+        self.assertTrue(field.geodetic(gis_connection))
+        metadata = gis_connection.spatial_metadata
+        self.assertEqual(metadata.get_column_srid('test_dhp_spatialmodel', 'point_field'), 4326)
+        self.assertIsNone(metadata.get_column_srid('test_dhp_spatialmodel', 'polygon_field'))
+        gis_connection.spatial_metadata.clear()
+
+        self.assertEqual(len(mock_execute.call_args_list), 2)
+        self.assertTrue(mock_execute.call_args_list[0][0][0].endswith(' FROM "ST_SPATIAL_REFERENCE_SYSTEMS"'))
+        self.assertEqual(mock_execute.call_args_list[1], call(
+            'SELECT "ST_GEOMETRY_COLUMNS"."TABLE_NAME", "ST_GEOMETRY_COLUMNS"."COLUMN_NAME", '
+            '"ST_GEOMETRY_COLUMNS"."SRS_ID" FROM "ST_GEOMETRY_COLUMNS" WHERE "ST_GEOMETRY_COLUMNS"."SCHEMA_NAME" = ?',
+            ('TESTING_DJANGO_HANA',),
+        ))
+
+    @mock_hana
+    @patch_db_execute
+    @patch_db_fetchmany
+    def test_distance_lookups(self, mock_fetchmany, mock_execute):
+        mock_fetchmany.return_value = []
+        point = Point(1, 2, srid=4326)
+        wkb = bytes(point.wkb)
+        corners = [bytes(Point(-4, -3).wkb), bytes(Point(6, 7).wkb)]
+        columns = (
+            '"TEST_DHP_SPATIALMODEL"."ID", "TEST_DHP_SPATIALMODEL"."POINT_FIELD", '
+            '"TEST_DHP_SPATIALMODEL"."POLYGON_FIELD"'
+        )
+        prefilter = (
+            '"TEST_DHP_SPATIALMODEL"."POINT_FIELD".ST_INTERSECTSRECT('
+            'ST_GEOMFROMWKB(?, 4326), ST_GEOMFROMWKB(?, 4326)) = 1'
+        )
+        within = '"TEST_DHP_SPATIALMODEL"."POINT_FIELD".ST_WITHINDISTANCE(ST_GEOMFROMWKB(?, 4326), ?) = 1'
+        distance = '"TEST_DHP_SPATIALMODEL"."POINT_FIELD".ST_DISTANCE(ST_GEOMFROMWKB(?, 4326))'
+        queryset = SpatialModel.objects.using('gis')
+
+        with mock.patch.object(PointField, 'geodetic', return_value=False):
+            list(queryset.filter(point_field__distance_lte=(point, 5)))
+            list(queryset.filter(point_field__distance_lt=(point, 5)))
+            list(nearest(queryset, 'point_field', point, 3, max_distance=5))
+        # no prefilter if the distance isn't in the units of the coordinates
+        with mock.patch.object(PointField, 'geodetic', return_value=True):
+            list(queryset.filter(point_field__dwithin=(point, 5)))
+
+        self.assertSequenceEqual(mock_execute.call_args_list, [
+            call(
+                'SELECT %s FROM "TEST_DHP_SPATIALMODEL" WHERE %s AND %s' % (columns, prefilter, within),
+                tuple(corners) + (wkb, 5),
+            ),
+            call(
+                'SELECT %s FROM "TEST_DHP_SPATIALMODEL" WHERE %s AND %s AND %s < ?' % (
+                    columns, prefilter, within, distance,
+                ),
+                tuple(corners) + (wkb, 5, wkb, 5),
+            ),
+            call(
+                'SELECT %s, %s AS "DISTANCE" FROM "TEST_DHP_SPATIALMODEL" WHERE %s AND %s '
+                'ORDER BY "DISTANCE" ASC LIMIT 3' % (columns, distance, prefilter, within),
+                (wkb,) + tuple(corners) + (wkb, 5),
+            ),
+            call('SELECT %s FROM "TEST_DHP_SPATIALMODEL" WHERE %s' % (columns, within), (wkb, 5)),
+        ])
+
+    @mock_hana
+    @patch_db_execute
+    @patch_db_fetchmany
+    def test_vector_tile(self, mock_fetchmany, mock_execute):
+        extent = 20037508.342789244
+        resolution = extent / 4096
+        margin = 64 * resolution
+        point = Point(extent / 2, extent / 2)
+        # a polygon collapsing to a line at the tile resolution isn't encoded
+        collapsed = Polygon(((0, 0), (resolution / 4, 0), (resolution / 4, extent), (0, 0)))
+        # the column isn't in the catalog, the SRID of the field applies
+        mock_fetchmany.side_effect = [[], [(1, 1, bytes(point.wkb)), (2, 2, bytes(collapsed.wkb))], []]
+        connections['gis'].spatial_metadata.clear()
+
+        tile = vector_tile(SpatialModel.objects.using('gis'), 'point_field', 1, 1, 0, properties=['id'])
+        self.assertEqual(mock_execute.call_count, 2)
+        catalog = mock_execute.call_args_list[0][0][0]
+        self.assertTrue(catalog.endswith(' FROM "ST_GEOMETRY_COLUMNS" WHERE "ST_GEOMETRY_COLUMNS"."SCHEMA_NAME" = ?'))
+
+        column = '"TEST_DHP_SPATIALMODEL"."POINT_FIELD"'
+        geometry = (
+            '%s.ST_TRANSFORM(3857).ST_INTERSECTION(ST_GEOMFROMTEXT(?, 3857)).ST_SIMPLIFY(?).ST_SNAPTOGRID(?)' % column
+        )
+        corner = 'ST_GEOMFROMTEXT(?, 3857).ST_TRANSFORM(4326)'
+        rect = '%s.ST_INTERSECTSRECT(%s, %s)' % (column, corner, corner)
+        xmin, ymin, xmax, ymax = -margin, -margin, extent + margin, extent + margin
+        clip = 'POLYGON((%r %r, %r %r, %r %r, %r %r, %r %r))' % (
+            xmin, ymin, xmax, ymin, xmax, ymax, xmin, ymax, xmin, ymin,
+        )
+        self.assertEqual(mock_execute.call_args, call(
+            'SELECT "TEST_DHP_SPATIALMODEL"."ID", "TEST_DHP_SPATIALMODEL"."ID", %s AS "HANA_TILE_GEOMETRY" '
+            'FROM "TEST_DHP_SPATIALMODEL" WHERE %s = ?' % (geometry, rect),
+            (clip, resolution, resolution, 'POINT(%r %r)' % (xmin, ymin), 'POINT(%r %r)' % (xmax, ymax), 1),
+        ))
+        # MoveTo(1) to (2048, 2048), zigzag encoded varints
+        feature = b'\x08\x01' + b'\x12\x02\x00\x00' + b'\x18\x01' + b'\x22\x05\x09\x80\x20\x80\x20'
+        layer = (
+            b'\x78\x02' + b'\x0a\x0cspatialmodel' + b'\x12\x0f' + feature + b'\x1a\x02id' + b'\x22\x02\x28\x01' +
+            b'\x28\x80\x20'
+        )
+        self.assertEqual(tile, b'\x1a' + six.int2byte(len(layer)) + layer)
+
+        # the geometries of the column are stored in web mercator, they aren't transformed
+        mock_fetchmany.side_effect = [[('TEST_DHP_SPATIALMODEL', 'POINT_FIELD', 3857)], [], []]
+        connections['gis'].spatial_metadata.clear()
+        vector_tile(SpatialModel.objects.using('gis'), 'point_field', 1, 1, 0)
+        connections['gis'].spatial_metadata.clear()
+        self.assertEqual(
+            mock_execute.call_args[0][0],
+            'SELECT "TEST_DHP_SPATIALMODEL"."ID", %s AS "HANA_TILE_GEOMETRY" FROM "TEST_DHP_SPATIALMODEL" WHERE '
+            '%s.ST_INTERSECTSRECT(ST_GEOMFROMTEXT(?, 3857), ST_GEOMFROMTEXT(?, 3857)) = ?' % (
+                geometry.replace('.ST_TRANSFORM(3857)', ''), column,
+            ),
+        )
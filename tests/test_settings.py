@@ -30,5 +30,14 @@ DATABASES = {
         'PASSWORD': 'foo',
         'HOST': '0.0.0.0',
         'PORT': '30015',
-    }
+        'RESULT_CACHE_SIZE': 16 * 1024 * 1024,
+    },
+    'gis': {
+        'ENGINE': 'django_hana.gis',
+        'NAME': 'testing_django_hana',
+        'USER': 'foo',
+        'PASSWORD': 'foo',
+        'HOST': '0.0.0.0',
+        'PORT': '30015',
+    },
 }